@@ -0,0 +1,104 @@
+"""网页正文提取耗时对比
+
+比较旧的提取方式（对每个候选容器调用 get_text，嵌套越深越慢）和当前的一次遍历打分方式，
+对每个可用的解析器分别计时。--corpus 指向保存的 HTML 文件目录；不指定时生成几类合成页面
+（深层嵌套的文档页、Gutenberg 式长篇小说页、导航链接很多的新闻页）。
+
+    python kimi-k2-milvus/benchmarks/extraction_benchmark.py --corpus ./saved_pages --repeat 3
+"""
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.content_extraction import REMOVED_TAGS, html_to_text  # noqa: E402
+
+
+def legacy_html_to_text(html: str) -> str:
+    """旧版 WebDownloader 的提取逻辑"""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(REMOVED_TAGS):
+        element.decompose()
+    best_candidate, max_text_length = None, 0
+    for candidate in soup.find_all(["article", "main", "div", "section"]):
+        text = candidate.get_text(strip=True)
+        if len(text) > max_text_length:
+            max_text_length, best_candidate = len(text), candidate
+    text = soup.get_text(separator="\n\n")
+    if best_candidate:
+        paragraphs = best_candidate.find_all("p")
+        if paragraphs:
+            text = "\n\n".join(p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 0)
+    if len(text.split()) < 100:
+        paragraphs = soup.find_all("p")
+        if paragraphs:
+            text = "\n\n".join(p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 0)
+        else:
+            text = soup.get_text(separator="\n\n")
+    return text
+
+
+def synthetic_pages() -> dict:
+    """生成合成页面"""
+    sentence = "The quick brown fox, having jumped over the lazy dog, rested in the shade of the old oak tree. "
+    nav = "<nav>" + "".join(f'<a href="/{i}">Link {i}</a>' for i in range(50)) + "</nav>"
+
+    nested = "<div><section>" * 60 + "".join(f"<p>{sentence * 3}</p>" for _ in range(400)) + "</section></div>" * 60
+    book = "<div class='book'>" + "".join(
+        f"<div class='chapter'><h2>Chapter {c}</h2>" + "".join(f"<p>{sentence * 4}</p>" for _ in range(200)) + "</div>"
+        for c in range(30)
+    ) + "</div>"
+    news = "<div class='sidebar'>" + "".join(f'<div><a href="/{i}">Related story {i} {sentence}</a></div>' for i in range(300)) + "</div>"
+    news += "<div><article>" + "".join(f"<p>{sentence * 2}</p>" for _ in range(60)) + "</article></div>"
+    return {
+        "nested_docs": f"<html><body>{nav}{nested}</body></html>",
+        "gutenberg_book": f"<html><body>{nav}{book}</body></html>",
+        "news_with_links": f"<html><body>{nav}{news}</body></html>",
+    }
+
+
+def time_call(function, html: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = function(html)
+    return (time.perf_counter() - start) / repeat, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="保存的 HTML 文件目录")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(args.corpus, "*.htm*"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        pages = synthetic_pages()
+
+    parsers = ["html.parser"] + [name for name in ("lxml", "selectolax") if importlib.util.find_spec(name)]
+    methods = [("legacy", legacy_html_to_text)] + [
+        (name, lambda html, name=name: html_to_text(html, name)) for name in parsers
+    ]
+
+    print(f"{'page':>20}  {'size_kb':>8}  " + "  ".join(f"{name + '_ms':>16}" for name, _ in methods) + "  text_chars")
+    for page, html in pages.items():
+        timings, lengths = [], []
+        for _, function in methods:
+            seconds, text = time_call(function, html, args.repeat)
+            timings.append(seconds)
+            lengths.append(len(text))
+        print(f"{page[:20]:>20}  {len(html) / 1024:>8.0f}  "
+              + "  ".join(f"{seconds * 1000:>16.1f}" for seconds in timings)
+              + "  " + "/".join(str(length) for length in lengths))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""不同向量索引的 recall@k 和 QPS
+
+在同一批随机向量上为每种索引配置创建集合，以暴力搜索的结果为准计算 recall@k，并记录搜索吞吐。
+默认使用临时的 Milvus Lite 数据库，applied 一列是 Milvus 实际使用的索引类型；百万级数据请用 --uri 指向 Milvus 服务。
+
+    python kimi-k2-milvus/benchmarks/index_recall.py --vectors 20000 --dim 128 --queries 200
+    python kimi-k2-milvus/benchmarks/index_recall.py --uri http://localhost:19530 --vectors 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pymilvus import MilvusClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.metadata_store import CollectionMetadataStore  # noqa: E402
+from utils.vector_database import VectorDatabase  # noqa: E402
+
+DEFAULT_SPECS = [
+    {"index_type": "FLAT"},
+    {"index_type": "HNSW", "M": 16, "efConstruction": 200, "ef": 64},
+    {"index_type": "HNSW", "M": 16, "efConstruction": 200, "ef": 16},
+    {"index_type": "IVF_FLAT", "nlist": 256, "nprobe": 16},
+    {"index_type": "IVF_SQ8", "nlist": 256, "nprobe": 16},
+    {"index_type": "IVF_PQ", "nlist": 256, "m": 16, "nbits": 8, "nprobe": 16},
+]
+
+
+def make_vectors(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """生成带聚类结构的单位向量，比均匀随机向量更接近真实的文本嵌入"""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", help="Milvus 地址，默认使用临时的 Milvus Lite 数据库")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1, help="每次搜索请求包含的查询数")
+    parser.add_argument("--specs", help="JSON 格式的索引配置列表，默认比较 FLAT、HNSW、IVF_FLAT、IVF_SQ8、IVF_PQ")
+    args = parser.parse_args()
+
+    specs = json.loads(args.specs) if args.specs else DEFAULT_SPECS
+    rng = np.random.default_rng(0)
+    vectors = make_vectors(args.vectors, args.dim, clusters=max(args.vectors // 500, 1), rng=rng)
+    queries = make_vectors(args.queries, args.dim, clusters=max(args.vectors // 500, 1), rng=np.random.default_rng(0))
+    queries = queries[rng.permutation(args.queries)]
+    # 暴力搜索的真实近邻
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_db = VectorDatabase("benchmark")
+        vector_db.milvus_client = MilvusClient(args.uri or os.path.join(tmp, "benchmark.db"))
+        vector_db.metadata_store = CollectionMetadataStore("")
+        vector_db.dimension = args.dim
+        # 查询文本就是查询向量的下标，跳过嵌入模型
+        vector_db.generate_embeddings = lambda texts: queries[[int(text) for text in texts]]
+
+        print(f"{'index':>40}  {'applied':>10}  {'recall@' + str(args.k):>10}  {'qps':>8}  {'build_s':>8}")
+        for number, spec in enumerate(specs):
+            name = f"index_benchmark_{number}"
+            start = time.perf_counter()
+            result = vector_db.create_collection(name, index=spec)
+            if not result["success"]:
+                print(f"{json.dumps(spec):>40}  {result['message']}")
+                continue
+            full_name = f"{vector_db._full_collection_name(name)}"
+            for i in range(0, args.vectors, 5000):
+                vector_db.milvus_client.insert(
+                    collection_name=full_name,
+                    data=[{"id": str(j), "vector": vectors[j], "text": str(j)} for j in range(i, min(i + 5000, args.vectors))]
+                )
+            vector_db.milvus_client.flush(full_name)
+            build_seconds = time.perf_counter() - start
+            applied = vector_db.milvus_client.describe_index(full_name, "vector").get("index_type")
+
+            hits = 0
+            start = time.perf_counter()
+            for i in range(0, args.queries, args.batch):
+                batch = [str(q) for q in range(i, min(i + args.batch, args.queries))]
+                found = vector_db.search_documents_batch(name, batch, limit=args.k)
+                for query, result in zip(batch, found["results"]):
+                    hits += len({int(hit["text"]) for hit in result["results"]} & set(truth[int(query)].tolist()))
+            seconds = time.perf_counter() - start
+
+            print(f"{json.dumps(spec):>40}  {applied:>10}  {hits / (args.queries * args.k):>10.3f}  "
+                  f"{args.queries / seconds:>8.1f}  {build_seconds:>8.2f}")
+            vector_db.milvus_client.drop_collection(full_name)
+
+
+if __name__ == "__main__":
+    main()
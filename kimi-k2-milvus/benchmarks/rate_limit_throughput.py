@@ -0,0 +1,115 @@
+"""Kimi接口限流下的持续吞吐量模拟
+
+模拟一个按滑动窗口限制请求数的服务端（超出配额返回429和Retry-After），多个并发的对话循环持续请求，
+对比旧的重试方式（429后固定等待20秒并乘以1.5）和当前的共享限流器 + RetryPolicy。
+为了让模拟在几秒内完成，"一分钟"缩短为 --window 秒，旧方式的等待时间按同样比例缩短。
+
+    python kimi-k2-milvus/benchmarks/rate_limit_throughput.py --rpm 20 --window 3 --workers 4 --duration 12
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rate_limiter import RateLimiter, RetryPolicy, retry_after_seconds, status_code_of  # noqa: E402
+
+
+class RateLimitError(Exception):
+    """模拟openai.RateLimitError：带状态码和响应头"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 rate_limit_reached_error")
+        self.status_code = 429
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": f"{retry_after:.3f}"}})()
+
+
+class SimulatedEndpoint:
+    """在window秒内最多接受quota个请求的服务端"""
+
+    def __init__(self, quota: int, window: float, latency: float):
+        self.quota = quota
+        self.window = window
+        self.latency = latency
+        self.accepted = deque()
+        self.completed = 0
+        self.rejected = 0
+
+    async def create(self):
+        now = time.monotonic()
+        while self.accepted and now - self.accepted[0] >= self.window:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.quota:
+            self.rejected += 1
+            raise RateLimitError(self.window - (now - self.accepted[0]))
+        self.accepted.append(now)
+        await asyncio.sleep(self.latency)
+        self.completed += 1
+
+
+async def legacy_worker(endpoint: SimulatedEndpoint, deadline: float, scale: float):
+    """旧的重试方式：429后阻塞等待，等待时间从20秒开始乘以1.5"""
+    while time.monotonic() < deadline:
+        retry_delay = 20 * scale
+        for _ in range(5):
+            try:
+                await endpoint.create()
+                break
+            except RateLimitError:
+                # 原实现用time.sleep，会阻塞整个进程；这里只阻塞当前循环，结果偏乐观
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 1.5
+
+
+async def limited_worker(endpoint: SimulatedEndpoint, deadline: float, limiter: RateLimiter, policy: RetryPolicy):
+    """当前方式：请求前经过共享限流器排队，429时按Retry-After暂停所有调用"""
+    while time.monotonic() < deadline:
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            try:
+                await endpoint.create()
+                break
+            except RateLimitError as e:
+                if not policy.should_retry(e, attempt) or status_code_of(e) != 429:
+                    raise
+                limiter.pause(policy.delay(attempt, retry_after_seconds(e)))
+                attempt += 1
+
+
+async def run(mode: str, args) -> SimulatedEndpoint:
+    endpoint = SimulatedEndpoint(args.rpm, args.window, args.latency)
+    scale = args.window / 60
+    deadline = time.monotonic() + args.duration
+    if mode == "legacy":
+        workers = [legacy_worker(endpoint, deadline, scale) for _ in range(args.workers)]
+    else:
+        # 限流器以每分钟计配额，按缩短后的窗口换算
+        limiter = RateLimiter(requests_per_minute=int(args.rpm * 60 / args.window))
+        policy = RetryPolicy(max_retries=5, base_delay=0.05 * scale * 60, max_delay=args.window)
+        workers = [limited_worker(endpoint, deadline, limiter, policy) for _ in range(args.workers)]
+    await asyncio.gather(*workers)
+    return endpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpm", type=int, default=20, help="每个窗口允许的请求数")
+    parser.add_argument("--window", type=float, default=3.0, help="模拟的一分钟的秒数")
+    parser.add_argument("--workers", type=int, default=4, help="并发的对话循环数")
+    parser.add_argument("--duration", type=float, default=12.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="每个请求的服务端耗时（秒）")
+    args = parser.parse_args()
+
+    quota_rate = args.rpm / args.window
+    print(f"{'mode':>8}  {'completed':>10}  {'429s':>6}  {'req/s':>8}  {'% of quota':>10}")
+    for mode in ("legacy", "limiter"):
+        endpoint = asyncio.run(run(mode, args))
+        rate = endpoint.completed / args.duration
+        print(f"{mode:>8}  {endpoint.completed:>10}  {endpoint.rejected:>6}  {rate:>8.2f}  {rate / quota_rate * 100:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""向量搜索单次查询开销的微基准
+
+对比旧的搜索路径（每次搜索前重新连接、列出集合、检查集合是否存在、用eval解析结果）
+和当前的 search_documents（缓存集合名称、直接解析结果）。查询向量预先生成，只测数据库一侧的开销。
+
+    python kimi-k2-milvus/benchmarks/search_overhead.py --queries 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pymilvus import MilvusClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config import MILVUS_COLLECTION_PREFIX  # noqa: E402
+from utils.vector_database import VectorDatabase  # noqa: E402
+
+
+class CountingClient:
+    """包装MilvusClient，统计每个方法的调用次数"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def counted(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return method(*args, **kwargs)
+
+        return counted
+
+
+def legacy_search(client: CountingClient, db_path: str, collection_name: str, query_vector, limit: int):
+    """重现旧的搜索路径：SmartAssistant 在搜索前连接并列出集合，search_documents 再检查集合并eval结果"""
+    client.calls["connect"] = client.calls.get("connect", 0) + 1
+    MilvusClient(db_path)
+    available = client.list_collections()
+    full_name = f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
+    if full_name not in available:
+        return []
+    if not client.has_collection(collection_name=full_name):
+        return []
+    results = client.search(collection_name=full_name, data=[query_vector], limit=limit, output_fields=["text"])
+    return [
+        {"text": hit.get("entity", {}).get("text", ""), "score": hit.get("distance", 0.0)}
+        for hit in eval(str([dict(hit) for hit in results[0]]))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "benchmark.db")
+        vector_db = VectorDatabase("benchmark")
+        vector_db.milvus_client = MilvusClient(db_path)
+        vector_db.create_collection("benchmark")
+        dimension = vector_db.dimension
+
+        vectors = rng.standard_normal((args.documents, dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        vector_db.milvus_client.insert(
+            collection_name=f"{MILVUS_COLLECTION_PREFIX}benchmark",
+            data=[{"id": str(i), "vector": vectors[i], "text": f"document {i}"} for i in range(args.documents)],
+        )
+        queries = vectors[rng.integers(0, args.documents, args.queries)]
+
+        # 旧路径
+        legacy_client = CountingClient(vector_db.milvus_client)
+        start = time.perf_counter()
+        for query in queries:
+            legacy_search(legacy_client, db_path, "benchmark", query, args.limit)
+        legacy_seconds = time.perf_counter() - start
+
+        # 当前路径，查询向量直接返回，不调用嵌入模型
+        counting_client = CountingClient(vector_db.milvus_client)
+        vector_db.milvus_client = counting_client
+        query_iter = iter(queries)
+        vector_db.generate_embeddings = lambda texts: [next(query_iter)]
+        start = time.perf_counter()
+        for _ in queries:
+            result = vector_db.search_documents("benchmark", "query", args.limit)
+            assert result["success"], result
+        current_seconds = time.perf_counter() - start
+
+    print(f"{'path':>10}  {'ms/query':>10}  {'db calls/query':>15}")
+    for name, seconds, calls in [
+        ("legacy", legacy_seconds, legacy_client.calls),
+        ("current", current_seconds, counting_client.calls),
+    ]:
+        print(f"{name:>10}  {seconds / args.queries * 1000:>10.3f}  {sum(calls.values()) / args.queries:>15.2f}  {calls}")
+
+
+if __name__ == "__main__":
+    main()
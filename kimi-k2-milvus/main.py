@@ -6,6 +6,7 @@ Kimi K2 智能向量数据库助手
 该程序使用Kimi K2大语言模型和Milvus向量数据库构建智能检索系统
 """
 
+import asyncio
 import os
 import sys
 import logging
@@ -47,17 +48,22 @@ def main():
     # 创建智能助手
     assistant = SmartAssistant(KIMI_API_KEY, OPENAI_API_KEY)
     
-    # 交互模式
+    # 交互模式，整个会话使用同一个事件循环，Kimi客户端的连接得以复用
+    asyncio.run(interactive_loop(assistant))
+
+async def interactive_loop(assistant: SmartAssistant):
+    """交互式命令循环"""
     print("\n🎮 交互模式 (输入 'quit' 退出)")
     while True:
         try:
+            # 等待输入时没有其他任务在运行，直接阻塞读取即可
             user_input = input("\n请输入命令: ").strip()
             if user_input.lower() in ['quit', 'exit', '退出']:
                 print("👋 再见！")
                 break
             
             if user_input:
-                assistant.execute_command(user_input)
+                await assistant.aexecute_command(user_input)
                 print("\n" + "=" * 60)
                 
         except KeyboardInterrupt:
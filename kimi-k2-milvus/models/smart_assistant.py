@@ -1,21 +1,63 @@
-import time
+import asyncio
+import threading
 import json
 import os
 import logging
-from typing import List, Dict, Any, Union, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Union, Optional, Callable
+from openai import OpenAI, AsyncOpenAI
 from utils import VectorDatabase, WebDownloader
-from utils.config import KIMI_API_KEY, OPENAI_API_KEY
+from utils.config import KIMI_API_KEY, OPENAI_API_KEY, KIMI_STREAMING, KIMI_RPM, KIMI_TPM, RESPONSE_CACHE_ENABLED
+from utils.context_compactor import ContextCompactor
+from utils.response_cache import ResponseCache
+from utils.rate_limiter import RateLimiter, RetryPolicy, get_rate_limiter, estimate_tokens, retry_after_seconds, status_code_of
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("SmartAssistant")
 
+KIMI_BASE_URL = "https://api.moonshot.cn/v1"
+KIMI_MODEL = "kimi-k2-0711-preview"
+
+SYSTEM_PROMPT = """你是一个智能助手，可以帮助用户管理向量数据库和回答问题。
+    智能决策原则：
+    1. 优先考虑回答速度和质量，选择最优的回答方式
+    2. 对于通用知识问题，直接使用你的知识快速回答
+    3. 只在以下情况使用数据库搜索：
+    - 用户明确要求搜索数据库中的内容
+    - 问题涉及用户上传的特定文档或专业资料
+    - 需要查找具体的、专门的信息时
+    4. 你可以处理文件上传、数据库管理等任务
+    5. 始终以提供最快速、最准确的答案为目标
+    重要提醒：
+    - 在执行任何数据库操作之前，请先调用 connect_database 连接数据库
+    - 需要在同一个集合中查找多个信息时，使用 search_documents_batch 一次完成，而不是多次调用 search_documents
+    - 如果遇到API限制错误，系统会自动等待并重试
+    记住：不要为了使用工具而使用工具，而要以最优的方式解决用户的问题。"""
+
+# 只读或互不依赖的工具，同一轮中相邻的这些调用并发执行；
+# 其余工具（连接、建集合、写入）可能被同一轮后面的调用依赖，按顺序单独执行
+PARALLEL_TOOLS = frozenset({
+    "search_documents", "search_documents_batch", "get_collection_content", "export_collection",
+    "list_all_collections", "read_and_chunk_file",
+    "download_webpage", "batch_download_webpages", "download_free_books",
+})
+
+# 回答只依赖这些工具时可以缓存；调用了写入、下载等工具的命令每次都要真正执行
+CACHEABLE_TOOLS = frozenset({
+    "connect_database", "search_documents", "search_documents_batch", "get_collection_content",
+})
+
+
 class SmartAssistant:
-    """智能决策中心，使用Kimi K2理解用户意图并调用合适的工具"""
+    """智能决策中心，使用Kimi K2理解用户意图并调用合适的工具
+
+    对话循环基于asyncio：模型一次返回多个工具调用时，互不依赖的调用并发执行，
+    结果仍按tool_call的顺序写回对话；网页下载直接使用异步下载器，其他工具在线程池中执行。
+    """
     
-    def __init__(self, kimi_api_key: str = None, openai_api_key: str = None):
-        """初始化智能助手"""
+    def __init__(self, kimi_api_key: str = None, openai_api_key: str = None,
+                 rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None):
+        """初始化智能助手，rate_limiter默认使用进程内所有助手共享的Kimi限流器"""
         print("🚀 启动智能助手...")
         
         # API密钥配置
@@ -25,8 +67,17 @@ class SmartAssistant:
         # Kimi客户端
         self.kimi_client = OpenAI(
             api_key=self.kimi_api_key,
-            base_url="https://api.moonshot.cn/v1"
+            base_url=KIMI_BASE_URL
         )
+        # 异步客户端的连接池绑定事件循环，按事件循环创建
+        self._async_clients: Dict[asyncio.AbstractEventLoop, AsyncOpenAI] = {}
+        # 限流和重试在这里统一处理，关闭SDK自带的重试
+        self.rate_limiter = rate_limiter or get_rate_limiter("kimi", KIMI_RPM, KIMI_TPM)
+        self.retry_policy = retry_policy or RetryPolicy()
+        # 控制每轮发送给模型的上下文长度
+        self.context = ContextCompactor()
+        # 并发执行的工具可能同时触发懒连接
+        self._connect_lock = threading.Lock()
         
         # 向量数据库
         self.vector_db = VectorDatabase(self.openai_api_key)
@@ -34,6 +85,9 @@ class SmartAssistant:
         # 网页下载器
         self.web_downloader = WebDownloader()
         
+        # 语义回答缓存
+        self.response_cache = ResponseCache(self.vector_db) if RESPONSE_CACHE_ENABLED else None
+        
         # 定义可用工具
         self.available_tools = [
             {
@@ -53,7 +107,13 @@ class SmartAssistant:
                         "type": "object",
                         "properties": {
                             "collection_name": {"type": "string", "description": "集合名称"},
-                            "description": {"type": "string", "description": "集合描述"}
+                            "description": {"type": "string", "description": "集合描述"},
+                            "hybrid": {"type": "boolean", "description": "是否支持混合检索（稠密+关键词），适合含有人名、编号、代码的资料", "default": False},
+                            "index": {
+                                "type": "object",
+                                "description": "可选，向量索引配置。例如 {\"index_type\": \"HNSW\", \"M\": 16, \"efConstruction\": 200, \"ef\": 64}，"
+                                               "或 {\"index_type\": \"IVF_SQ8\", \"nlist\": 1024, \"nprobe\": 16}；索引类型可选 AUTOINDEX、FLAT、HNSW、IVF_FLAT、IVF_SQ8、IVF_PQ"
+                            }
                         },
                         "required": ["collection_name"]
                     }
@@ -84,26 +144,77 @@ class SmartAssistant:
                         "properties": {
                             "collection_name": {"type": "string", "description": "集合名称"},
                             "query": {"type": "string", "description": "搜索内容"},
+                            "mode": {
+                                "type": "string",
+                                "enum": ["dense", "sparse", "hybrid"],
+                                "description": "检索方式：dense按语义，sparse按关键词，hybrid两者融合，查找人名、编号等关键词时使用hybrid（需要集合支持混合检索）",
+                                "default": "dense"
+                            },
                             "limit": {"type": "integer", "description": "结果数量", "default": 5}
                         },
                         "required": ["collection_name", "query"]
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "search_documents_batch",
+                    "description": "在同一个集合中一次搜索多个问题，需要查找多个信息时优先使用，结果按问题顺序返回",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "collection_name": {"type": "string", "description": "集合名称"},
+                            "queries": {"type": "array", "items": {"type": "string"}, "description": "搜索内容列表"},
+                            "limit": {"type": "integer", "description": "每个问题的结果数量", "default": 5},
+                            "mode": {
+                                "type": "string",
+                                "enum": ["dense", "sparse", "hybrid"],
+                                "description": "检索方式：dense按语义，sparse按关键词，hybrid两者融合，查找人名、编号等关键词时使用hybrid（需要集合支持混合检索）",
+                                "default": "dense"
+                            },
+                            "filters": {
+                                "type": "array",
+                                "items": {"type": ["string", "null"]},
+                                "description": "可选，与queries一一对应的Milvus过滤表达式，例如 source like \"%manual%\""
+                            }
+                        },
+                        "required": ["collection_name", "queries"]
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
                     "name": "get_collection_content",
-                    "description": "直接获取集合中的所有文档内容，不使用向量搜索",
+                    "description": "直接获取集合中的文档内容，不使用向量搜索；最多返回limit条，结果中的total为文档总数",
                     "parameters": {
                         "type": "object",
                         "properties": {
-                            "collection_name": {"type": "string", "description": "集合名称"}
+                            "collection_name": {"type": "string", "description": "集合名称"},
+                            "limit": {"type": "integer", "description": "最多返回的文档数", "default": 100}
                         },
                         "required": ["collection_name"]
                     }
                 }
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "export_collection",
+                    "description": "将集合的全部内容导出为JSONL或Parquet文件，用于备份或迁移",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "collection_name": {"type": "string", "description": "集合名称"},
+                            "output_path": {"type": "string", "description": "导出文件路径，例如 ./kimi-k2-milvus/data/exports/sample_data.jsonl"},
+                            "format": {"type": "string", "enum": ["jsonl", "parquet"], "description": "导出格式，默认根据文件扩展名判断"},
+                            "output_fields": {"type": "array", "items": {"type": "string"}, "description": "可选，要导出的字段，默认导出全部字段（包括向量）"}
+                        },
+                        "required": ["collection_name", "output_path"]
+                    }
+                }
+            },
             {
                 "type": "function",
                 "function": {
@@ -139,7 +250,8 @@ class SmartAssistant:
                             "file_path": {"type": "string", "description": "文件路径"},
                             "collection_name": {"type": "string", "description": "目标集合名称"},
                             "chunk_size": {"type": "integer", "description": "每个文本块的大小", "default": 500},
-                            "overlap": {"type": "integer", "description": "文本块之间的重叠字符数", "default": 50}
+                            "overlap": {"type": "integer", "description": "文本块之间的重叠字符数", "default": 50},
+                            "hybrid": {"type": "boolean", "description": "集合不存在时，新建的集合是否支持混合检索", "default": False}
                         },
                         "required": ["file_path", "collection_name"]
                     }
@@ -190,12 +302,20 @@ class SmartAssistant:
         ]
         print("✅ 智能助手启动完成")
 
+    def _ensure_connected(self) -> dict:
+        """尚未连接时连接一次数据库"""
+        with self._connect_lock:
+            if self.vector_db.milvus_client:
+                return {"success": True}
+            return self.vector_db.connect_database()
+
     def _execute_tool(self, tool_name: str, args: dict) -> dict:
         """执行具体工具"""
         logger.info(f"执行工具: {tool_name}, 参数: {args}")
         
         if tool_name == "connect_database":
-            return self.vector_db.connect_database()
+            with self._connect_lock:
+                return self.vector_db.connect_database()
         
         elif tool_name == "create_collection":
             return self.vector_db.create_collection(**args)
@@ -203,12 +323,19 @@ class SmartAssistant:
         elif tool_name == "add_documents":
             return self.vector_db.add_documents(**args)
         
-        elif tool_name == "search_documents":
-            return self.vector_db.search_documents(**args)
+        elif tool_name in ("search_documents", "search_documents_batch"):
+            # 集合名称的前缀由向量数据库补全，这里只在尚未连接时连接一次
+            db_result = self._ensure_connected()
+            if not db_result.get("success", False):
+                return db_result
+            return getattr(self.vector_db, tool_name)(**args)
         
         elif tool_name == "get_collection_content":
             return self.vector_db.get_collection_content(**args)
         
+        elif tool_name == "export_collection":
+            return self.vector_db.export_collection(**args)
+        
         elif tool_name == "list_all_collections":
             return self.vector_db.list_all_collections()
         
@@ -238,155 +365,311 @@ class SmartAssistant:
         else:
             return {"success": False, "message": f"未知工具: {tool_name}"}
 
-    def execute_command(self, user_command: str) -> str:
-        """执行用户命令"""
+    async def _aexecute_tool(self, tool_name: str, args: dict) -> dict:
+        """异步执行工具：网页下载使用异步下载器，其他工具放到线程池中执行"""
+        if tool_name == "download_webpage":
+            logger.info(f"执行工具: {tool_name}, 参数: {args}")
+            return (await self.web_downloader.adownload_batch([args["url"]]))[0]
+        
+        elif tool_name == "batch_download_webpages":
+            logger.info(f"执行工具: {tool_name}, 参数: {args}")
+            return {
+                "results": await self.web_downloader.adownload_batch(args["urls"]),
+                "success": True,
+                "message": f"批量下载完成，共 {len(args['urls'])} 个URL"
+            }
+        
+        elif tool_name == "download_free_books":
+            logger.info(f"执行工具: {tool_name}, 参数: {args}")
+            return {
+                "results": await self.web_downloader.adownload_free_books(**args),
+                "success": True,
+                "message": f"下载完成，请查看 kimi-k2-milvus/data/downloads 目录"
+            }
+        
+        return await asyncio.to_thread(self._execute_tool, tool_name, args)
+
+    async def _arun_tool_call(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """执行一个工具调用，返回写回对话的tool消息"""
+        tool_name = tool_call["function"]["name"]
+        tool_args = json.loads(tool_call["function"]["arguments"] or "{}")
+        print(f"🔧 调用工具: {tool_name}")
+        print(f"📋 参数: {tool_args}")
+        
+        result = await self._aexecute_tool(tool_name, tool_args)
+        print(f"✅ 结果 [{tool_name}]: {result}")
+        print("-" * 40)
+        
+        # 向量搜索无结果时，对于搜索操作，尝试直接获取集合内容
+        if tool_name == "search_documents" and result.get("success", False) and len(result.get("results", [])) == 0:
+            print("向量搜索没有找到结果，尝试直接获取集合内容...")
+            collection_name = tool_args["collection_name"]
+            content_result = await self._aexecute_tool("get_collection_content", {"collection_name": collection_name})
+            
+            if content_result.get("success", False) and content_result.get("count", 0) > 0:
+                print(f"找到集合内容: {content_result.get('count')} 个文档")
+                # 将集合内容添加到result中
+                result["collection_content"] = content_result.get("documents", [])
+                result["message"] = "向量搜索未找到结果，但集合中存在文档"
+        
+        # 写入对话前按工具的上限截断，兜底获取的集合内容也在其中
+        return self.context.tool_message(tool_call["id"], tool_name, result)
+
+    @staticmethod
+    def _tool_call_batches(tool_calls: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """把一轮中的工具调用分组：相邻的可并发工具为一组，其余工具各自一组，组之间按顺序执行"""
+        batches: List[List[Dict[str, Any]]] = []
+        for tool_call in tool_calls:
+            parallel = tool_call["function"]["name"] in PARALLEL_TOOLS
+            if parallel and batches and batches[-1][0]["function"]["name"] in PARALLEL_TOOLS:
+                batches[-1].append(tool_call)
+            else:
+                batches.append([tool_call])
+        return batches
+
+    async def _arun_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """执行一轮工具调用，返回的tool消息与tool_calls顺序一致"""
+        tool_messages = []
+        for batch in self._tool_call_batches(tool_calls):
+            tool_messages.extend(await asyncio.gather(*(self._arun_tool_call(tool_call) for tool_call in batch)))
+        return tool_messages
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        """返回当前事件循环的异步Kimi客户端"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            # 已结束的事件循环上的客户端不能再用，直接丢弃
+            self._async_clients = {l: c for l, c in self._async_clients.items() if not l.is_closed()}
+            client = self._async_clients[loop] = AsyncOpenAI(
+                api_key=self.kimi_api_key, base_url=KIMI_BASE_URL, max_retries=0
+            )
+        return client
+
+    async def awarm_up(self) -> dict:
+        """连接数据库并创建当前事件循环的Kimi客户端，供长期运行的服务在启动时调用"""
+        db_result = await asyncio.to_thread(self._ensure_connected)
+        self._get_async_client()
+        return db_result
+
+    async def aclose(self):
+        """关闭异步Kimi客户端"""
+        clients, self._async_clients = list(self._async_clients.values()), {}
+        for client in clients:
+            await client.close()
+
+    async def _acreate_completion(self, messages: List[Any], stream: bool,
+                                  on_token: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """调用Kimi模型，返回 {"finish_reason", "content", "tool_calls"}；stream为True时边生成边回调on_token
+
+        请求前经过共享限流器排队；限流、服务端错误和连接错误按重试策略重试，429时遵守Retry-After。
+        """
+        client = self._get_async_client()
+        # 先按配额排队再发请求，避免触发服务端限流
+        estimated_tokens = estimate_tokens([messages, self.available_tools])
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                response = await client.chat.completions.create(
+                    model=KIMI_MODEL,  # 使用Kimi K2模型
+                    messages=messages,
+                    temperature=0.3,
+                    tools=self.available_tools,
+                    tool_choice="auto",
+                    stream=stream
+                )
+                if stream:
+                    reply = await self._collect_stream(response, on_token)
+                else:
+                    choice = response.choices[0]
+                    reply = {
+                        "finish_reason": choice.finish_reason,
+                        "content": choice.message.content,
+                        "tool_calls": [
+                            {
+                                "id": tool_call.id,
+                                "type": "function",
+                                "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+                            }
+                            for tool_call in choice.message.tool_calls or []
+                        ],
+                        "usage": getattr(getattr(response, "usage", None), "total_tokens", None)
+                    }
+                self.rate_limiter.record_usage(estimated_tokens, reply.pop("usage"))
+                return reply
+            except Exception as e:
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                delay = self.retry_policy.delay(attempt, retry_after_seconds(e))
+                attempt += 1
+                if status_code_of(e) == 429:
+                    # 配额用尽时共享限流器的所有调用一起暂停
+                    print(f"⏳ Kimi API限制，等待 {delay:.1f} 秒后重试... (重试 {attempt}/{self.retry_policy.max_retries})")
+                    self.rate_limiter.pause(delay)
+                else:
+                    print(f"⏳ Kimi API调用失败，等待 {delay:.1f} 秒后重试... (重试 {attempt}/{self.retry_policy.max_retries}): {str(e)}")
+                    await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _collect_stream(response, on_token: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        """拼接流式返回的文本和工具调用片段，文本片段到达时回调on_token"""
+        content_parts: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        finish_reason = None
+        usage = None
+        async for chunk in response:
+            # 用量通常随最后一个片段返回，位置因服务而异
+            chunk_usage = getattr(chunk, "usage", None) or (getattr(chunk.choices[0], "usage", None) if chunk.choices else None)
+            if chunk_usage:
+                usage = chunk_usage.get("total_tokens") if isinstance(chunk_usage, dict) else getattr(chunk_usage, "total_tokens", None)
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if delta.content:
+                content_parts.append(delta.content)
+                if on_token:
+                    on_token(delta.content)
+            # 工具调用按index分片到达：第一片带id和名称，后续片段只追加参数
+            for fragment in delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(fragment.index, {
+                    "id": None, "type": "function", "function": {"name": "", "arguments": ""}
+                })
+                if fragment.id:
+                    tool_call["id"] = fragment.id
+                if fragment.function:
+                    if fragment.function.name:
+                        tool_call["function"]["name"] += fragment.function.name
+                    if fragment.function.arguments:
+                        tool_call["function"]["arguments"] += fragment.function.arguments
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+        return {
+            "finish_reason": finish_reason,
+            "content": "".join(content_parts) or None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)],
+            "usage": usage
+        }
+
+    async def _alookup_cache(self, user_command: str) -> Optional[Dict[str, Any]]:
+        """查找相似问题的缓存回答"""
+        if self.response_cache is None:
+            return None
+        db_result = await asyncio.to_thread(self._ensure_connected)
+        if not db_result.get("success", False):
+            return None
+        return await asyncio.to_thread(self.response_cache.lookup, user_command)
+
+    async def _arecord_grounding(self, tool_calls: List[Dict[str, Any]], grounding: Dict[str, int]):
+        """记录工具调用读取的集合在读取前的版本号，缓存的回答以此判断是否过期"""
+        names = []
+        for tool_call in tool_calls:
+            try:
+                collection_name = json.loads(tool_call["function"]["arguments"] or "{}").get("collection_name")
+            except (TypeError, ValueError, AttributeError):
+                continue
+            if isinstance(collection_name, str) and collection_name:
+                names.append(collection_name)
+        if names:
+            versions = await asyncio.to_thread(self.vector_db.collection_versions, names)
+            for name, version in versions.items():
+                grounding.setdefault(name, version)
+
+    @staticmethod
+    def _tool_succeeded(tool_message: Dict[str, Any]) -> bool:
+        """tool消息中的结果是否成功"""
+        try:
+            return bool(json.loads(tool_message["content"]).get("success", False))
+        except (TypeError, ValueError, AttributeError):
+            return False
+
+    async def aexecute_command(self, user_command: str, stream: bool = None,
+                               on_token: Optional[Callable[[str], None]] = None,
+                               history: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        异步执行用户命令
+        
+        Args:
+            user_command: 用户命令
+            stream: 是否流式输出模型回复，默认使用配置KIMI_STREAMING
+            on_token: 流式输出时每个文本片段的回调，默认直接打印
+            history: 多轮对话时之前各轮的消息（不含系统提示词），成功回答后本轮的消息会追加到其中
+            
+        Returns:
+            模型的最终回复
+        """
+        stream = KIMI_STREAMING if stream is None else stream
+        if stream and on_token is None:
+            on_token = lambda token: print(token, end="", flush=True)
         print(f"\n📝 用户命令: {user_command}")
         print("=" * 60)
         
+        # 相似的问题已有回答，且依据的集合没有变化时直接返回；多轮对话中的问题可能依赖上文，不使用缓存
+        history = [] if history is None else history
+        cached = await self._alookup_cache(user_command) if not history else None
+        if cached is not None:
+            print(f"⚡ 命中回答缓存（相似度 {cached['similarity']:.3f}，原问题: {cached['command']}）")
+            if stream:
+                on_token(cached["answer"])
+                print("\n🎯 任务完成")
+            else:
+                print(f"🎯 任务完成: {cached['answer']}")
+            history.extend([{"role": "user", "content": user_command}, {"role": "assistant", "content": cached["answer"]}])
+            return cached["answer"]
+        # 回答依据的集合及其版本号；调用了写入类工具或有工具失败时不缓存
+        grounding: Dict[str, int] = {}
+        cacheable = self.response_cache is not None and not history
+        
         # 准备对话消息
         messages = [
-            {
-                "role": "system",
-                "content": """你是一个智能助手，可以帮助用户管理向量数据库和回答问题。
-    智能决策原则：
-    1. 优先考虑回答速度和质量，选择最优的回答方式
-    2. 对于通用知识问题，直接使用你的知识快速回答
-    3. 只在以下情况使用数据库搜索：
-    - 用户明确要求搜索数据库中的内容
-    - 问题涉及用户上传的特定文档或专业资料
-    - 需要查找具体的、专门的信息时
-    4. 你可以处理文件上传、数据库管理等任务
-    5. 始终以提供最快速、最准确的答案为目标
-    重要提醒：
-    - 在执行任何数据库操作之前，请先调用 connect_database 连接数据库
-    - 如果遇到API限制错误，系统会自动重试，请耐心等待
-    记住：不要为了使用工具而使用工具，而要以最优的方式解决用户的问题。"""
-            },
-            {
-                "role": "user",
-                "content": user_command
-            }
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *history,
+            {"role": "user", "content": user_command}
         ]
         
         # 开始对话和工具调用循环
         while True:
             try:
-                # 调用Kimi模型 - 添加重试机制处理API限制
-                max_retries = 5
-                retry_delay = 20  # 秒
-                for attempt in range(max_retries):
-                    try:
-                        response = self.kimi_client.chat.completions.create(
-                            model="kimi-k2-0711-preview",  # 使用Kimi K2模型
-                            messages=messages,
-                            temperature=0.3,
-                            tools=self.available_tools,
-                            tool_choice="auto"
-                        )
-                        break  # 成功则跳出重试循环
-                    except Exception as e:
-                        if "rate_limit" in str(e).lower() or "429" in str(e) and attempt < max_retries - 1:
-                            print(f"⏳ Kimi API限制，等待 {retry_delay} 秒后重试... (尝试 {attempt + 1}/{max_retries})")
-                            time.sleep(retry_delay)
-                            retry_delay *= 1.5  # 适度增加延迟
-                            continue
-                        else:
-                            raise e
-                else:
-                    raise Exception("调用Kimi API失败：超过最大重试次数")
-                    
-                choice = response.choices[0]
+                # messages保存截断后的完整结果，发送前压缩早期的工具结果
+                reply = await self._acreate_completion(self.context.compact(messages), stream, on_token)
                 
                 # 如果需要调用工具
-                if choice.finish_reason == "tool_calls":
-                    messages.append(choice.message)
-                    
-                    # 执行每个工具调用
-                    for tool_call in choice.message.tool_calls:
-                        tool_name = tool_call.function.name
-                        tool_args = json.loads(tool_call.function.arguments)
-                        print(f"🔧 调用工具: {tool_name}")
-                        print(f"📋 参数: {tool_args}")
-                        
-                        # 如果是搜索文档，确保使用正确的集合名称
-                        if tool_name == "search_documents":
-                            # 先连接数据库
-                            db_result = self.vector_db.connect_database()
-                            if not db_result.get("success", False):
-                                error_msg = f"❌ 错误: 无法连接到数据库: {db_result.get('message', '未知错误')}"
-                                print(error_msg)
-                                messages.append({
-                                    "role": "tool",
-                                    "tool_call_id": tool_call.id,
-                                    "name": tool_name,
-                                    "content": json.dumps({"success": False, "message": error_msg})
-                                })
-                                continue
-                            
-                            # 获取所有集合
-                            collections_result = self.vector_db.list_all_collections()
-                            if not collections_result.get("success", False):
-                                error_msg = f"❌ 错误: 无法获取集合列表: {collections_result.get('message', '未知错误')}"
-                                print(error_msg)
-                                messages.append({
-                                    "role": "tool",
-                                    "tool_call_id": tool_call.id,
-                                    "name": tool_name,
-                                    "content": json.dumps({"success": False, "message": error_msg})
-                                })
-                                continue
-                            
-                            # 查找目标集合（带前缀）
-                            available_collections = collections_result.get("collections", [])
-                            print(f"可用集合: {available_collections}")
-                            
-                            target_collection = tool_args["collection_name"]
-                            
-                            # 自动添加前缀
-                            from utils.config import MILVUS_COLLECTION_PREFIX
-                            prefixed_collection = f"{MILVUS_COLLECTION_PREFIX}{target_collection}"
-                            
-                            # 如果目标集合不在列表中，但带前缀的在，使用带前缀的
-                            if target_collection not in available_collections and prefixed_collection in available_collections:
-                                print(f"使用集合: {prefixed_collection} 替代 {target_collection}")
-                                tool_args["collection_name"] = prefixed_collection  # 直接使用带前缀的名称
-                            
-                            # 如果是查询sample_data，确保使用正确的名称
-                            if target_collection == "sample_data" and "kimi_agent_sample_data" in available_collections:
-                                print(f"使用集合: kimi_agent_sample_data (已有前缀)")
-                                tool_args["collection_name"] = "kimi_agent_sample_data"
-                        
-                        # 执行工具
-                        result = self._execute_tool(tool_name, tool_args)
-                        print(f"✅ 结果: {result}")
-                        print("-" * 40)
-                        
-                        # 向量搜索无结果时，对于搜索操作，尝试直接获取集合内容
-                        if tool_name == "search_documents" and result.get("success", False) and len(result.get("results", [])) == 0:
-                            print("向量搜索没有找到结果，尝试直接获取集合内容...")
-                            collection_name = tool_args["collection_name"]
-                            content_result = self._execute_tool("get_collection_content", {"collection_name": collection_name})
-                            
-                            if content_result.get("success", False) and content_result.get("count", 0) > 0:
-                                print(f"找到集合内容: {content_result.get('count')} 个文档")
-                                # 将集合内容添加到result中
-                                result["collection_content"] = content_result.get("documents", [])
-                                result["message"] = "向量搜索未找到结果，但集合中存在文档"
-                        
-                        # 将工具结果添加到对话
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "name": tool_name,
-                            "content": json.dumps(result)
-                        })
+                if reply["finish_reason"] == "tool_calls":
+                    if stream and reply["content"]:
+                        print()
+                    messages.append({
+                        "role": "assistant",
+                        "content": reply["content"] or "",
+                        "tool_calls": reply["tool_calls"]
+                    })
+                    cacheable = cacheable and all(
+                        tool_call["function"]["name"] in CACHEABLE_TOOLS for tool_call in reply["tool_calls"]
+                    )
+                    if cacheable:
+                        await self._arecord_grounding(reply["tool_calls"], grounding)
+                    # 执行工具调用，互不依赖的并发执行，结果按原顺序写回对话
+                    tool_messages = await self._arun_tool_calls(reply["tool_calls"])
+                    cacheable = cacheable and all(self._tool_succeeded(message) for message in tool_messages)
+                    messages.extend(tool_messages)
                 # 如果完成了任务
                 else:
-                    final_response = choice.message.content
-                    print(f"🎯 任务完成: {final_response}")
+                    final_response = reply["content"]
+                    if stream:
+                        print("\n🎯 任务完成")
+                    else:
+                        print(f"🎯 任务完成: {final_response}")
+                    if cacheable and final_response:
+                        await asyncio.to_thread(self.response_cache.store, user_command, final_response, grounding)
+                    history.extend(messages[len(history) + 1:])
+                    history.append({"role": "assistant", "content": final_response or ""})
                     return final_response
                     
             except Exception as e:
                 error_msg = f"执行出错: {str(e)}"
                 print(f"❌ {error_msg}")
-                return error_msg
\ No newline at end of file
+                return error_msg
+
+    def execute_command(self, user_command: str, stream: bool = None) -> str:
+        """执行用户命令，aexecute_command 的同步版本，不能在运行中的事件循环里调用"""
+        return asyncio.run(self.aexecute_command(user_command, stream=stream))
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 智能向量数据库助手 - HTTP服务模式
+
+长期运行的异步服务：进程内只创建一个智能助手，Kimi客户端、嵌入客户端和Milvus连接在启动时建立并一直复用；
+每个会话保存自己的对话消息，不同会话的请求并发处理，同一会话的请求按顺序处理。
+
+    python kimi-k2-milvus/service.py --port 8080
+
+接口:
+    POST   /sessions                      创建会话，返回 session_id
+    POST   /sessions/{session_id}/chat    发送消息 {"message": "...", "stream": false}；stream为true时以SSE返回文本片段
+    DELETE /sessions/{session_id}         删除会话
+    GET    /metrics                       吞吐量、延迟、缓存和限流统计
+    GET    /health                        健康检查
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+# 导入本地模块
+from models.smart_assistant import SmartAssistant
+from utils.config import (
+    KIMI_API_KEY, OPENAI_API_KEY, SERVICE_HOST, SERVICE_PORT,
+    SERVICE_SESSION_TTL, SERVICE_MAX_SESSIONS, SERVICE_HISTORY_TURNS
+)
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("Service")
+
+
+class Session:
+    """一个用户会话：之前各轮的对话消息，以及保证同一会话请求按顺序处理的锁"""
+
+    def __init__(self, session_id: str):
+        """初始化会话"""
+        self.session_id = session_id
+        self.history: List[Dict[str, Any]] = []
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self.turns = 0
+
+    def trim_history(self, max_turns: int):
+        """只保留最近max_turns轮对话，按用户消息划分轮次"""
+        user_indexes = [index for index, message in enumerate(self.history) if message.get("role") == "user"]
+        if max_turns > 0 and len(user_indexes) > max_turns:
+            del self.history[:user_indexes[-max_turns]]
+
+
+class SessionStore:
+    """会话存储，超过空闲时间或数量上限时淘汰最久未使用的会话"""
+
+    def __init__(self, ttl: float, max_sessions: int):
+        """初始化会话存储"""
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def _evict(self, reserve: int = 0):
+        """淘汰过期和超出数量上限的会话，reserve为即将加入的会话数，正在处理请求的会话不淘汰"""
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            expired = self.ttl and now - session.last_active > self.ttl
+            if (expired or len(self._sessions) + reserve > self.max_sessions) and not session.lock.locked():
+                del self._sessions[session_id]
+
+    def create(self) -> Session:
+        """创建新会话"""
+        self._evict(reserve=1)
+        session = Session(uuid.uuid4().hex)
+        self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """取得会话并标记为最近使用，不存在或已过期时返回None"""
+        self._evict()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_active = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        """删除会话"""
+        return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class ServiceMetrics:
+    """请求计数、处理中的请求数，以及最近一段时间内的吞吐量和延迟分位数"""
+
+    def __init__(self, window: float = 60.0, max_samples: int = 10000):
+        """初始化统计，window为计算吞吐量和延迟分位数的时间窗口（秒）"""
+        self.window = window
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._samples: deque = deque(maxlen=max_samples)
+
+    def record(self, seconds: float, success: bool):
+        """记录一次完成的请求"""
+        self.requests += 1
+        if not success:
+            self.errors += 1
+        self._samples.append((time.monotonic(), seconds))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前统计"""
+        now = time.monotonic()
+        recent = sorted(seconds for finished, seconds in self._samples if now - finished <= self.window)
+        window = min(self.window, now - self.started_at) or 1e-9
+
+        def percentile(p: float) -> Optional[float]:
+            if not recent:
+                return None
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1)
+
+        return {
+            "uptime_seconds": round(now - self.started_at, 1),
+            "requests_total": self.requests,
+            "errors_total": self.errors,
+            "in_flight": self.in_flight,
+            "window_seconds": self.window,
+            "throughput_rps": round(len(recent) / window, 3),
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(recent[-1] * 1000, 1) if recent else None,
+            },
+        }
+
+
+def json_error(status: int, message: str) -> web.Response:
+    """返回JSON格式的错误"""
+    return web.json_response({"success": False, "message": message}, status=status)
+
+
+async def on_startup(app: web.Application):
+    """启动时创建智能助手并建立连接，之后所有请求共用"""
+    assistant = SmartAssistant(app["kimi_api_key"], app["openai_api_key"])
+    db_result = await assistant.awarm_up()
+    if not db_result.get("success", False):
+        raise RuntimeError(db_result.get("message", "连接数据库失败"))
+    app["assistant"] = assistant
+    logger.info("服务已启动，Kimi客户端、嵌入客户端和Milvus连接已就绪")
+
+
+async def on_cleanup(app: web.Application):
+    """关闭Kimi异步客户端"""
+    assistant: SmartAssistant = app.get("assistant")
+    if assistant is not None:
+        await assistant.aclose()
+
+
+async def create_session(request: web.Request) -> web.Response:
+    session = request.app["sessions"].create()
+    return web.json_response({"success": True, "session_id": session.session_id}, status=201)
+
+
+async def delete_session(request: web.Request) -> web.Response:
+    if not request.app["sessions"].delete(request.match_info["session_id"]):
+        return json_error(404, "会话不存在或已过期")
+    return web.json_response({"success": True})
+
+
+async def chat(request: web.Request) -> web.StreamResponse:
+    session: Optional[Session] = request.app["sessions"].get(request.match_info["session_id"])
+    if session is None:
+        return json_error(404, "会话不存在或已过期")
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return json_error(400, "请求体必须是JSON")
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return json_error(400, "缺少 message")
+    stream = bool(body.get("stream", False))
+
+    assistant: SmartAssistant = request.app["assistant"]
+    metrics: ServiceMetrics = request.app["metrics"]
+    # 延迟包括在同一会话的前一个请求之后排队的时间
+    metrics.in_flight += 1
+    started = time.perf_counter()
+    success = False
+    try:
+        async with session.lock:
+            history_length = len(session.history)
+            if stream:
+                response = await stream_answer(request, assistant, session, message)
+            else:
+                answer = await assistant.aexecute_command(message, stream=False, history=session.history)
+                response = web.json_response({
+                    "success": len(session.history) > history_length,
+                    "session_id": session.session_id,
+                    "answer": answer,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+                })
+            # 出错时aexecute_command不写入历史
+            success = len(session.history) > history_length
+            if success:
+                session.turns += 1
+                session.trim_history(request.app["history_turns"])
+            return response
+    finally:
+        metrics.in_flight -= 1
+        metrics.record(time.perf_counter() - started, success)
+
+
+async def stream_answer(request: web.Request, assistant: SmartAssistant, session: Session, message: str) -> web.StreamResponse:
+    """以SSE返回模型生成的文本片段，最后一个事件为完整回答"""
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    tokens: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(assistant.aexecute_command(
+        message, stream=True, on_token=tokens.put_nowait, history=session.history
+    ))
+    task.add_done_callback(lambda _: tokens.put_nowait(None))
+    # 客户端断开后仍然把这一轮执行完，会话历史保持完整
+    connected = True
+    while True:
+        token = await tokens.get()
+        if token is None:
+            break
+        if connected:
+            try:
+                await response.write(f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n".encode("utf-8"))
+            except ConnectionResetError:
+                connected = False
+    answer = await task
+    if connected:
+        try:
+            await response.write(f"event: done\ndata: {json.dumps({'answer': answer}, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await response.write_eof()
+        except ConnectionResetError:
+            pass
+    return response
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    assistant: SmartAssistant = request.app["assistant"]
+    return web.json_response({
+        **request.app["metrics"].snapshot(),
+        "sessions": len(request.app["sessions"]),
+        "rate_limiter": assistant.rate_limiter.stats,
+        "response_cache": assistant.response_cache.stats if assistant.response_cache else None,
+        "embedding": assistant.vector_db.embedding_engine.stats,
+        "context": assistant.context.stats,
+    })
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"success": True, "sessions": len(request.app["sessions"])})
+
+
+def create_app(kimi_api_key: str = None, openai_api_key: str = None, session_ttl: float = None,
+               max_sessions: int = None, history_turns: int = None) -> web.Application:
+    """创建服务应用"""
+    app = web.Application()
+    app["kimi_api_key"] = kimi_api_key or KIMI_API_KEY
+    app["openai_api_key"] = openai_api_key or OPENAI_API_KEY
+    app["sessions"] = SessionStore(
+        SERVICE_SESSION_TTL if session_ttl is None else session_ttl,
+        SERVICE_MAX_SESSIONS if max_sessions is None else max_sessions
+    )
+    app["history_turns"] = SERVICE_HISTORY_TURNS if history_turns is None else history_turns
+    app["metrics"] = ServiceMetrics()
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/sessions", create_session)
+    app.router.add_delete("/sessions/{session_id}", delete_session)
+    app.router.add_post("/sessions/{session_id}/chat", chat)
+    app.router.add_get("/metrics", metrics_handler)
+    app.router.add_get("/health", health)
+    return app
+
+
+def main():
+    """启动服务"""
+    parser = argparse.ArgumentParser(description="Kimi K2 智能向量数据库助手 HTTP 服务")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+
+    # 创建数据目录
+    os.makedirs("kimi-k2-milvus/data", exist_ok=True)
+    os.makedirs("kimi-k2-milvus/data/downloads", exist_ok=True)
+
+    # 检查API密钥
+    if not KIMI_API_KEY or not OPENAI_API_KEY:
+        print("❌ 错误: API密钥未设置，请在.env文件中配置MOONSHOT_API_KEY和OPENAI_API_KEY")
+        return
+
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+# 测试直接导入项目模块（utils、models、service）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import vector_database  # noqa: E402
+from utils.embedding_engine import EmbeddingEngine  # noqa: E402
+from utils.metadata_store import CollectionMetadataStore  # noqa: E402
+from utils.vector_database import VectorDatabase  # noqa: E402
+
+
+def fake_embedding(text: str, dimension: int = 1536) -> list:
+    """词袋向量：每个词哈希到一个维度，只差几个词的文本余弦相似度高"""
+    vector = np.zeros(dimension, dtype=np.float32)
+    vector[0] = 0.01
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % dimension] += 1.0
+    return vector.tolist()
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.inputs = []
+
+    def create(self, model, input):
+        self.inputs.extend(input)
+        data = [type("Item", (), {"index": index, "embedding": fake_embedding(text)})() for index, text in enumerate(input)]
+        return type("Response", (), {"data": data})()
+
+
+class FakeOpenAI:
+    """替代openai.OpenAI，只提供嵌入接口"""
+
+    def __init__(self, *args, **kwargs):
+        self.embeddings = FakeEmbeddings()
+
+
+@pytest.fixture
+def vector_db(tmp_path, monkeypatch):
+    """连接到临时目录中Milvus Lite的VectorDatabase，嵌入缓存和元数据只保存在内存中"""
+    # connect_database使用相对路径 ./kimi-k2-milvus/kimi_agent.db
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "kimi-k2-milvus").mkdir()
+    monkeypatch.setattr(vector_database, "OpenAI", FakeOpenAI)
+    db = VectorDatabase("test-key")
+    db.embedding_engine = EmbeddingEngine(db.openai_client, cache_path="")
+    db.metadata_store = CollectionMetadataStore("")
+    assert db.connect_database()["success"]
+    yield db
+    db.milvus_client.close()
@@ -0,0 +1,80 @@
+import json
+
+from utils.context_compactor import ContextCompactor
+from utils.rate_limiter import estimate_tokens
+
+
+def tool_round(compactor, round_index, documents):
+    call_id = f"call-{round_index}"
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": call_id, "type": "function", "function": {"name": "search_collection", "arguments": "{}"}}
+        ]},
+        compactor.tool_message(call_id, "search_collection", {
+            "success": True, "message": f"round {round_index}", "results": [{"text": text, "distance": 0.1} for text in documents]
+        }),
+    ]
+
+
+def conversation(compactor, rounds, document_chars=600):
+    messages = [{"role": "system", "content": "system"}, {"role": "user", "content": "question"}]
+    for round_index in range(rounds):
+        messages += tool_round(compactor, round_index, [f"round {round_index} doc {i} " + "x" * document_chars for i in range(3)])
+    return messages
+
+
+def contents(messages):
+    return [json.loads(message["content"]) for message in messages if message.get("role") == "tool"]
+
+
+def test_cap_result_truncates_documents_and_omits_the_rest():
+    compactor = ContextCompactor(document_max_chars=100, tool_token_caps={"search_collection": 80})
+    result = {"success": True, "message": "ok", "results": [{"text": "y" * 500} for _ in range(10)]}
+    capped = compactor.cap_result("search_collection", result)
+    assert all(len(item["text"]) <= 101 for item in capped["results"])
+    assert len(capped["results"]) + capped["omitted_documents"] == 10
+    assert capped["omitted_documents"] > 0
+    # 传入的结果不被修改
+    assert len(result["results"]) == 10
+
+
+def test_older_rounds_are_summarized_and_recent_rounds_kept():
+    compactor = ContextCompactor(token_budget=1_000_000, keep_recent_rounds=2)
+    messages = conversation(compactor, 4)
+    compacted = compactor.compact(messages)
+    results = contents(compacted)
+    assert [result.get("compacted", False) for result in results] == [True, True, False, False]
+    assert results[0]["results_count"] == 3
+    assert results[0]["message"] == "round 0"
+    # 原消息列表不被修改
+    assert contents(messages)[0]["results"][0]["text"].startswith("round 0")
+
+
+def test_budget_summarizes_recent_rounds_but_always_keeps_the_last():
+    compactor = ContextCompactor(token_budget=500, keep_recent_rounds=3)
+    messages = conversation(compactor, 3)
+    compacted = compactor.compact(messages)
+    results = contents(compacted)
+    assert [result.get("compacted", False) for result in results] == [True, True, False]
+    assert compactor.stats["summarized_results"] == 2
+    assert compactor.stats["prompt_tokens"] == estimate_tokens(compacted)
+
+
+def test_fits_budget_without_summarizing():
+    compactor = ContextCompactor(token_budget=1_000_000, keep_recent_rounds=3)
+    messages = conversation(compactor, 3)
+    compacted = compactor.compact(messages)
+    assert compacted == messages
+    assert compactor.stats["summarized_results"] == 0
+
+
+def test_duplicate_documents_are_replaced_with_references():
+    compactor = ContextCompactor(token_budget=1_000_000, keep_recent_rounds=2)
+    shared = "shared document " + "z" * 200
+    messages = [{"role": "user", "content": "question"}]
+    messages += tool_round(compactor, 0, [shared, "unique one " + "a" * 100])
+    messages += tool_round(compactor, 1, [shared])
+    results = contents(compactor.compact(messages))
+    assert results[0]["results"][0]["text"] == shared
+    assert results[1]["results"][0]["text"].startswith("[重复内容，同 call-0")
+    assert compactor.stats["deduplicated_documents"] == 1
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from utils.ingestion import run_ingestion_pipeline
+
+
+def make_chunks(count):
+    return ((index * 10, f"chunk {index}") for index in range(count))
+
+
+def run_in_thread(target, timeout=10):
+    """在线程中运行，超时说明流水线卡住了"""
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = target()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "ingestion pipeline did not finish"
+    return result
+
+
+def test_pipeline_writes_batches_in_order():
+    written = []
+    progress = []
+    stats = run_ingestion_pipeline(
+        make_chunks(10),
+        embed=lambda texts: [len(text) for text in texts],
+        write=lambda batch, vectors: written.extend(item[0] for item in batch) or len(batch),
+        batch_size=3,
+        queue_size=1,
+        on_batch_written=progress.append,
+    )
+    assert written == [index * 10 for index in range(10)]
+    assert progress == [3, 6, 9, 10]
+    assert stats == {"chunk_count": 10, "skipped_chunks": 0, "insert_count": 10}
+
+
+def test_pipeline_skips_committed_chunks():
+    written = []
+    stats = run_ingestion_pipeline(
+        make_chunks(5),
+        embed=lambda texts: texts,
+        write=lambda batch, vectors: written.extend(item[0] for item in batch) or len(batch),
+        batch_size=2,
+        queue_size=1,
+        skip_chunks=3,
+    )
+    assert written == [30, 40]
+    assert stats["skipped_chunks"] == 3
+
+
+def test_failing_write_raises_instead_of_hanging():
+    def write(batch, vectors):
+        raise RuntimeError("milvus unavailable")
+
+    # 多个批次和很小的队列，写入失败时上游阶段正阻塞在队列上
+    result = run_in_thread(lambda: run_ingestion_pipeline(
+        make_chunks(50), embed=lambda texts: texts, write=write, batch_size=2, queue_size=1
+    ))
+    assert isinstance(result.get("error"), RuntimeError)
+
+
+def test_failing_write_while_embed_waits_for_chunks():
+    def slow_chunks():
+        yield 0, "first"
+        for index in range(1, 5):
+            time.sleep(0.3)
+            yield index * 10, f"chunk {index}"
+
+    def write(batch, vectors):
+        raise RuntimeError("milvus unavailable")
+
+    # 写入失败时嵌入阶段正在等待下一个批次
+    result = run_in_thread(lambda: run_ingestion_pipeline(
+        slow_chunks(), embed=lambda texts: texts, write=write, batch_size=1, queue_size=1
+    ))
+    assert isinstance(result.get("error"), RuntimeError)
+
+
+def test_failing_embed_raises_instead_of_hanging():
+    def embed(texts):
+        raise ValueError("bad input")
+
+    result = run_in_thread(lambda: run_ingestion_pipeline(
+        make_chunks(50), embed=embed, write=lambda batch, vectors: len(batch), batch_size=2, queue_size=1
+    ))
+    assert isinstance(result.get("error"), ValueError)
+
+
+def test_failing_chunk_iterator_raises():
+    def chunks():
+        yield 0, "first"
+        raise OSError("file vanished")
+
+    with pytest.raises(OSError):
+        run_ingestion_pipeline(chunks(), embed=lambda texts: texts, write=lambda batch, vectors: len(batch),
+                               batch_size=1, queue_size=1)
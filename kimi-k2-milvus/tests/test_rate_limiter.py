@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.rate_limiter import RateLimiter, RetryPolicy, TokenBucket, is_retryable, retry_after_seconds
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(str(status_code))
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+def test_token_bucket_queues_reservations_in_order():
+    bucket = TokenBucket(60)  # 每秒补充一个
+    now = 100.0
+    bucket.updated = now
+    bucket.level = 2
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == 0
+    # 余额为负后，后到的调用等待时间依次累加
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+    assert bucket.reserve(1, now) == pytest.approx(2.0)
+    assert bucket.reserve(1, now + 2.0) == pytest.approx(1.0)
+
+
+def test_token_bucket_refund_and_oversized_requests():
+    bucket = TokenBucket(600)
+    now = bucket.updated
+    # 超过容量的请求按容量计算，不会永远等待
+    assert bucket.reserve(10_000, now) == 0
+    assert bucket.level == 0
+    bucket.refund(300, now)
+    assert bucket.level == 300
+    bucket.refund(10_000, now)
+    assert bucket.level == bucket.capacity
+
+
+def test_rate_limiter_releases_calls_in_arrival_order():
+    limiter = RateLimiter(requests_per_minute=600)  # 每0.1秒一个
+    limiter._requests.level = 1
+    order = []
+
+    async def call(index):
+        await limiter.acquire()
+        order.append(index)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*[call(index) for index in range(4)])
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+    assert order == [0, 1, 2, 3]
+    assert 0.25 <= elapsed < 1.0
+    assert limiter.stats["requests"] == 4
+    assert limiter.stats["throttled"] == 3
+
+
+def test_pause_holds_every_caller():
+    limiter = RateLimiter()
+    limiter.pause(0.2)
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(limiter.acquire(), limiter.acquire())
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.18
+    assert limiter.stats["pauses"] == 1
+
+
+def test_record_usage_refunds_overestimates():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    assert limiter.reserve(800) == 0
+    # 实际只用了200个token，退回的600个可供下一个请求使用
+    limiter.record_usage(800, 200)
+    assert limiter.reserve(700) == 0
+    assert limiter.reserve(300) > 0
+    # 没有usage时不修正
+    limiter.record_usage(300, None)
+
+
+def test_retry_policy_respects_retry_after_and_error_kind():
+    policy = RetryPolicy(max_retries=2, base_delay=0.5, max_delay=10)
+    rate_limited = StatusError(429, {"retry-after": "3"})
+    assert retry_after_seconds(rate_limited) == 3.0
+    assert 3.0 <= policy.delay(0, retry_after_seconds(rate_limited)) <= 3.5
+    assert policy.should_retry(rate_limited, 1)
+    assert not policy.should_retry(rate_limited, 2)
+    assert not policy.should_retry(StatusError(400), 0)
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError())
+    assert all(0 < policy.delay(attempt) <= 10 for attempt in range(10))
@@ -0,0 +1,71 @@
+from utils.response_cache import ResponseCache, mentions_collections
+
+QUESTION = "Summarize what the documents in collection {} say about quarterly revenue growth and the main risks mentioned"
+
+
+def cache_size(vector_db, cache):
+    rows = vector_db.milvus_client.query(collection_name=cache.collection_name, filter="", output_fields=["count(*)"])
+    return rows[0]["count(*)"]
+
+
+def similarity(vector_db, cache, command):
+    vector = vector_db.generate_embeddings([command])[0]
+    return vector_db.milvus_client.search(collection_name=cache.collection_name, data=[vector], limit=1)[0][0]["distance"]
+
+
+def make_cache(vector_db, threshold=0.9):
+    for name in ("alpha", "beta"):
+        assert vector_db.create_collection(name)["success"]
+    return ResponseCache(vector_db, threshold=threshold, ttl=0)
+
+
+def test_exact_command_hits_after_normalizing_whitespace(vector_db):
+    cache = make_cache(vector_db)
+    assert cache.store(QUESTION.format("alpha"), "alpha answer", vector_db.collection_versions(["alpha"]))
+    hit = cache.lookup("  " + QUESTION.format("alpha").replace(" ", "   ") + " ")
+    assert hit["answer"] == "alpha answer"
+    assert hit["similarity"] == 1.0
+
+
+def test_near_duplicate_about_another_collection_misses(vector_db):
+    cache = make_cache(vector_db)
+    assert cache.store(QUESTION.format("alpha"), "alpha answer", vector_db.collection_versions(["alpha"]))
+    # 两个问题只差集合名称，向量相似度超过阈值
+    assert similarity(vector_db, cache, QUESTION.format("beta")) >= cache.threshold
+    assert cache.lookup(QUESTION.format("beta")) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_near_duplicate_about_the_same_collection_hits(vector_db):
+    cache = make_cache(vector_db)
+    assert cache.store(QUESTION.format("alpha"), "alpha answer", vector_db.collection_versions(["alpha"]))
+    hit = cache.lookup(QUESTION.format("alpha") + " please")
+    assert hit["answer"] == "alpha answer"
+    assert 0.9 <= hit["similarity"] < 1.0
+
+
+def test_writing_to_a_grounding_collection_invalidates_the_entry(vector_db):
+    cache = make_cache(vector_db)
+    assert cache.store(QUESTION.format("alpha"), "alpha answer", vector_db.collection_versions(["alpha"]))
+    # 写入其他集合不影响
+    assert vector_db.add_documents("beta", ["beta document"])["success"]
+    assert cache.lookup(QUESTION.format("alpha"))["answer"] == "alpha answer"
+
+    assert vector_db.add_documents("alpha", ["new alpha document"])["success"]
+    assert cache.lookup(QUESTION.format("alpha")) is None
+    assert cache.stats["invalidated"] == 1
+    # 失效的记录已删除
+    assert cache_size(vector_db, cache) == 0
+
+
+def test_cache_collection_is_hidden_from_collection_listing(vector_db):
+    cache = make_cache(vector_db)
+    cache.store("question", "answer", {})
+    assert cache.collection_name not in vector_db.list_all_collections()["collections"]
+
+
+def test_collection_names_must_appear_as_whole_names():
+    versions = {"kimi_agent_papers": 1}
+    assert mentions_collections("What do the Papers say?", versions)
+    assert not mentions_collections("What do the papers_2024 say?", versions)
+    assert mentions_collections("任意问题", {})
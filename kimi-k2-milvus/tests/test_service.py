@@ -0,0 +1,133 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import service
+from service import ServiceMetrics, Session, SessionStore
+
+
+def test_store_evicts_least_recently_used_sessions():
+    store = SessionStore(ttl=0, max_sessions=2)
+    first = store.create()
+    second = store.create()
+    # 使用过的会话移到末尾，最久未使用的是second
+    assert store.get(first.session_id) is first
+    store.create()
+    assert len(store) == 2
+    assert store.get(second.session_id) is None
+    assert store.get(first.session_id) is first
+
+
+def test_store_expires_idle_sessions():
+    store = SessionStore(ttl=60, max_sessions=10)
+    idle = store.create()
+    active = store.create()
+    idle.last_active = time.monotonic() - 61
+    assert store.get(idle.session_id) is None
+    assert store.get(active.session_id) is active
+    assert len(store) == 1
+
+
+def test_store_keeps_sessions_with_requests_in_flight():
+    store = SessionStore(ttl=60, max_sessions=1)
+
+    async def run():
+        busy = store.create()
+        busy.last_active = time.monotonic() - 61
+        async with busy.lock:
+            # 正在处理请求的会话既不过期也不因数量上限被淘汰
+            other = store.create()
+            assert store.get(busy.session_id) is busy
+        return busy, other
+
+    busy, other = asyncio.run(run())
+    assert store.get(other.session_id) is None
+    assert store.get(busy.session_id) is busy
+
+
+def test_trim_history_keeps_whole_recent_turns():
+    session = Session("s")
+    for turn in range(4):
+        session.history += [
+            {"role": "user", "content": f"q{turn}"},
+            {"role": "assistant", "content": "", "tool_calls": []},
+            {"role": "tool", "content": "{}"},
+            {"role": "assistant", "content": f"a{turn}"},
+        ]
+    session.trim_history(2)
+    assert [message["content"] for message in session.history if message["role"] == "user"] == ["q2", "q3"]
+    assert session.history[0]["role"] == "user"
+
+
+def test_metrics_percentiles():
+    metrics = ServiceMetrics(window=60)
+    for milliseconds in range(1, 101):
+        metrics.record(milliseconds / 1000, success=milliseconds != 100)
+    snapshot = metrics.snapshot()
+    assert snapshot["requests_total"] == 100
+    assert snapshot["errors_total"] == 1
+    assert snapshot["latency_ms"]["p50"] == 51.0
+    assert snapshot["latency_ms"]["p99"] == 100.0
+
+
+class FakeAssistant:
+    """替代SmartAssistant：回答中带上之前的轮数，便于检查会话历史"""
+
+    def __init__(self, *args, **kwargs):
+        self.rate_limiter = SimpleNamespace(stats={})
+        self.response_cache = None
+        self.vector_db = SimpleNamespace(embedding_engine=SimpleNamespace(stats={}))
+        self.context = SimpleNamespace(stats={})
+        self.closed = False
+
+    async def awarm_up(self):
+        return {"success": True}
+
+    async def aclose(self):
+        self.closed = True
+
+    async def aexecute_command(self, user_command, stream=None, on_token=None, history=None):
+        await asyncio.sleep(0.01)
+        answer = f"{user_command} after {len(history)} messages"
+        if stream:
+            for word in answer.split(" "):
+                on_token(word + " ")
+        history.extend([{"role": "user", "content": user_command}, {"role": "assistant", "content": answer}])
+        return answer
+
+
+def test_chat_keeps_history_per_session(monkeypatch):
+    monkeypatch.setattr(service, "SmartAssistant", FakeAssistant)
+
+    async def run():
+        app = service.create_app("kimi-key", "openai-key", session_ttl=0, max_sessions=10, history_turns=1)
+        async with TestClient(TestServer(app)) as client:
+            first = (await (await client.post("/sessions")).json())["session_id"]
+            second = (await (await client.post("/sessions")).json())["session_id"]
+            replies = await asyncio.gather(
+                client.post(f"/sessions/{first}/chat", json={"message": "one"}),
+                client.post(f"/sessions/{second}/chat", json={"message": "two"}),
+            )
+            answers = [(await reply.json())["answer"] for reply in replies]
+            again = await (await client.post(f"/sessions/{first}/chat", json={"message": "three"})).json()
+            # history_turns=1：下一轮只带上一轮的两条消息
+            again_trimmed = await (await client.post(f"/sessions/{first}/chat", json={"message": "four"})).json()
+            streamed = await (await client.post(f"/sessions/{second}/chat", json={"message": "five", "stream": True})).text()
+            missing = await client.post("/sessions/unknown/chat", json={"message": "six"})
+            bad = await client.post(f"/sessions/{first}/chat", json={"message": ""})
+            metrics = await (await client.get("/metrics")).json()
+            deleted = await client.delete(f"/sessions/{first}")
+            return answers, again, again_trimmed, streamed, missing.status, bad.status, metrics, deleted.status, app
+
+    answers, again, again_trimmed, streamed, missing, bad, metrics, deleted, app = asyncio.run(run())
+    assert answers == ["one after 0 messages", "two after 0 messages"]
+    assert again["answer"] == "three after 2 messages" and again["success"]
+    assert again_trimmed["answer"] == "four after 2 messages"
+    assert 'data: {"token": "five "}' in streamed
+    assert 'event: done\ndata: {"answer": "five after 2 messages"}' in streamed
+    assert (missing, bad, deleted) == (404, 400, 200)
+    assert metrics["requests_total"] == 5
+    assert metrics["sessions"] == 2
+    assert app["assistant"].closed
@@ -0,0 +1,36 @@
+import random
+
+
+def make_text(sentence_count):
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu".split()
+    rng = random.Random(0)
+    sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 14))).capitalize() + "." for _ in range(sentence_count)]
+    return " ".join(sentences)
+
+
+def test_inserting_text_at_the_top_only_writes_new_chunks(vector_db, tmp_path):
+    assert vector_db.create_collection("docs")["success"]
+    text = make_text(300)
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+    first = vector_db.upload_file_to_collection(str(path), "docs", chunk_size=500, overlap=50)
+    assert first["success"] and first["insert_count"] == first["chunk_count"] > 20
+
+    path.write_text("A brand new introduction sentence goes here. " + text, encoding="utf-8")
+    second = vector_db.upload_file_to_collection(str(path), "docs", chunk_size=500, overlap=50)
+    assert second["success"]
+    # 只有开头附近的文本块变化，后面的文本块主键和内容都不变
+    assert second["insert_count"] <= 3
+    assert second["unchanged_count"] == second["chunk_count"] - second["insert_count"]
+    assert second["deleted_count"] == first["chunk_count"] - second["unchanged_count"]
+    assert vector_db.milvus_client.query(collection_name=vector_db._resolve_collection("docs"), filter="", output_fields=["count(*)"])[0]["count(*)"] == second["chunk_count"]
+
+
+def test_repeated_chunks_are_kept_separately(vector_db, tmp_path):
+    assert vector_db.create_collection("docs")["success"]
+    path = tmp_path / "doc.txt"
+    path.write_text("Same text here. " * 30, encoding="utf-8")
+    first = vector_db.upload_file_to_collection(str(path), "docs", chunk_size=80, overlap=0)
+    assert first["insert_count"] == first["chunk_count"]
+    second = vector_db.upload_file_to_collection(str(path), "docs", chunk_size=80, overlap=0)
+    assert second["insert_count"] == 0 and second["deleted_count"] == 0
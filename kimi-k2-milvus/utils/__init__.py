@@ -1,3 +1,9 @@
 from .config import *
+from .embedding_engine import EmbeddingEngine
+from .sparse_encoder import SparseEncoder
+from .metadata_store import CollectionMetadataStore
+from .rate_limiter import RateLimiter, RetryPolicy, get_rate_limiter
+from .context_compactor import ContextCompactor
+from .response_cache import ResponseCache
 from .vector_database import VectorDatabase
 from .web_downloader import WebDownloader 
\ No newline at end of file
@@ -10,9 +10,81 @@ KIMI_API_KEY = os.getenv("MOONSHOT_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
 
+# Kimi模型配置
+KIMI_STREAMING = os.getenv("KIMI_STREAMING", "false").lower() == "true"  # 是否流式输出模型回复
+# Kimi接口配额，按账户等级设置，同一进程内的所有助手共享；0表示不限制
+KIMI_RPM = int(os.getenv("KIMI_RPM", "3"))  # 每分钟请求数
+KIMI_TPM = int(os.getenv("KIMI_TPM", "32000"))  # 每分钟token数
+KIMI_MAX_RETRIES = int(os.getenv("KIMI_MAX_RETRIES", "5"))
+KIMI_RETRY_BASE_DELAY = float(os.getenv("KIMI_RETRY_BASE_DELAY", "1.0"))  # 指数退避的初始等待（秒）
+KIMI_RETRY_MAX_DELAY = float(os.getenv("KIMI_RETRY_MAX_DELAY", "60"))  # 单次重试的最长等待（秒）
+
+# 对话上下文配置
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "16000"))  # 发送给模型的消息的token预算
+CONTEXT_KEEP_RECENT_ROUNDS = int(os.getenv("CONTEXT_KEEP_RECENT_ROUNDS", "2"))  # 保留原文的最近工具调用轮数
+TOOL_RESULT_MAX_TOKENS = int(os.getenv("TOOL_RESULT_MAX_TOKENS", "3000"))  # 单个工具结果写入对话的token上限
+TOOL_RESULT_DOCUMENT_MAX_CHARS = int(os.getenv("TOOL_RESULT_DOCUMENT_MAX_CHARS", "2000"))  # 单个文档的字符上限
+# 按工具覆盖 TOOL_RESULT_MAX_TOKENS
+TOOL_RESULT_TOKEN_CAPS = {
+    "get_collection_content": 4000,
+    "read_and_chunk_file": 2000,
+}
+
+# 回答缓存配置：相似的问题直接返回缓存的回答，回答所依据的集合内容变化后失效
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_COLLECTION = "kimi_response_cache"  # 不带项目前缀，不会与文档集合重名
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.98"))  # 命中所需的最小余弦相似度
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # 缓存有效期（秒），0表示不过期
+
+# HTTP服务配置
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+SERVICE_SESSION_TTL = float(os.getenv("SERVICE_SESSION_TTL", "3600"))  # 会话空闲多久后删除（秒），0表示不过期
+SERVICE_MAX_SESSIONS = int(os.getenv("SERVICE_MAX_SESSIONS", "1000"))
+SERVICE_HISTORY_TURNS = int(os.getenv("SERVICE_HISTORY_TURNS", "10"))  # 每个会话保留的对话轮数，0表示不限制
+
 # 数据库配置
 MILVUS_COLLECTION_PREFIX = "kimi_agent_"
 
 # 其他配置
 CHUNK_SIZE = 500
-CHUNK_OVERLAP = 50 
\ No newline at end of file
+CHUNK_OVERLAP = 50
+
+# 嵌入向量配置
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))  # 每个请求的最大文本数
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))  # 并发请求数
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./kimi-k2-milvus/embedding_cache.db")  # 留空则只缓存在内存中
+EMBEDDING_MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", "10000"))  # 内存中最多缓存的向量数，超出时淘汰最久未使用的
+
+# 流式导入配置
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # 每批嵌入和写入的文本块数
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))  # 各阶段之间排队的最大批次数
+INGEST_READ_BLOCK_SIZE = 1024 * 1024  # 每次从文件读取的字符数
+INGEST_CHECKPOINT_DIR = os.getenv("INGEST_CHECKPOINT_DIR", "./kimi-k2-milvus/data/checkpoints")
+
+# 混合检索配置（稠密向量 + BGE-M3 稀疏向量）
+HYBRID_SPARSE_MODEL = os.getenv("HYBRID_SPARSE_MODEL", "BAAI/bge-m3")
+HYBRID_SPARSE_DEVICE = os.getenv("HYBRID_SPARSE_DEVICE", "cpu")
+HYBRID_RANKER = os.getenv("HYBRID_RANKER", "rrf")  # rrf 或 weighted
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_SPARSE_WEIGHT = float(os.getenv("HYBRID_SPARSE_WEIGHT", "0.7"))
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+
+# 向量索引配置，未指定索引时使用；可选 AUTOINDEX、FLAT、HNSW、IVF_FLAT、IVF_SQ8、IVF_PQ
+MILVUS_INDEX_TYPE = os.getenv("MILVUS_INDEX_TYPE", "AUTOINDEX")
+# 集合描述和索引配置保存在SQLite中
+METADATA_DB_PATH = os.getenv("METADATA_DB_PATH", "./kimi-k2-milvus/collection_metadata.db")
+
+# 集合导出配置
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))  # 每页读取的记录数
+
+# 网页下载配置
+DOWNLOAD_MAX_CONNECTIONS = int(os.getenv("DOWNLOAD_MAX_CONNECTIONS", "20"))  # 所有站点共享的最大连接数
+DOWNLOAD_PER_HOST_CONCURRENCY = int(os.getenv("DOWNLOAD_PER_HOST_CONCURRENCY", "2"))  # 每个站点的最大并发请求数
+DOWNLOAD_PER_HOST_DELAY = float(os.getenv("DOWNLOAD_PER_HOST_DELAY", "1.0"))  # 同一站点两次请求之间的最小间隔（秒）
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "30"))
+DOWNLOAD_RESPECT_ROBOTS = os.getenv("DOWNLOAD_RESPECT_ROBOTS", "true").lower() == "true"
+DOWNLOAD_ROBOTS_TTL = float(os.getenv("DOWNLOAD_ROBOTS_TTL", "3600"))  # robots.txt 缓存时间（秒）
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")  # auto、selectolax、lxml 或 html.parser
@@ -0,0 +1,169 @@
+import importlib.util
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+from .config import HTML_PARSER
+
+# 不属于正文的元素，解析后直接移除
+REMOVED_TAGS = ["script", "style", "head", "header", "footer", "nav"]
+# 可以作为正文容器的元素
+CANDIDATE_TAGS = {"article", "main", "div", "section"}
+# 少于这个字符数的段落不参与打分
+MIN_PARAGRAPH_LENGTH = 25
+
+
+def resolve_parser(parser: str = None) -> str:
+    """确定使用的解析器，auto 时依次选择 selectolax、lxml、html.parser"""
+    parser = (parser or HTML_PARSER).lower()
+    if parser == "auto":
+        if HTMLParser is not None:
+            return "selectolax"
+        if importlib.util.find_spec("lxml") is not None:
+            return "lxml"
+        return "html.parser"
+    if parser == "selectolax" and HTMLParser is None:
+        raise ImportError("selectolax 未安装: pip install selectolax")
+    return parser
+
+
+def score_nodes(nodes: List[Any], key: Callable[[Any], Hashable], tag: Callable[[Any], str],
+                parent: Callable[[Any], Any], own_text_length: Callable[[Any], int],
+                paragraph_text: Callable[[Any], str]) -> Tuple[Optional[Any], Optional[Any]]:
+    """一次自底向上遍历，为每个候选容器计算文本长度、链接密度和正文得分
+
+    nodes 为按文档顺序排列的全部元素，倒序遍历时子元素总在父元素之前，每个元素只访问一次。
+    段落得分（1 + 逗号数 + 每100字符1分，最多3分）全部加给父元素、一半加给祖父元素；
+    容器的最终得分为 段落得分 × (1 - 链接文本占比)。
+    返回 (得分最高的容器, 文本最多的容器)，后者在页面没有段落时使用。
+    """
+    text_length: Dict[Hashable, int] = {}
+    link_length: Dict[Hashable, int] = {}
+    scores: Dict[Hashable, float] = {}
+    by_key: Dict[Hashable, Any] = {}
+
+    for node in reversed(nodes):
+        node_key = key(node)
+        node_tag = tag(node)
+        length = text_length.get(node_key, 0) + own_text_length(node)
+        text_length[node_key] = length
+        if node_tag == "a":
+            link_length[node_key] = length
+        by_key[node_key] = node
+
+        parent_node = parent(node)
+        if parent_node is not None:
+            parent_key = key(parent_node)
+            text_length[parent_key] = text_length.get(parent_key, 0) + length
+            link_length[parent_key] = link_length.get(parent_key, 0) + link_length.get(node_key, 0)
+
+        if node_tag == "p" and parent_node is not None:
+            text = paragraph_text(node).strip()
+            if len(text) >= MIN_PARAGRAPH_LENGTH:
+                score = 1 + text.count(",") + text.count("，") + min(len(text) / 100, 3)
+                parent_key = key(parent_node)
+                scores[parent_key] = scores.get(parent_key, 0.0) + score
+                grandparent = parent(parent_node)
+                if grandparent is not None:
+                    grandparent_key = key(grandparent)
+                    scores[grandparent_key] = scores.get(grandparent_key, 0.0) + score / 2
+
+    best, best_score = None, 0.0
+    largest, largest_length = None, 0
+    for node_key, node in by_key.items():
+        if tag(node) not in CANDIDATE_TAGS:
+            continue
+        length = text_length.get(node_key, 0)
+        if length > largest_length:
+            largest, largest_length = node, length
+        link_density = link_length.get(node_key, 0) / length if length else 0.0
+        score = scores.get(node_key, 0.0) * (1 - link_density)
+        if score > best_score:
+            best, best_score = node, score
+    return best, largest
+
+
+def join_paragraphs(texts: List[str]) -> str:
+    """用空行连接非空段落"""
+    return "\n\n".join(text.strip() for text in texts if text.strip())
+
+
+def main_content_bs4(soup: BeautifulSoup) -> str:
+    """在BeautifulSoup树上提取正文段落，找不到时返回整页文本"""
+    nodes = soup.find_all(True)
+    best, largest = score_nodes(
+        nodes,
+        key=id,
+        tag=lambda node: node.name,
+        parent=lambda node: node.parent if isinstance(node.parent, Tag) and node.parent is not soup else None,
+        own_text_length=lambda node: sum(
+            len(child.strip()) for child in node.children
+            if isinstance(child, NavigableString) and not isinstance(child, Comment)
+        ),
+        paragraph_text=lambda node: node.get_text(),
+    )
+    for container in (best, largest):
+        if container is not None:
+            paragraphs = container.find_all("p")
+            if paragraphs:
+                return join_paragraphs([p.get_text() for p in paragraphs])
+    return soup.get_text(separator="\n\n")
+
+
+def all_paragraphs_bs4(soup: BeautifulSoup) -> str:
+    """提取所有段落文本，没有段落时返回整页文本"""
+    paragraphs = soup.find_all("p")
+    if paragraphs:
+        return join_paragraphs([p.get_text() for p in paragraphs])
+    return soup.get_text(separator="\n\n")
+
+
+def html_to_text_selectolax(html: str) -> str:
+    """使用selectolax解析并提取正文，算法与BeautifulSoup版本相同"""
+    tree = HTMLParser(html)
+    tree.strip_tags(REMOVED_TAGS)
+    root = tree.body or tree.root
+    if root is None:
+        return ""
+    nodes = [node for node in root.traverse() if node.tag and not node.tag.startswith("-")]
+    root_id = root.mem_id
+    best, largest = score_nodes(
+        nodes,
+        key=lambda node: node.mem_id,
+        tag=lambda node: node.tag,
+        parent=lambda node: node.parent if node.parent is not None and node.mem_id != root_id else None,
+        own_text_length=lambda node: len(node.text(deep=False, strip=True)),
+        paragraph_text=lambda node: node.text(deep=True),
+    )
+    text = ""
+    for container in (best, largest):
+        if container is not None:
+            paragraphs = container.css("p")
+            if paragraphs:
+                text = join_paragraphs([p.text(deep=True) for p in paragraphs])
+                break
+    else:
+        text = root.text(separator="\n\n")
+    if len(text.split()) < 100:
+        paragraphs = root.css("p")
+        text = join_paragraphs([p.text(deep=True) for p in paragraphs]) if paragraphs else root.text(separator="\n\n")
+    return text
+
+
+def html_to_text(html: str, parser: str = None) -> str:
+    """解析HTML并提取正文，正文少于100个词时退回所有段落"""
+    parser = resolve_parser(parser)
+    if parser == "selectolax":
+        return html_to_text_selectolax(html)
+    soup = BeautifulSoup(html, parser)
+    for element in soup(REMOVED_TAGS):
+        element.decompose()
+    text = main_content_bs4(soup)
+    if len(text.split()) < 100:
+        text = all_paragraphs_bs4(soup)
+    return text
@@ -0,0 +1,192 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import (
+    CONTEXT_TOKEN_BUDGET, CONTEXT_KEEP_RECENT_ROUNDS, TOOL_RESULT_MAX_TOKENS,
+    TOOL_RESULT_DOCUMENT_MAX_CHARS, TOOL_RESULT_TOKEN_CAPS
+)
+from .rate_limiter import estimate_tokens
+
+# 工具结果中存放文档文本的列表字段：元素是字符串，或带text字段的字典（批量搜索时还会嵌套一层results）
+DOCUMENT_LIST_KEYS = ("results", "documents", "collection_content", "chunks")
+
+_DROPPED = object()
+
+
+def iter_document_slots(value: Any) -> Iterator[Tuple[Any, Any]]:
+    """按出现顺序遍历结果中的文档文本，产出 (容器, 键)，container[key] 即文档文本"""
+    if not isinstance(value, dict):
+        return
+    for key in DOCUMENT_LIST_KEYS:
+        items = value.get(key)
+        if not isinstance(items, list):
+            continue
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                yield items, index
+            elif isinstance(item, dict):
+                if isinstance(item.get("text"), str):
+                    yield item, "text"
+                yield from iter_document_slots(item)
+
+
+def _drop_marked(value: Any) -> int:
+    """删除被标记为丢弃的文档，返回删除的数量"""
+    dropped = 0
+    if not isinstance(value, dict):
+        return dropped
+    for key in DOCUMENT_LIST_KEYS:
+        items = value.get(key)
+        if not isinstance(items, list):
+            continue
+        kept = []
+        for item in items:
+            if item is _DROPPED or (isinstance(item, dict) and item.get("text") is _DROPPED):
+                dropped += 1
+                continue
+            dropped += _drop_marked(item)
+            kept.append(item)
+        value[key] = kept
+    return dropped
+
+
+def content_hash(text: str) -> str:
+    """文档文本的哈希，忽略首尾空白"""
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+class ContextCompactor:
+    """控制对话上下文的token数，避免每轮工具调用后提示词越来越长
+
+    - 写入对话时：每个工具结果按工具的token上限截断，单个文档按字符数截断，超出的文档直接省略
+    - 发送给模型前：最近几轮的工具结果保留原文，更早的替换为摘要（保留状态、消息和数量，提示需要时重新调用工具）；
+      保留原文的结果中重复出现的文档改为引用第一次出现的位置；总量仍超过预算时，从最早的结果开始继续替换为摘要
+    对话中保存的是截断后的完整结果，压缩每轮重新计算，不会丢失最近的内容。
+    """
+
+    def __init__(self, token_budget: int = None, keep_recent_rounds: int = None,
+                 tool_result_max_tokens: int = None, document_max_chars: int = None,
+                 tool_token_caps: Optional[Dict[str, int]] = None):
+        """初始化上下文压缩器"""
+        self.token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+        self.keep_recent_rounds = CONTEXT_KEEP_RECENT_ROUNDS if keep_recent_rounds is None else keep_recent_rounds
+        self.tool_result_max_tokens = TOOL_RESULT_MAX_TOKENS if tool_result_max_tokens is None else tool_result_max_tokens
+        self.document_max_chars = TOOL_RESULT_DOCUMENT_MAX_CHARS if document_max_chars is None else document_max_chars
+        self.tool_token_caps = dict(TOOL_RESULT_TOKEN_CAPS if tool_token_caps is None else tool_token_caps)
+        # omitted_documents为累计值，其余为最近一次压缩的结果
+        self.stats = {"omitted_documents": 0, "summarized_results": 0, "deduplicated_documents": 0, "prompt_tokens": 0}
+
+    def cap_result(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """按工具的token上限截断结果，返回新的字典"""
+        capped = json.loads(json.dumps(result, ensure_ascii=False, default=str))
+        max_tokens = self.tool_token_caps.get(tool_name, self.tool_result_max_tokens)
+        used = estimate_tokens({key: value for key, value in capped.items() if key not in DOCUMENT_LIST_KEYS})
+        for container, key in list(iter_document_slots(capped)):
+            text = container[key]
+            if len(text) > self.document_max_chars:
+                text = container[key] = text[:self.document_max_chars] + "…"
+            cost = estimate_tokens(text)
+            if used + cost > max_tokens:
+                container[key] = _DROPPED
+            else:
+                used += cost
+        omitted = _drop_marked(capped)
+        if omitted:
+            capped["omitted_documents"] = omitted
+            capped["message"] = (capped.get("message") or "") + f"（结果过长，省略了 {omitted} 条文档）"
+            self.stats["omitted_documents"] += omitted
+        return capped
+
+    def tool_message(self, tool_call_id: str, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """生成写回对话的tool消息，结果已按上限截断"""
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call_id,
+            "name": tool_name,
+            "content": json.dumps(self.cap_result(tool_name, result), ensure_ascii=False)
+        }
+
+    @staticmethod
+    def summarize_result(tool_name: str, content: str) -> str:
+        """把工具结果替换为摘要：保留状态、消息等标量字段，列表只保留数量"""
+        try:
+            result = json.loads(content)
+        except (TypeError, ValueError):
+            result = None
+        if not isinstance(result, dict):
+            return json.dumps({"tool": tool_name, "summary": f"结果已压缩（原长度 {len(content or '')} 字符）"}, ensure_ascii=False)
+        summary: Dict[str, Any] = {"tool": tool_name, "compacted": True}
+        for key, value in result.items():
+            if isinstance(value, list):
+                summary[f"{key}_count"] = len(value)
+            elif isinstance(value, dict):
+                summary[f"{key}_fields"] = len(value)
+            elif not isinstance(value, str) or len(value) <= 200:
+                summary[key] = value
+        summary["note"] = "早期的工具结果已压缩，需要详细内容时请重新调用工具"
+        return json.dumps(summary, ensure_ascii=False)
+
+    def _tool_rounds(self, messages: List[Any]) -> List[List[int]]:
+        """按轮次分组tool消息的下标，一轮是一条带tool_calls的assistant消息之后的所有tool消息"""
+        rounds: List[List[int]] = []
+        for index, message in enumerate(messages):
+            if not isinstance(message, dict):
+                continue
+            if message.get("role") == "assistant" and message.get("tool_calls"):
+                rounds.append([])
+            elif message.get("role") == "tool":
+                if not rounds:
+                    rounds.append([])
+                rounds[-1].append(index)
+        return [indexes for indexes in rounds if indexes]
+
+    def _deduplicate(self, messages: List[Dict[str, Any]], indexes: List[int]) -> int:
+        """保留原文的tool消息中，重复出现的文档改为引用第一次出现的位置"""
+        seen: Dict[str, str] = {}
+        deduplicated = 0
+        for index in indexes:
+            message = messages[index]
+            try:
+                result = json.loads(message["content"])
+            except (TypeError, ValueError):
+                continue
+            changed = False
+            for position, (container, key) in enumerate(iter_document_slots(result), start=1):
+                text = container[key]
+                # 短文本替换成引用也省不了多少
+                if len(text) < 50:
+                    continue
+                digest = content_hash(text)
+                if digest in seen:
+                    container[key] = f"[重复内容，同 {seen[digest]}]"
+                    deduplicated += 1
+                    changed = True
+                else:
+                    seen[digest] = f"{message.get('tool_call_id')} 第{position}条"
+            if changed:
+                messages[index] = {**message, "content": json.dumps(result, ensure_ascii=False)}
+        return deduplicated
+
+    def compact(self, messages: List[Any]) -> List[Any]:
+        """返回发送给模型的消息列表，不修改传入的messages"""
+        rounds = self._tool_rounds(messages)
+        protected = {index for indexes in rounds[-max(self.keep_recent_rounds, 1):] for index in indexes}
+        summarize = [index for indexes in rounds for index in indexes if index not in protected]
+        # 超出预算时从最早的结果开始压缩，最后一轮的结果始终保留原文
+        optional = [index for indexes in rounds[-max(self.keep_recent_rounds, 1):-1] for index in indexes]
+
+        while True:
+            compacted = list(messages)
+            for index in summarize:
+                message = compacted[index]
+                compacted[index] = {**message, "content": self.summarize_result(message.get("name", ""), message.get("content"))}
+            kept = [index for indexes in rounds for index in indexes if index not in summarize]
+            deduplicated = self._deduplicate(compacted, kept)
+            prompt_tokens = estimate_tokens(compacted)
+            if not optional or prompt_tokens <= self.token_budget:
+                break
+            summarize.append(optional.pop(0))
+
+        self.stats.update(summarized_results=len(summarize), deduplicated_documents=deduplicated, prompt_tokens=prompt_tokens)
+        return compacted
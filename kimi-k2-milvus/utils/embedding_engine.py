@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MAX_WORKERS,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_MEMORY_CACHE_SIZE,
+)
+from .rate_limiter import RetryPolicy, retry_after_seconds
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("EmbeddingEngine")
+
+
+class EmbeddingEngine:
+    """批量、并发、带缓存的文本嵌入引擎
+
+    输入按批次切分后由线程池并发请求，限流、服务端错误和连接错误按RetryPolicy退避重试，其他错误直接抛出；
+    结果按 (模型, sha256(文本)) 缓存到SQLite，重复上传的文件不会重新计算嵌入；内存中只保留最近使用的向量。
+    """
+
+    def __init__(self, openai_client, model: str = None, batch_size: int = None,
+                 max_workers: int = None, max_retries: int = None, cache_path: Optional[str] = None,
+                 memory_cache_size: int = None):
+        """初始化嵌入引擎"""
+        self.openai_client = openai_client
+        self.model = model or EMBEDDING_MODEL
+        self.batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        self.max_workers = max_workers or EMBEDDING_MAX_WORKERS
+        self.max_retries = max_retries if max_retries is not None else EMBEDDING_MAX_RETRIES
+        self.cache_path = EMBEDDING_CACHE_PATH if cache_path is None else cache_path
+        self.memory_cache_size = EMBEDDING_MEMORY_CACHE_SIZE if memory_cache_size is None else memory_cache_size
+        self.retry_policy = RetryPolicy(max_retries=self.max_retries, base_delay=1.0)
+        self._memory_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"requests": 0, "cache_hits": 0, "cache_misses": 0, "retries": 0}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """打开缓存数据库（惰性创建），无法打开时只使用内存缓存"""
+        if not self.cache_path:
+            return None
+        if self._conn is None:
+            try:
+                directory = os.path.dirname(self.cache_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                    "PRIMARY KEY (model, text_hash))"
+                )
+                self._conn.commit()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"无法打开嵌入缓存 {self.cache_path}，只使用内存缓存: {str(e)}")
+                self.cache_path = None
+                self._conn = None
+        return self._conn
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """计算文本的sha256，作为缓存键"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, text_hash: str, vector: np.ndarray):
+        """放入内存缓存，超出上限时淘汰最久未使用的向量，调用方需持有锁"""
+        if self.memory_cache_size <= 0:
+            return
+        self._memory_cache[text_hash] = vector
+        self._memory_cache.move_to_end(text_hash)
+        while len(self._memory_cache) > self.memory_cache_size:
+            self._memory_cache.popitem(last=False)
+
+    def _load_cached(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """从内存和SQLite中读取已缓存的向量"""
+        with self._lock:
+            found = {}
+            for h in hashes:
+                if h in self._memory_cache:
+                    self._memory_cache.move_to_end(h)
+                    found[h] = self._memory_cache[h]
+            missing = [h for h in hashes if h not in found]
+            conn = self._connect()
+            if conn is not None:
+                # SQLite对参数个数有限制，分批查询
+                for i in range(0, len(missing), 500):
+                    part = missing[i:i + 500]
+                    rows = conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                        [self.model, *part]
+                    ).fetchall()
+                    for text_hash, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember(text_hash, vector)
+                        found[text_hash] = vector
+        return found
+
+    def _store(self, vectors: Dict[str, np.ndarray]):
+        """写入缓存"""
+        with self._lock:
+            for text_hash, vector in vectors.items():
+                self._remember(text_hash, vector)
+            conn = self._connect()
+            if conn is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    [(self.model, h, v.tobytes()) for h, v in vectors.items()]
+                )
+                conn.commit()
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """请求一个批次的嵌入，可重试的错误按重试策略等待后重试"""
+        attempt = 0
+        while True:
+            try:
+                self.stats["requests"] += 1
+                response = self.openai_client.embeddings.create(model=self.model, input=texts)
+                data = sorted(response.data, key=lambda item: item.index)
+                return np.asarray([item.embedding for item in data], dtype=np.float32)
+            except Exception as e:
+                # 参数错误、认证失败等重试也不会成功
+                if not self.retry_policy.should_retry(e, attempt):
+                    raise
+                self.stats["retries"] += 1
+                wait = self.retry_policy.delay(attempt, retry_after_seconds(e))
+                logger.warning(f"嵌入请求失败，{wait:.1f} 秒后重试 ({attempt + 1}/{self.max_retries}): {str(e)}")
+                time.sleep(wait)
+                attempt += 1
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """生成文本嵌入向量，返回形状为 (len(texts), dimension) 的float32数组"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        hashes = [self.hash_text(text) for text in texts]
+        vectors = self._load_cached(list(dict.fromkeys(hashes)))
+        self.stats["cache_hits"] += len(vectors)
+
+        # 相同文本只请求一次
+        pending = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors and text_hash not in pending:
+                pending[text_hash] = text
+        self.stats["cache_misses"] += len(pending)
+
+        if pending:
+            pending_hashes = list(pending)
+            batches = [pending_hashes[i:i + self.batch_size] for i in range(0, len(pending_hashes), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                futures = [(batch, executor.submit(self._embed_batch, [pending[h] for h in batch])) for batch in batches]
+                for batch, future in futures:
+                    batch_vectors = dict(zip(batch, future.result()))
+                    self._store(batch_vectors)
+                    vectors.update(batch_vectors)
+
+        return np.stack([vectors[h] for h in hashes])
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def to_export_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """将Milvus返回的记录转换为可序列化的字典
+
+    稠密向量转为浮点数列表，稀疏向量 {维度: 权重} 转为 {"indices": [...], "values": [...]}。
+    """
+    exported = {}
+    for key, value in dict(row).items():
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, dict) and value and all(isinstance(k, (int, np.integer)) for k in value):
+            value = {"indices": [int(k) for k in value], "values": [float(v) for v in value.values()]}
+        elif isinstance(value, (list, tuple)) and value and isinstance(value[0], (np.floating, float)):
+            value = [float(v) for v in value]
+        exported[key] = value
+    return exported
+
+
+def write_jsonl(pages: Iterable[List[Dict[str, Any]]], output_path: str) -> int:
+    """逐页写入JSONL文件，返回写入的记录数"""
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for rows in pages:
+            for row in rows:
+                f.write(json.dumps(to_export_row(row), ensure_ascii=False))
+                f.write("\n")
+            count += len(rows)
+    return count
+
+
+def write_parquet(pages: Iterable[List[Dict[str, Any]]], output_path: str) -> int:
+    """逐页写入Parquet文件，每页一个row group，返回写入的记录数
+
+    字段以第一页为准，后续页缺少的字段写为空值。
+    """
+    if pa is None:
+        raise ImportError("导出Parquet需要安装pyarrow: pip install pyarrow")
+    count = 0
+    writer = None
+    try:
+        for rows in pages:
+            if not rows:
+                continue
+            records = [to_export_row(row) for row in rows]
+            if writer is None:
+                schema = pa.Table.from_pylist(records).schema
+                writer = pq.ParquetWriter(output_path, schema)
+            writer.write_table(pa.Table.from_pylist(records, schema=writer.schema))
+            count += len(records)
+        if writer is None:
+            # 空集合也生成一个合法的文件
+            pq.write_table(pa.table({}), output_path)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
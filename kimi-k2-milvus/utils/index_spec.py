@@ -0,0 +1,34 @@
+from typing import Any, Dict, Optional
+
+# 每种索引的构建参数和搜索参数及其默认值
+INDEX_TYPES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "AUTOINDEX": {"build": {}, "search": {}},
+    "FLAT": {"build": {}, "search": {}},
+    "HNSW": {"build": {"M": 16, "efConstruction": 200}, "search": {"ef": 64}},
+    "IVF_FLAT": {"build": {"nlist": 1024}, "search": {"nprobe": 16}},
+    "IVF_SQ8": {"build": {"nlist": 1024}, "search": {"nprobe": 16}},
+    "IVF_PQ": {"build": {"nlist": 1024, "m": 16, "nbits": 8}, "search": {"nprobe": 16}},
+}
+
+
+def normalize_index_spec(spec: Optional[Dict[str, Any]], dimension: int = None) -> Dict[str, Any]:
+    """校验索引配置并补全默认值
+
+    spec 形如 {"index_type": "HNSW", "M": 32, "ef": 128}，构建参数和搜索参数写在同一层。
+    返回 {"index_type", "params", "search_params"}，未知的索引类型或参数会抛出 ValueError。
+    """
+    spec = dict(spec or {})
+    index_type = str(spec.pop("index_type", "AUTOINDEX")).upper()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"不支持的索引类型 '{index_type}'，可选: {', '.join(INDEX_TYPES)}")
+
+    defaults = INDEX_TYPES[index_type]
+    unknown = set(spec) - set(defaults["build"]) - set(defaults["search"])
+    if unknown:
+        raise ValueError(f"索引 {index_type} 不支持参数: {', '.join(sorted(unknown))}")
+
+    params = {key: int(spec.get(key, value)) for key, value in defaults["build"].items()}
+    search_params = {key: int(spec.get(key, value)) for key, value in defaults["search"].items()}
+    if index_type == "IVF_PQ" and dimension and dimension % params["m"] != 0:
+        raise ValueError(f"IVF_PQ 的 m={params['m']} 必须能整除向量维度 {dimension}")
+    return {"index_type": index_type, "params": params, "search_params": search_params}
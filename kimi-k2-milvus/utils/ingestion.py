@@ -0,0 +1,235 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import INGEST_READ_BLOCK_SIZE
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("Ingestion")
+
+# 队列结束标记
+_DONE = object()
+
+_SENTENCE_END = re.compile(r"[.?!]")
+# 选择分割点时参考的句末之前的字符数
+_ANCHOR_CONTEXT = 32
+
+
+def content_hash(text: str) -> str:
+    """文本块内容的 sha256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, text_hash: str, occurrence: int) -> str:
+    """由来源文件、内容哈希和该内容在文件中第几次出现生成文本块主键
+
+    主键与位置无关，文件开头插入内容后，后面未变化的文本块主键不变。
+    """
+    return hashlib.sha256(f"{source}:{text_hash}:{occurrence}".encode("utf-8")).hexdigest()
+
+
+def _anchored_sentence_end(buffer: str, start: int, end: int) -> int:
+    """在 [start, end) 中选择由内容决定的句末位置：句末及其前面几个字符的哈希最小者，没有句末时返回-1"""
+    best_key, best_end = None, -1
+    for match in _SENTENCE_END.finditer(buffer, start, end):
+        position = match.start()
+        key = zlib.crc32(buffer[max(0, position - _ANCHOR_CONTEXT + 1):position + 1].encode("utf-8"))
+        if best_key is None or key < best_key:
+            best_key, best_end = key, position
+    return best_end
+
+
+def iter_file_chunks(file_path: str, chunk_size: int, overlap: int,
+                     block_size: int = INGEST_READ_BLOCK_SIZE, anchored: bool = False) -> Iterator[Tuple[int, str]]:
+    """逐块读取文件并生成 (字符偏移, 文本块)
+
+    切分规则与一次性读取时相同：尽量在句子结束处切分，相邻块重叠 overlap 个字符。
+    anchored 为 True 时，在可选的句末中按内容哈希选择分割点，而不是取最后一个：
+    文件中插入或删除内容后，切分位置很快与原来重新对齐，后面的文本块内容不变。
+    内存中只保留当前读取的数据块，占用与文件大小无关。
+    """
+    overlap = min(overlap, chunk_size - 1) if chunk_size > 1 else 0
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = ""
+        buffer_start = 0  # buffer[0] 在文件中的字符偏移
+        pos = 0
+        eof = False
+        while True:
+            # 保证当前块之后还有内容可看，或者已经读到文件末尾
+            while not eof and len(buffer) - pos <= chunk_size:
+                block = file.read(block_size)
+                if not block:
+                    eof = True
+                else:
+                    buffer += block
+            if pos >= len(buffer):
+                return
+
+            end = min(pos + chunk_size, len(buffer))
+            is_last = eof and end == len(buffer)
+            # 如果不是最后一个块，尝试在句子边界分割
+            if not is_last:
+                if anchored:
+                    sentence_end = _anchored_sentence_end(buffer, pos + chunk_size // 2 + 1, end)
+                else:
+                    sentence_end = max(buffer.rfind('.', pos, end), buffer.rfind('?', pos, end), buffer.rfind('!', pos, end))
+                if sentence_end > pos + chunk_size // 2:
+                    end = sentence_end + 1
+
+            yield buffer_start + pos, buffer[pos:end]
+            if is_last:
+                return
+            pos = max(end - overlap, pos + 1)
+
+            # 丢弃已处理的数据
+            if pos > block_size:
+                buffer = buffer[pos:]
+                buffer_start += pos
+                pos = 0
+
+
+class IngestionCheckpoint:
+    """记录一次文件导入已经写入的文本块数，导入中断后可以从断点继续"""
+
+    def __init__(self, checkpoint_dir: str, file_path: str, collection_name: str, chunk_size: int, overlap: int):
+        """初始化检查点，文件大小或修改时间变化后旧检查点失效"""
+        stat = os.stat(file_path)
+        key = hashlib.sha256(
+            f"{os.path.abspath(file_path)}|{collection_name}|{chunk_size}|{overlap}".encode("utf-8")
+        ).hexdigest()[:32]
+        self.path = os.path.join(checkpoint_dir, f"{key}.json") if checkpoint_dir else None
+        self.fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+        self.committed_chunks = 0
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("fingerprint") == self.fingerprint:
+                    self.committed_chunks = int(data.get("committed_chunks", 0))
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取检查点失败，将从头导入: {str(e)}")
+
+    def save(self, committed_chunks: int):
+        """保存已写入的文本块数"""
+        self.committed_chunks = committed_chunks
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "committed_chunks": committed_chunks}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """导入完成后删除检查点"""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_ingestion_pipeline(chunks: Iterator[Tuple],
+                           embed: Callable[[List[str]], Any],
+                           write: Callable[[List[Tuple], Any], int],
+                           batch_size: int,
+                           queue_size: int,
+                           skip_chunks: int = 0,
+                           on_batch_written: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+    """并发运行 切分 -> 嵌入 -> 写入 三个阶段
+
+    chunks 生成的每一项以 (偏移, 文本, ...) 开头，写入时原样传给 write。
+    各阶段通过有界队列连接，下游变慢时上游会阻塞等待，内存中最多只有几个批次。
+    写入按顺序进行，on_batch_written 收到的是到目前为止写入的文本块总数，可用于保存检查点。
+    """
+    chunk_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    vector_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    stats = {"chunk_count": 0, "skipped_chunks": 0, "insert_count": 0}
+
+    def put(q: "queue.Queue", item) -> bool:
+        # 出错时不要一直阻塞在满的队列上
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: "queue.Queue"):
+        # 其他阶段出错后不会再放入结束标记，停止时按结束处理
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def chunk_stage():
+        try:
+            batch = []
+            for index, chunk in enumerate(chunks):
+                stats["chunk_count"] += 1
+                if index < skip_chunks:
+                    stats["skipped_chunks"] += 1
+                    continue
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    if not put(chunk_queue, batch):
+                        return
+                    batch = []
+            if batch:
+                put(chunk_queue, batch)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(chunk_queue, _DONE)
+
+    def embed_stage():
+        try:
+            while True:
+                batch = get(chunk_queue)
+                if batch is _DONE:
+                    break
+                vectors = embed([item[1] for item in batch])
+                if not put(vector_queue, (batch, vectors)):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(vector_queue, _DONE)
+
+    threads = [threading.Thread(target=chunk_stage, daemon=True), threading.Thread(target=embed_stage, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    # 写入阶段在调用线程中运行，保证按顺序提交
+    written = skip_chunks
+    try:
+        while True:
+            item = get(vector_queue)
+            if item is _DONE:
+                break
+            batch, vectors = item
+            stats["insert_count"] += write(batch, vectors)
+            written += len(batch)
+            if on_batch_written:
+                on_batch_written(written)
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import METADATA_DB_PATH
+
+
+class CollectionMetadataStore:
+    """集合元数据（描述、创建时间、索引配置）的SQLite存储
+
+    以前元数据写在一个Milvus集合里，每行都要带一个占位向量；元数据只有标量字段，放在SQLite中即可。
+    每个集合还有一个版本号，集合内容每次变化时加一，用于判断基于集合内容的缓存是否过期。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """初始化元数据存储，路径为空时只保存在内存中"""
+        self.db_path = METADATA_DB_PATH if db_path is None else db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库（惰性创建）"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path or ":memory:", check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS collections ("
+                "name TEXT PRIMARY KEY, description TEXT NOT NULL DEFAULT '', "
+                "created_at REAL NOT NULL, hybrid INTEGER NOT NULL DEFAULT 0, index_spec TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS collection_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def put(self, name: str, description: str = "", hybrid: bool = False, index_spec: Optional[Dict[str, Any]] = None):
+        """保存集合的元数据"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO collections (name, description, created_at, hybrid, index_spec) VALUES (?, ?, ?, ?, ?)",
+                (name, description, time.time(), int(hybrid), json.dumps(index_spec) if index_spec else None)
+            )
+            conn.commit()
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """读取集合的元数据，不存在时返回None"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT name, description, created_at, hybrid, index_spec FROM collections WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "name": row[0],
+            "description": row[1],
+            "created_at": row[2],
+            "hybrid": bool(row[3]),
+            "index_spec": json.loads(row[4]) if row[4] else None,
+        }
+
+    def delete(self, name: str):
+        """删除集合的元数据"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM collections WHERE name = ?", (name,))
+            conn.commit()
+
+    def bump_version(self, name: str) -> int:
+        """集合内容发生变化，版本号加一并返回新版本号"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO collection_versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                (name,)
+            )
+            conn.commit()
+            return conn.execute("SELECT version FROM collection_versions WHERE name = ?", (name,)).fetchone()[0]
+
+    def get_versions(self, names: List[str]) -> Dict[str, int]:
+        """读取集合的版本号，从未变化过的集合为0"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT name, version FROM collection_versions WHERE name IN ({', '.join('?' * len(names))})", names
+            ).fetchall()
+        versions = dict(rows)
+        return {name: versions.get(name, 0) for name in names}
@@ -0,0 +1,185 @@
+import asyncio
+import email.utils
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import KIMI_MAX_RETRIES, KIMI_RETRY_BASE_DELAY, KIMI_RETRY_MAX_DELAY
+
+# 这些状态码表示服务端暂时不可用，可以重试
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """令牌桶，容量为每分钟的配额，按配额匀速补充
+
+    reserve允许余额为负：先到的调用先预订，后到的调用需要等待的时间随之累加，调用按到达顺序放行。
+    """
+
+    def __init__(self, per_minute: int):
+        """初始化令牌桶，初始为满"""
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        """按经过的时间补充令牌"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """预订amount个令牌，返回需要等待的秒数；超过容量的请求按容量计算"""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.refill_per_second
+
+    def refund(self, amount: float, now: float):
+        """归还多预订的令牌，amount为负时补扣"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """客户端限流器，同时限制每分钟请求数（RPM）和每分钟token数（TPM）
+
+    等待使用asyncio.sleep，不阻塞事件循环；状态由线程锁保护，可以在多个线程和事件循环之间共享。
+    收到429时调用pause，所有共享此限流器的调用都会暂停到Retry-After指定的时间之后。
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        """初始化限流器，配额为0表示不限制"""
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "wait_seconds": 0.0, "pauses": 0}
+
+    def reserve(self, tokens: int = 0) -> float:
+        """预订一次请求和tokens个token，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            self.stats["requests"] += 1
+            if wait > 0:
+                self.stats["throttled"] += 1
+                self.stats["wait_seconds"] += wait
+            return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """等待到可以发出请求为止，返回实际等待的秒数"""
+        started = time.monotonic()
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        # 等待期间其他调用可能收到了429
+        while True:
+            with self._lock:
+                paused = self._paused_until - time.monotonic()
+            if paused <= 0:
+                break
+            await asyncio.sleep(paused)
+        return time.monotonic() - started
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """用接口返回的实际token数修正预订时的估计值"""
+        if not self._tokens or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.refund(estimated_tokens - actual_tokens, time.monotonic())
+
+    def pause(self, seconds: float):
+        """在seconds秒内暂停所有请求，用于服务端返回429时"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.stats["pauses"] += 1
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> RateLimiter:
+    """返回进程内共享的限流器，同名的限流器只在第一次获取时按给定配额创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+def estimate_tokens(payload: Any) -> int:
+    """粗略估计请求的token数：按序列化后的字符数计算，中文约每字一个token，英文约每4个字符一个token"""
+    text = json.dumps(payload, ensure_ascii=False, default=str)
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+def status_code_of(error: Exception) -> Optional[int]:
+    """返回异常对应的HTTP状态码"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """从异常的响应头中读取Retry-After（秒数或HTTP日期），没有时返回None"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断请求失败后是否值得重试：限流、服务端错误、超时和连接错误"""
+    status = status_code_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # 没有状态码的是连接错误或超时（openai.APIConnectionError、APITimeoutError）
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError") or isinstance(error, (ConnectionError, TimeoutError))
+
+
+class RetryPolicy:
+    """重试策略：有Retry-After时按其等待并加少量抖动，否则使用带抖动的指数退避"""
+
+    def __init__(self, max_retries: int = None, base_delay: float = None, max_delay: float = None):
+        """初始化重试策略"""
+        self.max_retries = KIMI_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = KIMI_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = KIMI_RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """第attempt次（从0开始）尝试失败后是否重试"""
+        return attempt < self.max_retries and is_retryable(error)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第attempt次尝试失败后的等待秒数"""
+        if retry_after is not None:
+            # 抖动避免多个调用在同一时刻一起重试
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return backoff / 2 + random.uniform(0, backoff / 2)
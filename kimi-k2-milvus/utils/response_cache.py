@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import MILVUS_COLLECTION_PREFIX, RESPONSE_CACHE_COLLECTION, RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("ResponseCache")
+
+
+def normalize_command(command: str) -> str:
+    """合并空白，相同的命令得到相同的缓存主键"""
+    return " ".join(command.split())
+
+
+def command_id(command: str) -> str:
+    """规范化后命令的缓存主键"""
+    return hashlib.sha256(command.encode("utf-8")).hexdigest()
+
+
+def mentions_collections(command: str, versions: Dict[str, int]) -> bool:
+    """命令中是否提到了缓存回答所依据的每个集合（不带前缀的名称，不区分大小写，不匹配更长名称的一部分）"""
+    for full_name in versions:
+        name = full_name[len(MILVUS_COLLECTION_PREFIX):] if full_name.startswith(MILVUS_COLLECTION_PREFIX) else full_name
+        if not re.search(rf"(?<![0-9A-Za-z_]){re.escape(name)}(?![0-9A-Za-z_])", command, re.IGNORECASE):
+            return False
+    return True
+
+
+class ResponseCache:
+    """语义回答缓存，保存在单独的Milvus集合中
+
+    规范化后相同的命令直接命中；否则使用VectorDatabase的嵌入向量检索，余弦相似度达到阈值、
+    并且新命令提到了原回答所依据的每个集合时才视为同一个问题，只差一个集合名称的两个问题不会共用回答。
+    每条缓存记录回答所依据的集合及其当时的版本号；集合被创建或写入后版本号变化，命中的缓存随之失效并删除。
+    缓存读写失败只记录日志，不影响正常回答。
+    """
+
+    def __init__(self, vector_db, collection_name: str = None, threshold: float = None, ttl: float = None):
+        """初始化回答缓存，集合在首次使用时创建"""
+        self.vector_db = vector_db
+        self.collection_name = collection_name or RESPONSE_CACHE_COLLECTION
+        self.threshold = RESPONSE_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+        self._ready = False
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0, "stores": 0}
+
+    def _ensure_collection(self) -> bool:
+        """创建缓存集合，数据库未连接时返回False"""
+        client = self.vector_db.milvus_client
+        if client is None:
+            return False
+        if not self._ready:
+            with self._lock:
+                if not client.has_collection(collection_name=self.collection_name):
+                    client.create_collection(
+                        collection_name=self.collection_name,
+                        dimension=self.vector_db.dimension,
+                        metric_type="COSINE",
+                        id_type="string",
+                        max_length=64,
+                        auto_id=False
+                    )
+                self._ready = True
+        return True
+
+    def _is_valid(self, entry: Dict[str, Any]) -> bool:
+        """检查缓存是否过期、依据的集合是否变化"""
+        if self.ttl and time.time() - entry.get("created_at", 0) > self.ttl:
+            return False
+        versions = json.loads(entry.get("versions") or "{}")
+        return self.vector_db.metadata_store.get_versions(list(versions)) == versions
+
+    def lookup(self, command: str) -> Optional[Dict[str, Any]]:
+        """查找相同或相似问题的缓存回答，返回 {"answer", "command", "similarity"}，未命中时返回None"""
+        try:
+            if not self._ensure_collection():
+                return None
+            command = normalize_command(command)
+            output_fields = ["command", "answer", "versions", "created_at"]
+            rows = self.vector_db.milvus_client.get(
+                collection_name=self.collection_name,
+                ids=[command_id(command)],
+                output_fields=output_fields
+            )
+            if rows:
+                hit = {"id": command_id(command), "distance": 1.0, "entity": rows[0]}
+            else:
+                vector = self.vector_db.generate_embeddings([command])[0]
+                hits = self.vector_db.milvus_client.search(
+                    collection_name=self.collection_name,
+                    data=[vector],
+                    limit=1,
+                    output_fields=output_fields
+                )[0]
+                if not hits or float(hits[0].get("distance", 0.0)) < self.threshold:
+                    self.stats["misses"] += 1
+                    return None
+                hit = hits[0]
+                # 问题相似但问的可能是另一个集合
+                if not mentions_collections(command, json.loads((hit.get("entity") or {}).get("versions") or "{}")):
+                    self.stats["misses"] += 1
+                    return None
+            entry = hit.get("entity") or {}
+            if not self._is_valid(entry):
+                self.vector_db.milvus_client.delete(collection_name=self.collection_name, ids=[hit.get("id")])
+                self.stats["invalidated"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return {
+                "answer": entry.get("answer", ""),
+                "command": entry.get("command", ""),
+                "similarity": float(hit.get("distance", 0.0))
+            }
+        except Exception as e:
+            logger.warning(f"查找缓存失败: {str(e)}")
+            return None
+
+    def store(self, command: str, answer: str, versions: Dict[str, int]) -> bool:
+        """保存回答，versions为回答所依据的集合（完整名称）及其版本号"""
+        try:
+            if not self._ensure_collection():
+                return False
+            command = normalize_command(command)
+            vector = self.vector_db.generate_embeddings([command])[0]
+            self.vector_db.milvus_client.upsert(
+                collection_name=self.collection_name,
+                data=[{
+                    "id": command_id(command),
+                    "vector": vector,
+                    "command": command,
+                    "answer": answer,
+                    "versions": json.dumps(versions, ensure_ascii=False),
+                    "created_at": time.time()
+                }]
+            )
+            self.stats["stores"] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"保存缓存失败: {str(e)}")
+            return False
+
+    def clear(self):
+        """删除全部缓存"""
+        client = self.vector_db.milvus_client
+        if client is not None and client.has_collection(collection_name=self.collection_name):
+            client.drop_collection(collection_name=self.collection_name)
+        self._ready = False
@@ -0,0 +1,65 @@
+import logging
+import threading
+from typing import Dict, List
+
+from .config import HYBRID_SPARSE_MODEL, HYBRID_SPARSE_DEVICE
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("SparseEncoder")
+
+
+class SparseEncoder:
+    """使用BGE-M3生成稀疏向量，用于混合检索中的关键词匹配
+
+    模型在第一次编码时才加载，需要安装 pymilvus[model]。
+    """
+
+    def __init__(self, model_name: str = None, device: str = None):
+        """初始化稀疏编码器"""
+        self.model_name = model_name or HYBRID_SPARSE_MODEL
+        self.device = device or HYBRID_SPARSE_DEVICE
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from pymilvus.model.hybrid import BGEM3EmbeddingFunction
+                except ImportError as e:
+                    raise ImportError("混合检索需要BGE-M3模型，请先安装: pip install \"pymilvus[model]\"") from e
+                logger.info(f"加载稀疏向量模型: {self.model_name}")
+                self._model = BGEM3EmbeddingFunction(
+                    model_name=self.model_name,
+                    device=self.device,
+                    use_fp16=False,
+                    return_dense=False,
+                    return_sparse=True
+                )
+        return self._model
+
+    @staticmethod
+    def _to_rows(sparse_matrix) -> List[Dict[int, float]]:
+        """将稀疏矩阵的每一行转换为 {维度: 权重}"""
+        sparse_matrix = sparse_matrix.tocsr()
+        rows = []
+        for i in range(sparse_matrix.shape[0]):
+            start, end = sparse_matrix.indptr[i], sparse_matrix.indptr[i + 1]
+            rows.append({
+                int(index): float(value)
+                for index, value in zip(sparse_matrix.indices[start:end], sparse_matrix.data[start:end])
+            })
+        return rows
+
+    def encode_documents(self, texts: List[str]) -> List[Dict[int, float]]:
+        """生成文档的稀疏向量"""
+        if not texts:
+            return []
+        return self._to_rows(self._load_model().encode_documents(texts)["sparse"])
+
+    def encode_queries(self, queries: List[str]) -> List[Dict[int, float]]:
+        """生成查询的稀疏向量"""
+        if not queries:
+            return []
+        return self._to_rows(self._load_model().encode_queries(queries)["sparse"])
@@ -9,19 +9,36 @@ from pymilvus import (
     CollectionSchema,
     FieldSchema,
     DataType,
-    MilvusClient
+    MilvusClient,
+    AnnSearchRequest,
+    RRFRanker,
+    WeightedRanker
 )
 from openai import OpenAI
 import os
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Optional, Iterator, Set
 import logging
 import re
-from .config import OPENAI_API_KEY, OPENAI_API_BASE, MILVUS_COLLECTION_PREFIX, CHUNK_SIZE, CHUNK_OVERLAP
+from .config import (
+    OPENAI_API_KEY, OPENAI_API_BASE, MILVUS_COLLECTION_PREFIX, CHUNK_SIZE, CHUNK_OVERLAP,
+    INGEST_BATCH_SIZE, INGEST_QUEUE_SIZE, INGEST_CHECKPOINT_DIR,
+    HYBRID_RANKER, HYBRID_RRF_K, HYBRID_SPARSE_WEIGHT, HYBRID_DENSE_WEIGHT, MILVUS_INDEX_TYPE,
+    EXPORT_PAGE_SIZE, RESPONSE_CACHE_COLLECTION
+)
+from .embedding_engine import EmbeddingEngine
+from .sparse_encoder import SparseEncoder
+from .index_spec import normalize_index_spec
+from .metadata_store import CollectionMetadataStore
+from .export import write_jsonl, write_parquet
+from .ingestion import iter_file_chunks, IngestionCheckpoint, run_ingestion_pipeline, content_hash, chunk_id
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("VectorDatabase")
 
+# search_documents 支持的检索模式
+SEARCH_MODES = ("dense", "sparse", "hybrid")
+
 class VectorDatabase:
     """向量数据库管理类"""
     def __init__(self, openai_api_key: str = None):
@@ -33,6 +50,16 @@ class VectorDatabase:
         )
         self.dimension = 1536  # 使用OpenAI嵌入模型维度
         self.milvus_client = None
+        # 批量、并发、带缓存的嵌入引擎
+        self.embedding_engine = EmbeddingEngine(self.openai_client)
+        # 集合结构缓存：主键是否为字符串（按内容去重，旧集合使用自增整数主键），是否带稀疏向量字段
+        self._collection_schemas: Dict[str, Dict[str, bool]] = {}
+        # 混合检索使用的稀疏向量编码器，首次使用时加载模型
+        self.sparse_encoder = SparseEncoder()
+        # 集合描述和索引配置
+        self.metadata_store = CollectionMetadataStore()
+        # 已知集合名称缓存，首次使用时从数据库加载，避免每次搜索都检查集合是否存在
+        self._known_collections: Optional[set] = None
     
     def connect_database(self) -> dict:
         """连接到Milvus数据库"""
@@ -43,7 +70,16 @@ class VectorDatabase:
             #db_path = os.path.join(current_dir, "kimi_agent.db")
             # 使用相对路径
             db_path = "./kimi-k2-milvus/kimi_agent.db"
+            # 已连接时复用现有客户端，重复连接会重新启动Milvus Lite
+            if self.milvus_client is not None:
+                return {
+                    "success": True,
+                    "message": f"已连接到向量数据库，路径: {db_path}",
+                    "client": "Milvus Lite"
+                }
             self.milvus_client = MilvusClient(db_path)
+            self._known_collections = None
+            self._collection_schemas = {}
             #self.milvus_client = MilvusClient(uri="http://localhost:19530")
             return {
                 "success": True,
@@ -63,7 +99,8 @@ class VectorDatabase:
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
             
-            collections = self.milvus_client.list_collections()
+            # 回答缓存不是文档集合
+            collections = [name for name in self.milvus_client.list_collections() if name != RESPONSE_CACHE_COLLECTION]
             return {
                 "success": True,
                 "collections": collections
@@ -75,8 +112,14 @@ class VectorDatabase:
                 "message": f"列出集合失败: {str(e)}"
             }
     
-    def create_collection(self, collection_name: str, description: str = "") -> dict:
-        """创建集合"""
+    def create_collection(self, collection_name: str, description: str = "", hybrid: bool = False,
+                          index: Optional[Dict[str, Any]] = None) -> dict:
+        """创建集合，hybrid为True时额外创建BGE-M3稀疏向量字段，支持混合检索
+
+        index 指定稠密向量的索引，例如 {"index_type": "HNSW", "M": 16, "efConstruction": 200, "ef": 64}
+        或 {"index_type": "IVF_PQ", "nlist": 1024, "m": 16, "nprobe": 16}；搜索参数（ef、nprobe）保存在元数据中，
+        搜索时自动使用。未指定时使用 MILVUS_INDEX_TYPE 的默认参数。
+        """
         try:
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
@@ -94,39 +137,26 @@ class VectorDatabase:
                     "message": f"集合 '{collection_name}' 已存在"
                 }
             
-            # 创建集合 - MilvusClient的create_collection参数
-            self.milvus_client.create_collection(
-                collection_name=full_collection_name,
-                dimension=self.dimension,
-                metric_type="COSINE",
-                auto_id=True  # 让Milvus自动生成ID
-            )
-            
-            # 存储集合元数据（如描述信息）
-            metadata_collection_name = f"{MILVUS_COLLECTION_PREFIX}metadata"
-            if not self.milvus_client.has_collection(collection_name=metadata_collection_name):
-                self.milvus_client.create_collection(
-                    collection_name=metadata_collection_name,
-                    dimension=self.dimension,
-                    metric_type="L2",
-                    auto_id=True  # 让Milvus自动生成ID
-                )
+            index_spec = normalize_index_spec(index or {"index_type": MILVUS_INDEX_TYPE}, self.dimension)
+            self._create_indexed_collection(full_collection_name, hybrid, index_spec)
             
-            # 添加集合元数据
-            self.milvus_client.insert(
-                collection_name=metadata_collection_name,
-                data=[{
-                    "collection_name": full_collection_name,
-                    "description": description,
-                    "created_at": time.time(),
-                    "vector": [0.0] * self.dimension  # 占位向量
-                }]
-            )
+            # 存储集合元数据（描述信息、索引配置）
+            self.metadata_store.put(full_collection_name, description, hybrid, index_spec)
+            self.metadata_store.bump_version(full_collection_name)
+            self._collection_schemas[full_collection_name] = {
+                "string_ids": True,
+                "hybrid": hybrid,
+                "search_params": index_spec["search_params"],
+            }
+            if self._known_collections is not None:
+                self._known_collections.add(full_collection_name)
             
             return {
                 "success": True,
                 "message": f"成功创建集合 '{collection_name}'",
-                "collection": collection_name
+                "collection": collection_name,
+                "hybrid": hybrid,
+                "index": index_spec
             }
         except Exception as e:
             logger.error(f"创建集合失败: {str(e)}")
@@ -135,18 +165,106 @@ class VectorDatabase:
                 "message": f"创建集合失败: {str(e)}"
             }
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """生成文本嵌入向量"""
+    def _full_collection_name(self, collection_name: str) -> str:
+        """将空格替换为下划线，并在需要时添加项目前缀"""
+        collection_name = collection_name.replace(" ", "_")
+        if collection_name.startswith(MILVUS_COLLECTION_PREFIX):
+            return collection_name
+        return f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
+    
+    def _resolve_collection(self, collection_name: str) -> Optional[str]:
+        """返回集合的完整名称，集合不存在时返回None
+
+        集合名称缓存在内存中，只有遇到未知名称时才重新列出集合。
+        """
+        full_collection_name = self._full_collection_name(collection_name)
+        if self._known_collections is None or full_collection_name not in self._known_collections:
+            self._known_collections = set(self.milvus_client.list_collections())
+        return full_collection_name if full_collection_name in self._known_collections else None
+    
+    def collection_versions(self, collection_names: List[str]) -> Dict[str, int]:
+        """返回集合的内容版本号（键为完整名称），集合被创建或写入后版本号增加"""
+        return self.metadata_store.get_versions([self._full_collection_name(name) for name in collection_names])
+    
+    def _create_indexed_collection(self, full_collection_name: str, hybrid: bool, index_spec: Dict[str, Any]):
+        """按索引配置创建集合
+
+        主键由来源和位置生成，重复导入时覆盖而不是追加；文本等其他字段作为动态字段保存。
+        hybrid 集合额外包含稀疏向量字段，字段和索引与 milvus_demo/hybrid_search 一致。
+        """
+        schema = self.milvus_client.create_schema(auto_id=False, enable_dynamic_field=True)
+        schema.add_field(field_name="id", datatype=DataType.VARCHAR, is_primary=True, max_length=64)
+        schema.add_field(field_name="vector", datatype=DataType.FLOAT_VECTOR, dim=self.dimension)
+        if hybrid:
+            schema.add_field(field_name="sparse_vector", datatype=DataType.SPARSE_FLOAT_VECTOR)
+        
+        index_params = self.milvus_client.prepare_index_params()
+        index_params.add_index(
+            field_name="vector",
+            index_type=index_spec["index_type"],
+            metric_type="COSINE",
+            params=index_spec["params"]
+        )
+        if hybrid:
+            index_params.add_index(field_name="sparse_vector", index_type="SPARSE_INVERTED_INDEX", metric_type="IP")
+        
+        self.milvus_client.create_collection(
+            collection_name=full_collection_name,
+            schema=schema,
+            index_params=index_params
+        )
+    
+    def _collection_schema(self, full_collection_name: str) -> Dict[str, Any]:
+        """读取并缓存集合的主键类型、是否带稀疏向量字段和稠密向量的搜索参数"""
+        if full_collection_name not in self._collection_schemas:
+            description = self.milvus_client.describe_collection(collection_name=full_collection_name)
+            fields = description.get("fields", [])
+            primary = next((field for field in fields if field.get("is_primary")), {})
+            self._collection_schemas[full_collection_name] = {
+                "string_ids": primary.get("type") == DataType.VARCHAR,
+                "hybrid": any(field.get("name") == "sparse_vector" for field in fields),
+                "search_params": ((self.metadata_store.get(full_collection_name) or {}).get("index_spec") or {}).get("search_params", {}),
+            }
+        return self._collection_schemas[full_collection_name]
+    
+    def _has_string_ids(self, full_collection_name: str) -> bool:
+        """集合是否使用字符串主键，旧版本创建的集合使用自增整数主键，只能追加"""
+        return self._collection_schema(full_collection_name)["string_ids"]
+    
+    def _embed_documents(self, full_collection_name: str, texts: List[str]) -> List[Dict[str, Any]]:
+        """生成每个文档要写入的向量字段，混合检索集合同时生成稀疏向量"""
+        embeddings = self.generate_embeddings(texts)
+        if not self._collection_schema(full_collection_name)["hybrid"]:
+            return [{"vector": embeddings[i]} for i in range(len(texts))]
+        sparse_embeddings = self.sparse_encoder.encode_documents(texts)
+        return [{"vector": embeddings[i], "sparse_vector": sparse_embeddings[i]} for i in range(len(texts))]
+    
+    def _load_source_ids(self, full_collection_name: str, source: str) -> Set[str]:
+        """读取某个来源文件已导入的文本块主键"""
+        iterator = self.milvus_client.query_iterator(
+            collection_name=full_collection_name,
+            batch_size=1000,
+            filter=f"source == {json.dumps(source)}",
+            output_fields=["id"]
+        )
+        ids = set()
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                ids.update(row["id"] for row in rows)
+        finally:
+            iterator.close()
+        return ids
+    
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """生成文本嵌入向量，返回float32数组，每行对应一个文本"""
         try:
             if not texts:
-                return []
+                return np.zeros((0, self.dimension), dtype=np.float32)
                 
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=texts
-            )
-            
-            return [embedding.embedding for embedding in response.data]
+            return self.embedding_engine.embed(texts)
         except Exception as e:
             logger.error(f"生成嵌入向量失败: {str(e)}")
             raise
@@ -157,45 +275,45 @@ class VectorDatabase:
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
                 
-            # 处理集合名称，将空格替换为下划线
-            collection_name = collection_name.replace(" ", "_")
-            
-            # 检查是否已经包含前缀
-            if collection_name.startswith(MILVUS_COLLECTION_PREFIX):
-                full_collection_name = collection_name  # 已有前缀，直接使用
-            else:
-                # 添加前缀
-                full_collection_name = f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
-            
-            # 检查集合是否存在
-            if not self.milvus_client.has_collection(collection_name=full_collection_name):
+            full_collection_name = self._resolve_collection(collection_name)
+            if full_collection_name is None:
                 return {
                     "success": False,
                     "message": f"集合 '{collection_name}' 不存在，请先创建集合"
                 }
             
             # 生成嵌入向量
-            embeddings = self.generate_embeddings(documents)
-            
-            # 准备数据 - 使用auto_id，无需提供id字段
-            data = [
-                {
-                    "vector": embeddings[i],
-                    "text": documents[i],
-                }
-                for i in range(len(documents))
-            ]
-            
-            # 插入数据
-            result = self.milvus_client.insert(
-                collection_name=full_collection_name,
-                data=data
-            )
+            vectors = self._embed_documents(full_collection_name, documents)
+            
+            if self._has_string_ids(full_collection_name):
+                # 主键取内容哈希，相同的文档只保存一份
+                data = []
+                for i in range(len(documents)):
+                    document_hash = content_hash(documents[i])
+                    data.append({
+                        "id": document_hash,
+                        **vectors[i],
+                        "text": documents[i],
+                        "content_hash": document_hash,
+                    })
+                result = self.milvus_client.upsert(
+                    collection_name=full_collection_name,
+                    data=data
+                )
+                insert_count = result.get("upsert_count", 0)
+            else:
+                # 旧集合使用auto_id，无需提供id字段
+                result = self.milvus_client.insert(
+                    collection_name=full_collection_name,
+                    data=[{**vectors[i], "text": documents[i]} for i in range(len(documents))]
+                )
+                insert_count = result.get("insert_count", 0)
+            self.metadata_store.bump_version(full_collection_name)
             
             return {
                 "success": True,
                 "message": f"成功添加 {len(documents)} 个文档到集合 '{collection_name}'",
-                "insert_count": result.get("insert_count", 0)
+                "insert_count": insert_count
             }
         except Exception as e:
             logger.error(f"添加文档失败: {str(e)}")
@@ -204,53 +322,106 @@ class VectorDatabase:
                 "message": f"添加文档失败: {str(e)}"
             }
     
-    def search_documents(self, collection_name: str, query: str, limit: int = 5) -> dict:
-        """搜索相似文档"""
+    def search_documents(self, collection_name: str, query: str, limit: int = 5, mode: str = "dense",
+                         ranker: str = None) -> dict:
+        """搜索相似文档，mode 可选 dense（稠密向量）、sparse（关键词）或 hybrid（两者融合）"""
+        result = self.search_documents_batch(collection_name, [query], limit, mode=mode, ranker=ranker)
+        if not result["success"]:
+            return result
+        hits = result["results"][0]["results"]
+        return {
+            "success": True,
+            "results": hits,
+            "count": len(hits)
+        }
+    
+    def search_documents_batch(self, collection_name: str, queries: List[str], limit: int = 5,
+                               filters: Optional[List[Optional[str]]] = None, mode: str = "dense",
+                               ranker: str = None) -> dict:
+        """一次搜索多个查询，结果与输入顺序一致
+
+        所有查询在一个请求中生成嵌入向量，使用相同过滤条件的查询合并为一次多向量搜索。
+        filters 与 queries 一一对应，每一项是Milvus过滤表达式或None。
+        sparse 和 hybrid 模式只适用于以 hybrid=True 创建的集合；hybrid 模式用 ranker（rrf 或 weighted）融合两路结果。
+        """
         try:
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
-                
-            # 处理集合名称，将空格替换为下划线
-            collection_name = collection_name.replace(" ", "_")
-                
-            # 检查是否已经包含前缀
-            if collection_name.startswith(MILVUS_COLLECTION_PREFIX):
-                full_collection_name = collection_name  # 已有前缀，直接使用
-            else:
-                # 添加前缀
-                full_collection_name = f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
+            if filters is not None and len(filters) != len(queries):
+                return {"success": False, "message": "filters 的数量必须与 queries 相同"}
+            if mode not in SEARCH_MODES:
+                return {"success": False, "message": f"不支持的搜索模式 '{mode}'，可选: {', '.join(SEARCH_MODES)}"}
             
-            # 检查集合是否存在
-            if not self.milvus_client.has_collection(collection_name=full_collection_name):
+            full_collection_name = self._resolve_collection(collection_name)
+            if full_collection_name is None:
                 return {
                     "success": False,
                     "message": f"集合 '{collection_name}' 不存在，请先创建集合"
                 }
             
+            if mode != "dense" and not self._collection_schema(full_collection_name)["hybrid"]:
+                return {
+                    "success": False,
+                    "message": f"集合 '{collection_name}' 没有稀疏向量字段，只支持 dense 搜索，请用 hybrid=True 重新创建集合"
+                }
+            
+            # HNSW 要求 ef 不小于返回的结果数
+            search_params = dict(self._collection_schema(full_collection_name)["search_params"])
+            if "ef" in search_params:
+                search_params["ef"] = max(search_params["ef"], limit)
+            dense_params = {"metric_type": "COSINE", "params": search_params}
+            
             # 生成查询嵌入向量
-            query_embedding = self.generate_embeddings([query])[0]
+            query_embeddings = self.generate_embeddings(queries) if mode != "sparse" else None
+            query_sparse = self.sparse_encoder.encode_queries(queries) if mode != "dense" else None
             
-            # 执行向量搜索
-            results = self.milvus_client.search(
-                collection_name=full_collection_name,
-                data=[query_embedding],
-                limit=limit,
-                output_fields=["text"]
-            )
+            # 按过滤条件分组，每组一次多向量搜索
+            groups: Dict[str, List[int]] = {}
+            for i in range(len(queries)):
+                groups.setdefault((filters[i] if filters else None) or "", []).append(i)
             
-            # 解析搜索结果
-            search_results = []
-            if results and hasattr(results, "data") and len(results.data) > 0:
-                for hit in eval(results.data[0]):
-                    search_results.append({
-                        "text": hit.get("entity", {}).get("text", ""),
-                        "score": 1 - hit.get("distance", 1.0)  # 将距离转换为相似度分数
-                    })
+            search_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+            for filter_expression, indices in groups.items():
+                try:
+                    if mode == "hybrid":
+                        results = self.milvus_client.hybrid_search(
+                            collection_name=full_collection_name,
+                            reqs=[
+                                AnnSearchRequest([query_sparse[i] for i in indices], "sparse_vector",
+                                                 {"metric_type": "IP", "params": {}}, limit=limit,
+                                                 expr=filter_expression or None),
+                                AnnSearchRequest([query_embeddings[i] for i in indices], "vector",
+                                                 dense_params, limit=limit,
+                                                 expr=filter_expression or None),
+                            ],
+                            ranker=self._make_ranker(ranker),
+                            limit=limit,
+                            output_fields=["text"]
+                        )
+                    else:
+                        results = self.milvus_client.search(
+                            collection_name=full_collection_name,
+                            data=[query_embeddings[i] for i in indices] if mode == "dense" else [query_sparse[i] for i in indices],
+                            anns_field="vector" if mode == "dense" else "sparse_vector",
+                            search_params=dense_params if mode == "dense" else {"metric_type": "IP", "params": {}},
+                            filter=filter_expression,
+                            limit=limit,
+                            output_fields=["text"]
+                        )
+                except Exception:
+                    # 集合可能已被删除，下次搜索时重新加载集合名称
+                    self._known_collections = None
+                    raise
+                for i, hits in zip(indices, results):
+                    search_results[i] = self._parse_hits(hits)
             
             return {
                 "success": True,
-                "results": search_results,
-                "count": len(search_results)
+                "results": [
+                    {"query": query, "results": hits, "count": len(hits)}
+                    for query, hits in zip(queries, search_results)
+                ],
+                "count": len(queries)
             }
         except Exception as e:
             logger.error(f"搜索文档失败: {str(e)}")
@@ -259,6 +430,30 @@ class VectorDatabase:
                 "message": f"搜索文档失败: {str(e)}"
             }
     
+    @staticmethod
+    def _make_ranker(ranker: str = None):
+        """创建混合检索的融合器：rrf 按排名融合，weighted 按 稀疏:稠密 权重加权"""
+        ranker = ranker or HYBRID_RANKER
+        if ranker == "weighted":
+            return WeightedRanker(HYBRID_SPARSE_WEIGHT, HYBRID_DENSE_WEIGHT)
+        if ranker == "rrf":
+            return RRFRanker(HYBRID_RRF_K)
+        raise ValueError(f"不支持的融合方式 '{ranker}'，可选: rrf, weighted")
+    
+    @staticmethod
+    def _parse_hits(hits) -> List[Dict[str, Any]]:
+        """将一个查询的搜索结果转换为 {text, score} 列表
+
+        稠密向量使用COSINE度量、稀疏向量使用IP度量，distance越大越相似；混合检索时为融合后的分数。
+        """
+        return [
+            {
+                "text": (hit.get("entity") or {}).get("text", ""),
+                "score": float(hit.get("distance", 0.0))
+            }
+            for hit in hits
+        ]
+    
     def read_and_chunk_file(self, file_path: str, chunk_size: int = None, overlap: int = None) -> dict:
         """读取本地文件并切分成文本块"""
         try:
@@ -271,34 +466,8 @@ class VectorDatabase:
                     "message": f"文件 '{file_path}' 不存在"
                 }
             
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-            
-            # 分割文本
-            chunks = []
-            if len(text) <= chunk_size:
-                chunks.append(text)
-            else:
-                start = 0
-                while start < len(text):
-                    end = min(start + chunk_size, len(text))
-                    # 如果不是最后一个块且不是在句子末尾，尝试在句子边界分割
-                    if end < len(text):
-                        # 寻找句子结束的位置
-                        last_period = text.rfind('.', start, end)
-                        last_question = text.rfind('?', start, end)
-                        last_exclamation = text.rfind('!', start, end)
-                        
-                        # 找到最靠后的句子结束符号
-                        sentence_end = max(last_period, last_question, last_exclamation)
-                        
-                        # 如果找到了句子结束符号且它不是在开头附近，使用它作为切分点
-                        if sentence_end > start + chunk_size // 2:
-                            end = sentence_end + 1
-                            
-                    chunks.append(text[start:end])
-                    start = end - overlap
+            # 逐块读取并分割文本
+            chunks = [chunk for _, chunk in iter_file_chunks(file_path, chunk_size, overlap)]
             
             return {
                 "success": True,
@@ -314,9 +483,16 @@ class VectorDatabase:
             }
     
     def upload_file_to_collection(self, file_path: str, collection_name: str, 
-                                 chunk_size: int = None, overlap: int = None) -> dict:
-        """上传本地文件到指定集合，自动切分并向量化"""
+                                 chunk_size: int = None, overlap: int = None, hybrid: bool = False) -> dict:
+        """上传本地文件到指定集合，自动切分并向量化
+
+        文件按块流式读取，切分、嵌入和写入三个阶段并发进行，内存占用与文件大小无关。
+        集合不存在时自动创建，hybrid 决定新集合是否支持混合检索。
+        """
         try:
+            chunk_size = chunk_size or CHUNK_SIZE
+            overlap = overlap or CHUNK_OVERLAP
+            
             # 检查数据库连接
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
@@ -331,29 +507,41 @@ class VectorDatabase:
                 # 添加前缀
                 full_collection_name = f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
             
+            if not os.path.exists(file_path):
+                return {
+                    "success": False,
+                    "message": f"文件 '{file_path}' 不存在"
+                }
+            
             # 检查集合是否存在，如果不存在则创建
             if not self.milvus_client.has_collection(collection_name=full_collection_name):
-                create_result = self.create_collection(collection_name, f"Collection for {os.path.basename(file_path)}")
+                create_result = self.create_collection(collection_name, f"Collection for {os.path.basename(file_path)}", hybrid=hybrid)
                 if not create_result["success"]:
                     return create_result
             
-            # 读取和切分文件
-            chunk_result = self.read_and_chunk_file(file_path, chunk_size, overlap)
-            if not chunk_result["success"]:
-                return chunk_result
-            
-            # 添加文档到集合
-            add_result = self.add_documents(collection_name, chunk_result["chunks"])
-            if not add_result["success"]:
-                return add_result
+            try:
+                if self._has_string_ids(full_collection_name):
+                    stats = self._sync_file_chunks(file_path, full_collection_name, chunk_size, overlap)
+                else:
+                    stats = self._append_file_chunks(file_path, full_collection_name, chunk_size, overlap)
+            except Exception:
+                # 中途失败时也可能已写入部分文本块
+                self.metadata_store.bump_version(full_collection_name)
+                raise
+            # 文件未变化时集合内容不变，基于它的缓存仍然有效
+            if stats["insert_count"] or stats.get("deleted_count"):
+                self.metadata_store.bump_version(full_collection_name)
             
             return {
                 "success": True,
                 "message": f"成功上传文件 '{os.path.basename(file_path)}' 到集合 '{collection_name}'",
                 "file_name": os.path.basename(file_path),
                 "collection": collection_name,
-                "chunk_count": chunk_result["chunk_count"],
-                "insert_count": add_result.get("insert_count", 0)
+                "chunk_count": stats["chunk_count"],
+                "insert_count": stats["insert_count"],
+                "unchanged_count": stats.get("unchanged_count", 0),
+                "deleted_count": stats.get("deleted_count", 0),
+                "resumed_chunks": stats["skipped_chunks"]
             }
         except Exception as e:
             logger.error(f"上传文件失败: {str(e)}")
@@ -362,94 +550,206 @@ class VectorDatabase:
                 "message": f"上传文件失败: {str(e)}"
             } 
 
-    def get_collection_content(self, collection_name: str) -> dict:
-        """直接获取集合中的所有文档内容，不使用向量搜索"""
+    def _sync_file_chunks(self, file_path: str, full_collection_name: str, chunk_size: int, overlap: int) -> dict:
+        """按差异同步文件：未变化的文本块跳过，变化的覆盖写入，文件中已不存在的删除
+
+        分割点按内容选择，每个文本块的主键由文件路径、内容哈希和该内容在文件中的出现次序生成，与偏移无关，
+        所以在文件中间插入或删除内容时，前后未变化的文本块不会重新写入，重新导入的开销只与变化的部分有关。
+        offset字段记录的是文本块写入时的位置。写入是幂等的，导入中断后重新上传即可继续，不需要检查点。
+        """
+        source = os.path.abspath(file_path)
+        existing = self._load_source_ids(full_collection_name, source)
+        seen = set()
+        occurrences: Dict[str, int] = {}
+        unchanged = {"count": 0}
+        
+        def changed_chunks():
+            for offset, text in iter_file_chunks(file_path, chunk_size, overlap, anchored=True):
+                text_hash = content_hash(text)
+                occurrence = occurrences.get(text_hash, 0)
+                occurrences[text_hash] = occurrence + 1
+                row_id = chunk_id(source, text_hash, occurrence)
+                seen.add(row_id)
+                if row_id in existing:
+                    unchanged["count"] += 1
+                    continue
+                yield offset, text, row_id, text_hash
+        
+        def write_batch(batch, vectors):
+            result = self.milvus_client.upsert(
+                collection_name=full_collection_name,
+                data=[
+                    {
+                        "id": row_id,
+                        **vectors[i],
+                        "text": text,
+                        "source": source,
+                        "offset": offset,
+                        "content_hash": text_hash,
+                    }
+                    for i, (offset, text, row_id, text_hash) in enumerate(batch)
+                ]
+            )
+            return result.get("upsert_count", 0)
+        
+        stats = run_ingestion_pipeline(
+            changed_chunks(),
+            embed=lambda texts: self._embed_documents(full_collection_name, texts),
+            write=write_batch,
+            batch_size=INGEST_BATCH_SIZE,
+            queue_size=INGEST_QUEUE_SIZE,
+        )
+        
+        # 删除文件中已经不存在的文本块
+        removed = [row_id for row_id in existing if row_id not in seen]
+        if removed:
+            self.milvus_client.delete(collection_name=full_collection_name, ids=removed)
+        
+        stats["chunk_count"] = len(seen)
+        stats["unchanged_count"] = unchanged["count"]
+        stats["deleted_count"] = len(removed)
+        return stats
+    
+    def _append_file_chunks(self, file_path: str, full_collection_name: str, chunk_size: int, overlap: int) -> dict:
+        """向自增主键的旧集合追加文件内容，中断后从检查点继续"""
+        checkpoint = IngestionCheckpoint(INGEST_CHECKPOINT_DIR, file_path, full_collection_name, chunk_size, overlap)
+        if checkpoint.committed_chunks:
+            logger.info(f"从检查点继续导入 '{file_path}'，跳过已写入的 {checkpoint.committed_chunks} 个文本块")
+        
+        def write_batch(batch, embeddings):
+            result = self.milvus_client.insert(
+                collection_name=full_collection_name,
+                data=[{"vector": embeddings[i], "text": text} for i, (_, text) in enumerate(batch)]
+            )
+            return result.get("insert_count", 0)
+        
+        stats = run_ingestion_pipeline(
+            iter_file_chunks(file_path, chunk_size, overlap),
+            embed=self.generate_embeddings,
+            write=write_batch,
+            batch_size=INGEST_BATCH_SIZE,
+            queue_size=INGEST_QUEUE_SIZE,
+            skip_chunks=checkpoint.committed_chunks,
+            on_batch_written=checkpoint.save,
+        )
+        checkpoint.clear()
+        return stats
+    
+    def iter_collection(self, collection_name: str, output_fields: Optional[List[str]] = None,
+                        page_size: int = None, filter: str = "") -> Iterator[List[Dict[str, Any]]]:
+        """按页遍历集合中的所有记录，每次只在内存中保留一页
+
+        output_fields 为要返回的字段，默认返回全部字段（包括向量）；集合不存在时抛出 ValueError。
+        """
+        full_collection_name = self._resolve_collection(collection_name)
+        if full_collection_name is None:
+            raise ValueError(f"集合 '{collection_name}' 不存在")
+        iterator = self.milvus_client.query_iterator(
+            collection_name=full_collection_name,
+            batch_size=page_size or EXPORT_PAGE_SIZE,
+            filter=filter,
+            output_fields=output_fields or ["*"]
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                yield rows
+        finally:
+            iterator.close()
+    
+    def export_collection(self, collection_name: str, output_path: str, format: str = None,
+                          output_fields: Optional[List[str]] = None, page_size: int = None, filter: str = "") -> dict:
+        """将集合逐页导出为JSONL或Parquet文件，用于备份或重新生成嵌入
+
+        format 为 jsonl 或 parquet，默认根据文件扩展名判断；Parquet 需要安装 pyarrow。
+        """
         try:
             if not self.milvus_client:
                 return {"success": False, "message": "数据库未连接，请先调用connect_database"}
-                
-            # 处理集合名称，将空格替换为下划线
-            collection_name = collection_name.replace(" ", "_")
-                
-            # 检查是否已经包含前缀
-            if collection_name.startswith(MILVUS_COLLECTION_PREFIX):
-                full_collection_name = collection_name  # 已有前缀，直接使用
+            
+            format = (format or os.path.splitext(output_path)[1].lstrip(".") or "jsonl").lower()
+            if format not in ("jsonl", "parquet"):
+                return {"success": False, "message": f"不支持的导出格式 '{format}'，可选: jsonl, parquet"}
+            
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            
+            pages = self.iter_collection(collection_name, output_fields, page_size, filter)
+            if format == "jsonl":
+                row_count = write_jsonl(pages, output_path)
             else:
-                # 添加前缀
-                full_collection_name = f"{MILVUS_COLLECTION_PREFIX}{collection_name}"
+                row_count = write_parquet(pages, output_path)
             
-            # 检查集合是否存在
-            if not self.milvus_client.has_collection(collection_name=full_collection_name):
+            return {
+                "success": True,
+                "message": f"成功导出集合 '{collection_name}' 的 {row_count} 条记录到 '{output_path}'",
+                "path": output_path,
+                "format": format,
+                "count": row_count
+            }
+        except Exception as e:
+            logger.error(f"导出集合失败: {str(e)}")
+            return {
+                "success": False,
+                "message": f"导出集合失败: {str(e)}"
+            }
+    
+    def get_collection_content(self, collection_name: str, limit: int = 100) -> dict:
+        """直接获取集合中的文档内容，不使用向量搜索
+
+        最多返回 limit 条，total 为集合中的记录总数，truncated 表示是否还有未返回的文档；完整内容请用 export_collection。
+        """
+        try:
+            if not self.milvus_client:
+                return {"success": False, "message": "数据库未连接，请先调用connect_database"}
+            
+            full_collection_name = self._resolve_collection(collection_name)
+            if full_collection_name is None:
                 return {
                     "success": False,
                     "message": f"集合 '{collection_name}' 不存在，请先创建集合"
                 }
             
             # 获取集合信息
-            count = self.milvus_client.get_collection_stats(collection_name=full_collection_name)
-            row_count = count.get("row_count", 0)
+            stats = self.milvus_client.get_collection_stats(collection_name=full_collection_name)
+            row_count = stats.get("row_count", 0)
             
             if row_count == 0:
                 return {
                     "success": True,
                     "message": f"集合 '{collection_name}' 为空",
                     "count": 0,
+                    "total": 0,
+                    "truncated": False,
                     "documents": []
                 }
-                
-            # 查询所有文档
-            try:
-                result = self.milvus_client.query(
-                    collection_name=full_collection_name,
-                    filter="",
-                    output_fields=["text"],
-                    limit=100
-                )
-                
-                documents = []
-                if result:
-                    for item in result:
-                        if "text" in item:
-                            documents.append(item["text"])
-                
-                return {
-                    "success": True,
-                    "message": f"成功获取集合 '{collection_name}' 中的文档",
-                    "count": len(documents),
-                    "documents": documents
-                }
-            except Exception as e:
-                logger.error(f"查询集合内容失败: {str(e)}")
-                
-                # 尝试替代方案
-                try:
-                    result = self.milvus_client.get(
-                        collection_name=full_collection_name,
-                        ids=[],
-                        output_fields=["text"]
-                    )
-                    
-                    documents = []
-                    if result:
-                        for item in result:
-                            if "text" in item:
-                                documents.append(item["text"])
-                    
-                    return {
-                        "success": True,
-                        "message": f"成功获取集合 '{collection_name}' 中的文档 (备用方法)",
-                        "count": len(documents),
-                        "documents": documents
-                    }
-                except Exception as e2:
-                    logger.error(f"备用方法查询集合内容也失败: {str(e2)}")
-                    return {
-                        "success": False,
-                        "message": f"获取集合内容失败: 主方法错误: {str(e)}, 备用方法错误: {str(e2)}"
-                    }
+            
+            # 按页读取，读够 limit 条即停止
+            documents = []
+            for rows in self.iter_collection(full_collection_name, ["text"], page_size=min(limit, EXPORT_PAGE_SIZE)):
+                documents.extend(row["text"] for row in rows if "text" in row)
+                if len(documents) >= limit:
+                    break
+            documents = documents[:limit]
+            truncated = row_count > len(documents)
+            
+            return {
+                "success": True,
+                "message": (
+                    f"成功获取集合 '{collection_name}' 中的文档"
+                    + (f"，共 {row_count} 条，只返回前 {len(documents)} 条" if truncated else "")
+                ),
+                "count": len(documents),
+                "total": row_count,
+                "truncated": truncated,
+                "documents": documents
+            }
         except Exception as e:
             logger.error(f"获取集合内容失败: {str(e)}")
             return {
                 "success": False,
                 "message": f"获取集合内容失败: {str(e)}"
-            } 
\ No newline at end of file
+            }
@@ -1,27 +1,152 @@
-import requests
+import asyncio
+import codecs
+import hashlib
+import json
 import os
 import logging
 from bs4 import BeautifulSoup
 import time
 import re
+import threading
 from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
 from typing import Optional, Dict, List, Any
 
+import aiohttp
+
+from .config import (
+    DOWNLOAD_MAX_CONNECTIONS, DOWNLOAD_PER_HOST_CONCURRENCY, DOWNLOAD_PER_HOST_DELAY,
+    DOWNLOAD_TIMEOUT, DOWNLOAD_RESPECT_ROBOTS, DOWNLOAD_ROBOTS_TTL
+)
+from .content_extraction import html_to_text, main_content_bs4, all_paragraphs_bs4
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("WebDownloader")
 
+
+class HostScheduler:
+    """按站点限制并发数和请求间隔，不同站点之间互不影响"""
+
+    def __init__(self, per_host_concurrency: int, per_host_delay: float):
+        """初始化调度器"""
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_request_at: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+        # 每个站点的robots.txt只请求一次
+        self.robots_locks: Dict[str, asyncio.Lock] = {}
+
+    def set_delay(self, host: str, delay: float):
+        """为站点设置更长的请求间隔，例如robots.txt中的Crawl-delay"""
+        self._delays[host] = max(delay, self.per_host_delay)
+
+    async def acquire(self, host: str):
+        """等待站点的空闲并发名额和请求间隔"""
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        await semaphore.acquire()
+        try:
+            async with self._locks.setdefault(host, asyncio.Lock()):
+                wait = self._next_request_at.get(host, 0.0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_request_at[host] = time.monotonic() + self._delays.get(host, self.per_host_delay)
+        except BaseException:
+            semaphore.release()
+            raise
+
+    def release(self, host: str):
+        """释放站点的并发名额"""
+        self._semaphores[host].release()
+
+
 class WebDownloader:
-    """网页下载和文本提取工具"""
+    """网页下载和文本提取工具
+
+    下载基于asyncio，所有请求共享一个连接池；同一站点按并发数和请求间隔限速，不同站点并行下载。
+    已下载的URL记录ETag和Last-Modified，再次下载时使用条件请求，未修改则直接复用本地文件。
+    """
     
-    def __init__(self, download_dir: str = "kimi-k2-milvus/data/downloads"):
+    def __init__(self, download_dir: str = "kimi-k2-milvus/data/downloads",
+                 per_host_concurrency: int = None, per_host_delay: float = None,
+                 respect_robots: bool = None, html_parser: str = None):
         """初始化网页下载器"""
         self.download_dir = download_dir
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
         }
+        self.per_host_concurrency = per_host_concurrency or DOWNLOAD_PER_HOST_CONCURRENCY
+        self.per_host_delay = DOWNLOAD_PER_HOST_DELAY if per_host_delay is None else per_host_delay
+        self.respect_robots = DOWNLOAD_RESPECT_ROBOTS if respect_robots is None else respect_robots
+        # HTML解析器：auto、selectolax、lxml 或 html.parser
+        self.html_parser = html_parser
+        # robots.txt 缓存: {站点根地址: (解析结果, 过期时间)}
+        self._robots: Dict[str, Any] = {}
+        # 已下载URL的索引，用于条件请求
+        self.index_path = os.path.join(self.download_dir, ".download_index.json")
+        self._index_lock = threading.Lock()
         # 创建下载目录
         os.makedirs(self.download_dir, exist_ok=True)
+        self._index = self._load_index()
+    
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """读取下载索引 {url: {file_path, etag, last_modified}}"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _update_index(self, url: str, entry: Dict[str, Any]):
+        """更新下载索引并写回磁盘"""
+        with self._index_lock:
+            self._index[url] = entry
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.index_path)
+    
+    @staticmethod
+    def _run(coro):
+        """在同步代码中运行协程"""
+        return asyncio.run(coro)
+    
+    def _new_session(self) -> aiohttp.ClientSession:
+        """创建共享连接池的会话，每个站点的连接数不超过其并发数"""
+        connector = aiohttp.TCPConnector(limit=DOWNLOAD_MAX_CONNECTIONS, limit_per_host=self.per_host_concurrency)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)
+        )
+    
+    async def _allowed_by_robots(self, session: aiohttp.ClientSession, scheduler: HostScheduler, url: str) -> bool:
+        """检查robots.txt是否允许抓取，结果按站点缓存"""
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        root = f"{parsed.scheme}://{parsed.netloc}"
+        async with scheduler.robots_locks.setdefault(root, asyncio.Lock()):
+            cached = self._robots.get(root)
+            if cached is None or cached[1] < time.monotonic():
+                parser = RobotFileParser()
+                try:
+                    async with session.get(f"{root}/robots.txt") as response:
+                        if response.status >= 400:
+                            # 没有robots.txt时允许抓取
+                            parser.parse([])
+                        else:
+                            parser.parse((await response.text(errors="replace")).splitlines())
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    parser.parse([])
+                cached = self._robots[root] = (parser, time.monotonic() + DOWNLOAD_ROBOTS_TTL)
+        parser = cached[0]
+        crawl_delay = parser.crawl_delay(self.headers["User-Agent"])
+        if crawl_delay:
+            scheduler.set_delay(parsed.netloc, float(crawl_delay))
+        return parser.can_fetch(self.headers["User-Agent"], url)
     
     def download_webpage(self, url: str) -> Dict[str, Any]:
         """
@@ -33,53 +158,75 @@ class WebDownloader:
         Returns:
             包含下载状态和提取内容的字典
         """
+        return self._run(self.adownload_batch([url]))[0]
+    
+    async def adownload_batch(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """并发下载多个网页，结果与输入顺序一致"""
+        scheduler = HostScheduler(self.per_host_concurrency, self.per_host_delay)
+        async with self._new_session() as session:
+            return await asyncio.gather(*[self._download(session, scheduler, url) for url in urls])
+    
+    async def _download(self, session: aiohttp.ClientSession, scheduler: HostScheduler, url: str) -> Dict[str, Any]:
+        """下载单个网页：检查robots.txt，发送条件请求，流式写入文件"""
         try:
-            # 构建保存文件名
             domain = urlparse(url).netloc
-            timestamp = int(time.time())
-            file_name = f"{domain.replace('.', '_')}_{timestamp}.txt"
-            file_path = os.path.join(self.download_dir, file_name)
-            
-            # 下载网页
-            logger.info(f"开始下载: {url}")
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            
-            # 解析HTML
-            soup = BeautifulSoup(response.text, "html.parser")
+            if not await self._allowed_by_robots(session, scheduler, url):
+                logger.info(f"robots.txt 禁止抓取: {url}")
+                return {"success": False, "url": url, "error": "robots.txt 禁止抓取该页面"}
             
-            # 移除脚本和样式元素
-            for element in soup(["script", "style", "head", "header", "footer", "nav"]):
-                element.decompose()
+            # 已下载过且文件还在时，使用条件请求
+            headers = {}
+            previous = self._index.get(url)
+            if previous and os.path.exists(previous.get("file_path", "")):
+                if previous.get("etag"):
+                    headers["If-None-Match"] = previous["etag"]
+                if previous.get("last_modified"):
+                    headers["If-Modified-Since"] = previous["last_modified"]
+            else:
+                previous = None
             
-            # 提取正文内容
-            text = self._extract_main_content(soup)
-            
-            # 如果内容太少，尝试另一种提取方式
-            if len(text.split()) < 100:
-                text = self._extract_all_text(soup)
-            
-            # 清理文本
-            text = self._clean_text(text)
-            
-            # 保存到文件
-            with open(file_path, "w", encoding="utf-8") as file:
-                # 添加元数据
-                file.write(f"URL: {url}\n")
-                file.write(f"下载时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                file.write("="*80 + "\n\n")
-                # 写入正文
-                file.write(text)
+            await scheduler.acquire(domain)
+            try:
+                logger.info(f"开始下载: {url}")
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and previous:
+                        logger.info(f"未修改，使用已下载的文件: {url} -> {previous['file_path']}")
+                        return {**self._file_result(url, previous["file_path"]), "not_modified": True}
+                    response.raise_for_status()
+                    
+                    # 构建保存文件名
+                    timestamp = int(time.time())
+                    file_name = f"{domain.replace('.', '_')}_{timestamp}.txt"
+                    file_path = os.path.join(self.download_dir, file_name)
+                    if os.path.exists(file_path):
+                        file_name = f"{domain.replace('.', '_')}_{timestamp}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.txt"
+                        file_path = os.path.join(self.download_dir, file_name)
+                    
+                    if response.content_type == "text/plain":
+                        preview, content_length = await self._stream_text(response, url, file_path)
+                    else:
+                        html = await response.text(errors="replace")
+                        # 解析HTML较耗CPU，放到线程中执行，不阻塞其他下载
+                        text = await asyncio.get_running_loop().run_in_executor(None, self._html_to_text, html)
+                        self._write_text(url, file_path, text)
+                        preview, content_length = text[:500], len(text)
+                    
+                    self._update_index(url, {
+                        "file_path": file_path,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    })
+            finally:
+                scheduler.release(domain)
             
             logger.info(f"下载完成: {url} -> {file_path}")
-            
             return {
                 "success": True,
                 "url": url,
                 "file_path": file_path,
                 "file_name": file_name,
-                "content": text[:500] + "..." if len(text) > 500 else text,  # 返回预览
-                "content_length": len(text)
+                "content": preview + "..." if content_length > 500 else preview,  # 返回预览
+                "content_length": content_length
             }
             
         except Exception as e:
@@ -87,42 +234,70 @@ class WebDownloader:
             return {
                 "success": False,
                 "url": url,
-                "error": str(e)
+                "error": str(e) or type(e).__name__
             }
     
+    def _file_header(self, url: str) -> str:
+        """下载文件开头的元数据"""
+        return f"URL: {url}\n下载时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n" + "=" * 80 + "\n\n"
+    
+    def _write_text(self, url: str, file_path: str, text: str):
+        """保存提取后的正文"""
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(self._file_header(url))
+            file.write(text)
+    
+    async def _stream_text(self, response: aiohttp.ClientResponse, url: str, file_path: str):
+        """将纯文本响应逐块写入文件，返回 (前500字符预览, 字符数)"""
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        preview, content_length = "", 0
+        part_path = file_path + ".part"
+        with open(part_path, "w", encoding="utf-8") as file:
+            file.write(self._file_header(url))
+            async for block in response.content.iter_chunked(64 * 1024):
+                text = self._strip_control_chars(decoder.decode(block))
+                file.write(text)
+                content_length += len(text)
+                if len(preview) < 500:
+                    preview += text[:500 - len(preview)]
+            text = self._strip_control_chars(decoder.decode(b"", final=True))
+            file.write(text)
+            content_length += len(text)
+        os.replace(part_path, file_path)
+        return preview, content_length
+    
+    def _file_result(self, url: str, file_path: str) -> Dict[str, Any]:
+        """由已下载的文件构造下载结果"""
+        with open(file_path, "r", encoding="utf-8") as file:
+            content = file.read().split("=" * 80 + "\n\n", 1)[-1]
+        return {
+            "success": True,
+            "url": url,
+            "file_path": file_path,
+            "file_name": os.path.basename(file_path),
+            "content": content[:500] + "..." if len(content) > 500 else content,
+            "content_length": len(content)
+        }
+    
+    def _html_to_text(self, html: str) -> str:
+        """从HTML中提取并清理正文"""
+        return self._clean_text(html_to_text(html, self.html_parser))
+    
     def _extract_main_content(self, soup: BeautifulSoup) -> str:
         """
         提取页面主要内容
-        尝试找到具有最多文本内容的区域
+        一次自底向上遍历为每个容器打分，选择正文段落最密集、链接最少的区域
         """
-        # 尝试查找常见的内容容器
-        candidates = soup.find_all(["article", "main", "div", "section"])
-        
-        best_candidate = None
-        max_text_length = 0
-        
-        for candidate in candidates:
-            text = candidate.get_text(strip=True)
-            if len(text) > max_text_length:
-                max_text_length = len(text)
-                best_candidate = candidate
-        
-        if best_candidate:
-            paragraphs = best_candidate.find_all("p")
-            if paragraphs:
-                return "\n\n".join(p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 0)
-        
-        # 如果没有找到合适的内容，返回整个页面文本
-        return soup.get_text(separator="\n\n")
+        return main_content_bs4(soup)
     
     def _extract_all_text(self, soup: BeautifulSoup) -> str:
         """提取所有段落文本"""
-        paragraphs = soup.find_all("p")
-        if paragraphs:
-            return "\n\n".join(p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 0)
-        else:
-            # 退化情况：返回所有文本
-            return soup.get_text(separator="\n\n")
+        return all_paragraphs_bs4(soup)
+    
+    @staticmethod
+    def _strip_control_chars(text: str) -> str:
+        """删除非打印字符"""
+        return re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', text)
     
     def _clean_text(self, text: str) -> str:
         """清理提取的文本"""
@@ -131,20 +306,18 @@ class WebDownloader:
         # 移除多余的换行符
         text = re.sub(r'\n\s*\n+', '\n\n', text)
         # 删除非打印字符
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]', '', text)
+        text = self._strip_control_chars(text)
         return text.strip()
     
     def batch_download(self, urls: List[str]) -> List[Dict[str, Any]]:
-        """批量下载多个网页"""
-        results = []
-        for url in urls:
-            result = self.download_webpage(url)
-            results.append(result)
-            # 添加延迟避免过快请求
-            time.sleep(1)
-        return results 
+        """批量下载多个网页，不同站点并行下载，同一站点按间隔限速"""
+        return self._run(self.adownload_batch(urls))
 
     def download_free_books(self, count: int = 3) -> List[Dict[str, Any]]:
+        """下载几本免费的经典文学作品txt文档，参见 adownload_free_books"""
+        return self._run(self.adownload_free_books(count))
+
+    async def adownload_free_books(self, count: int = 3) -> List[Dict[str, Any]]:
         """
         下载几本免费的经典文学作品txt文档
         
@@ -180,21 +353,10 @@ class WebDownloader:
         
         # 限制下载数量
         books_to_download = free_books[:min(count, len(free_books))]
-        results = []
+        logger.info(f"正在下载经典文学作品: {', '.join(book['title'] for book in books_to_download)}")
         
-        for book in books_to_download:
-            try:
-                logger.info(f"正在下载经典文学作品: {book['title']}")
-                result = self.download_webpage(book['url'])
-                result['title'] = book['title']
-                results.append(result)
-            except Exception as e:
-                logger.error(f"下载 {book['title']} 失败: {str(e)}")
-                results.append({
-                    "success": False,
-                    "title": book['title'],
-                    "url": book['url'],
-                    "error": str(e)
-                })
+        results = await self.adownload_batch([book['url'] for book in books_to_download])
+        for book, result in zip(books_to_download, results):
+            result['title'] = book['title']
         
         return results 
\ No newline at end of file
@@ -6,8 +6,6 @@ import requests
 import random 
 import concurrent
 import hashlib
-import aiohttp
-import httpx
 import time
 from typing import List, Optional, Dict, Any, Union, Literal, Annotated, cast
 from urllib.parse import unquote
@@ -16,7 +14,6 @@ import itertools
 
 from exa_py import Exa
 from linkup import LinkupClient
-from tavily import AsyncTavilyClient
 from azure.core.credentials import AzureKeyCredential
 from azure.search.documents.aio import SearchClient as AsyncAzureAISearchClient
 from duckduckgo_search import DDGS 
@@ -41,6 +38,7 @@ from langsmith import traceable
 from legacy.configuration import Configuration
 from legacy.state import Section
 from legacy.prompts import SUMMARIZATION_PROMPT
+from open_deep_research.utils import PooledTavilyClient, pooled_aiohttp_session, pooled_http_client
 
 
 def get_config_value(value):
@@ -199,7 +197,7 @@ async def tavily_search_async(search_queries, max_results: int = 5, topic: Liter
                     ]
                 }
     """
-    tavily_async_client = AsyncTavilyClient()
+    tavily_async_client = PooledTavilyClient()
     search_tasks = []
     for query in search_queries:
             search_tasks.append(
@@ -986,7 +984,7 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                         }
                         print(f"Requesting {num} results for '{query}' from Google API...")
 
-                        async with aiohttp.ClientSession() as session:
+                        async with pooled_aiohttp_session() as session:
                             async with session.get('https://www.googleapis.com/customsearch/v1', params=params) as response:
                                 if response.status != 200:
                                     error_text = await response.text()
@@ -1112,7 +1110,7 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                 if include_raw_content and results:
                     content_semaphore = asyncio.Semaphore(3)
                     
-                    async with aiohttp.ClientSession() as session:
+                    async with pooled_aiohttp_session() as session:
                         fetch_tasks = []
                         
                         async def fetch_full_content(result):
@@ -1205,14 +1203,14 @@ async def scrape_pages(titles: List[str], urls: List[str]) -> str:
     """
     
     # Create an async HTTP client
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+    async with pooled_http_client() as client:
         pages = []
         
         # Fetch each URL and convert to markdown
         for url in urls:
             try:
                 # Fetch the content
-                response = await client.get(url)
+                response = await client.get(url, timeout=30.0)
                 response.raise_for_status()
                 
                 # Convert HTML to markdown if successful
@@ -10,6 +10,11 @@ class SearchAPI(Enum):
     TAVILY = "tavily"
     NONE = "none"
 
+class InstrumentationExporter(Enum):
+    NONE = "none"
+    LOG = "log"
+    PROMETHEUS = "prometheus"
+
 class MCPConfig(BaseModel):
     url: Optional[str] = Field(
         default=None,
@@ -188,6 +193,131 @@ class Configuration(BaseModel):
             }
         }
     )
+    final_report_streaming: bool = Field(
+        default=False,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "boolean",
+                "default": False,
+                "description": "Whether to fit the research findings into the final report model's context before calling it and stream the report as it is written. Models missing from the token limit map fall back to retrying with shorter findings."
+            }
+        }
+    )
+    # Report Synthesis Configuration
+    synthesis_max_concurrency: int = Field(
+        default=5,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "slider",
+                "default": 5,
+                "min": 1,
+                "max": 20,
+                "step": 1,
+                "description": "Maximum number of note groups merged concurrently when the research notes are too large for the final report model"
+            }
+        }
+    )
+    synthesis_max_depth: int = Field(
+        default=3,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "slider",
+                "default": 3,
+                "min": 1,
+                "max": 5,
+                "step": 1,
+                "description": "Maximum number of rounds used to merge research notes before the final report. Notes that still do not fit are truncated by the final report step."
+            }
+        }
+    )
+    # Summarization Cache Configuration
+    summarization_cache_enabled: bool = Field(
+        default=True,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "boolean",
+                "default": True,
+                "description": "Whether to reuse webpage summaries for pages that have already been summarized with the same model and prompt"
+            }
+        }
+    )
+    summarization_cache_path: str = Field(
+        default="",
+        metadata={
+            "x_oap_ui_config": {
+                "type": "text",
+                "default": "",
+                "description": "Path of a SQLite file used to persist webpage summaries across runs. Leave empty to only keep summaries in memory."
+            }
+        }
+    )
+    summarization_cache_ttl_seconds: int = Field(
+        default=7 * 24 * 60 * 60,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 604800,
+                "min": 0,
+                "description": "Number of seconds a cached webpage summary stays valid. Set to 0 to never expire entries."
+            }
+        }
+    )
+    summarization_cache_max_entries: int = Field(
+        default=10000,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 10000,
+                "min": 1,
+                "description": "Maximum number of summaries kept on disk. The least recently used entries are evicted first."
+            }
+        }
+    )
+    # Summarization Scheduling Configuration
+    summarization_max_in_flight: int = Field(
+        default=20,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 20,
+                "min": 1,
+                "description": "Maximum number of webpage summarization calls in flight at once across all researchers in the process"
+            }
+        }
+    )
+    summarization_tokens_per_minute: int = Field(
+        default=0,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 0,
+                "min": 0,
+                "description": "Token-per-minute budget for the summarization model, counting prompt and maximum output tokens. Set to 0 for no budget."
+            }
+        }
+    )
+    summarization_timeout_seconds: float = Field(
+        default=60.0,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 60,
+                "min": 1,
+                "description": "Timeout for a single webpage summarization call, not counting time spent waiting for a slot"
+            }
+        }
+    )
+    summarization_deadline_seconds: float = Field(
+        default=120.0,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 120,
+                "min": 1,
+                "description": "Time after which a search returns with the summaries it has, using the search snippet for pages that are still being summarized"
+            }
+        }
+    )
     # MCP server configuration
     mcp_config: Optional[MCPConfig] = Field(
         default=None,
@@ -209,6 +339,33 @@ class Configuration(BaseModel):
             }
         }
     )
+    tool_registry_ttl_seconds: int = Field(
+        default=300,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "number",
+                "default": 300,
+                "min": 0,
+                "description": "Number of seconds researchers reuse the loaded tool list and a warm MCP session before reloading them. Entries are also reloaded when the MCP access token expires. Set to 0 to reload tools on every step."
+            }
+        }
+    )
+    # Instrumentation Configuration
+    instrumentation_exporter: InstrumentationExporter = Field(
+        default=InstrumentationExporter.NONE,
+        metadata={
+            "x_oap_ui_config": {
+                "type": "select",
+                "default": "none",
+                "description": "Where to send per-node timing, token, tool call, cache and retry metrics, keyed by thread_id",
+                "options": [
+                    {"label": "None", "value": InstrumentationExporter.NONE.value},
+                    {"label": "Log", "value": InstrumentationExporter.LOG.value},
+                    {"label": "Prometheus", "value": InstrumentationExporter.PROMETHEUS.value}
+                ]
+            }
+        }
+    )
 
 
     @classmethod
@@ -1,9 +1,11 @@
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage, get_buffer_string, filter_messages
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage, get_buffer_string, filter_messages, message_chunk_to_message
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, END, StateGraph
 from langgraph.types import Command
+from langgraph.config import get_stream_writer
 import asyncio
+import logging
 from typing import Literal
 from open_deep_research.configuration import (
     Configuration, 
@@ -26,8 +28,10 @@ from open_deep_research.prompts import (
     compress_research_system_prompt,
     compress_research_simple_human_message,
     final_report_generation_prompt,
+    synthesize_notes_prompt,
     lead_researcher_prompt
 )
+from open_deep_research.instrumentation import instrument_node, record_retry
 from open_deep_research.utils import (
     get_today_str,
     is_token_limit_exceeded,
@@ -37,14 +41,25 @@ from open_deep_research.utils import (
     anthropic_websearch_called,
     remove_up_to_last_ai_message,
     get_api_key_for_model,
-    get_notes_from_tool_calls
+    get_notes_from_tool_calls,
+    get_search_broker_id,
+    open_search_broker,
+    close_search_broker,
+    count_tokens,
+    fit_texts_to_budget,
+    truncate_to_tokens,
+    trim_tool_messages_to_budget
 )
 
+# Token counts from the fallback tokenizer are approximate, so only this share of a model's context is packed
+CONTEXT_WINDOW_SHARE = 0.9
+
 # Initialize a configurable model that we will use throughout the agent
 configurable_model = init_chat_model(
     configurable_fields=("model", "max_tokens", "api_key"),
 )
 
+@instrument_node
 async def clarify_with_user(state: AgentState, config: RunnableConfig) -> Command[Literal["write_research_brief", "__end__"]]:
     configurable = Configuration.from_runnable_config(config)
     if not configurable.allow_clarification:
@@ -64,6 +79,7 @@ async def clarify_with_user(state: AgentState, config: RunnableConfig) -> Comman
         return Command(goto="write_research_brief", update={"messages": [AIMessage(content=response.verification)]})
 
 
+@instrument_node
 async def write_research_brief(state: AgentState, config: RunnableConfig)-> Command[Literal["research_supervisor"]]:
     configurable = Configuration.from_runnable_config(config)
     research_model_config = {
@@ -95,6 +111,7 @@ async def write_research_brief(state: AgentState, config: RunnableConfig)-> Comm
     )
 
 
+@instrument_node
 async def supervisor(state: SupervisorState, config: RunnableConfig) -> Command[Literal["supervisor_tools"]]:
     configurable = Configuration.from_runnable_config(config)
     research_model_config = {
@@ -116,6 +133,7 @@ async def supervisor(state: SupervisorState, config: RunnableConfig) -> Command[
     )
 
 
+@instrument_node
 async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Command[Literal["supervisor", "__end__"]]:
     configurable = Configuration.from_runnable_config(config)
     supervisor_messages = state.get("supervisor_messages", [])
@@ -128,7 +146,10 @@ async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Co
     exceeded_allowed_iterations = research_iterations >= configurable.max_researcher_iterations
     no_tool_calls = not most_recent_message.tool_calls
     research_complete_tool_call = any(tool_call["name"] == "ResearchComplete" for tool_call in most_recent_message.tool_calls)
+    # All researchers launched during this supervisor run share one search broker
+    search_broker_id = get_search_broker_id(config, state.get("research_brief", ""))
     if exceeded_allowed_iterations or no_tool_calls or research_complete_tool_call:
+        log_search_broker_report(search_broker_id)
         return Command(
             goto=END,
             update={
@@ -137,11 +158,16 @@ async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Co
             }
         )
     # Otherwise, conduct research and gather results.
+    # The broker is kept for the next supervisor iteration only when this one hands back to the supervisor;
+    # failed or cancelled runs release it in the finally block.
+    keep_search_broker = False
     try:
         all_conduct_research_calls = [tool_call for tool_call in most_recent_message.tool_calls if tool_call["name"] == "ConductResearch"]
         conduct_research_calls = all_conduct_research_calls[:configurable.max_concurrent_research_units]
         overflow_conduct_research_calls = all_conduct_research_calls[configurable.max_concurrent_research_units:]
         researcher_system_prompt = research_system_prompt.format(mcp_prompt=configurable.mcp_prompt or "", date=get_today_str())
+        open_search_broker(search_broker_id)
+        researcher_config = {**config, "configurable": {**config.get("configurable", {}), "search_broker_id": search_broker_id}}
         coros = [
             researcher_subgraph.ainvoke({
                 "researcher_messages": [
@@ -149,7 +175,7 @@ async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Co
                     HumanMessage(content=tool_call["args"]["research_topic"])
                 ],
                 "research_topic": tool_call["args"]["research_topic"]
-            }, config) 
+            }, researcher_config)
             for tool_call in conduct_research_calls
         ]
         tool_results = await asyncio.gather(*coros)
@@ -166,6 +192,7 @@ async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Co
                 tool_call_id=overflow_conduct_research_call["id"]
             ))
         raw_notes_concat = "\n".join(["\n".join(observation.get("raw_notes", [])) for observation in tool_results])
+        keep_search_broker = True
         return Command(
             goto="supervisor",
             update={
@@ -185,6 +212,18 @@ async def supervisor_tools(state: SupervisorState, config: RunnableConfig) -> Co
                 "research_brief": state.get("research_brief", "")
             }
         )
+    finally:
+        if not keep_search_broker:
+            log_search_broker_report(search_broker_id)
+
+
+def log_search_broker_report(search_broker_id: str):
+    report = close_search_broker(search_broker_id)
+    if report:
+        logging.info(
+            f"Search broker report: {report['search_calls_saved']} of {report['search_requests']} searches and "
+            f"{report['summary_calls_saved']} of {report['summary_requests']} summarizations saved ({report})"
+        )
 
 
 supervisor_builder = StateGraph(SupervisorState, config_schema=Configuration)
@@ -194,6 +233,7 @@ supervisor_builder.add_edge(START, "supervisor")
 supervisor_subgraph = supervisor_builder.compile()
 
 
+@instrument_node
 async def researcher(state: ResearcherState, config: RunnableConfig) -> Command[Literal["researcher_tools"]]:
     configurable = Configuration.from_runnable_config(config)
     researcher_messages = state.get("researcher_messages", [])
@@ -225,6 +265,7 @@ async def execute_tool_safely(tool, args, config):
         return f"Error executing tool: {str(e)}"
 
 
+@instrument_node
 async def researcher_tools(state: ResearcherState, config: RunnableConfig) -> Command[Literal["researcher", "compress_research"]]:
     configurable = Configuration.from_runnable_config(config)
     researcher_messages = state.get("researcher_messages", [])
@@ -263,6 +304,7 @@ async def researcher_tools(state: ResearcherState, config: RunnableConfig) -> Co
     )
 
 
+@instrument_node
 async def compress_research(state: ResearcherState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     synthesis_attempts = 0
@@ -276,6 +318,14 @@ async def compress_research(state: ResearcherState, config: RunnableConfig):
     # Update the system prompt to now focus on compression rather than research.
     researcher_messages[0] = SystemMessage(content=compress_research_system_prompt.format(date=get_today_str()))
     researcher_messages.append(HumanMessage(content=compress_research_simple_human_message))
+    # Trim the largest tool results up front so the first call fits; the retry below handles models we have no limit for
+    model_token_limit = get_model_token_limit(configurable.compression_model)
+    if model_token_limit:
+        researcher_messages = trim_tool_messages_to_budget(
+            researcher_messages,
+            int(model_token_limit * CONTEXT_WINDOW_SHARE) - configurable.compression_model_max_tokens,
+            configurable.compression_model
+        )
     while synthesis_attempts < 3:
         try:
             response = await synthesizer_model.ainvoke(researcher_messages)
@@ -285,7 +335,9 @@ async def compress_research(state: ResearcherState, config: RunnableConfig):
             }
         except Exception as e:
             synthesis_attempts += 1
-            if is_token_limit_exceeded(e, configurable.research_model):
+            if synthesis_attempts < 3:
+                record_retry()
+            if is_token_limit_exceeded(e, configurable.compression_model):
                 researcher_messages = remove_up_to_last_ai_message(researcher_messages)
                 print(f"Token limit exceeded while synthesizing: {e}. Pruning the messages to try again.")
                 continue         
@@ -305,6 +357,79 @@ researcher_builder.add_edge("compress_research", END)
 researcher_subgraph = researcher_builder.compile()
 
 
+@instrument_node
+async def synthesize_notes(state: AgentState, config: RunnableConfig):
+    """Merge the notes in a map-reduce tree when they do not fit in the final report model's context.
+
+    Each round packs the notes into groups that fit the compression model and merges the groups concurrently.
+    Rounds repeat until the merged notes fit or synthesis_max_depth is reached. Notes that already fit pass through unchanged.
+    """
+    configurable = Configuration.from_runnable_config(config)
+    notes = state.get("notes", [])
+    research_brief = state.get("research_brief", "")
+    report_model_limit = get_model_token_limit(configurable.final_report_model)
+    if not notes or not report_model_limit:
+        return {}
+    report_budget = get_findings_token_budget(
+        final_report_generation_prompt, research_brief, configurable.final_report_model,
+        report_model_limit, configurable.final_report_model_max_tokens, len(notes)
+    )
+    if sum(count_tokens(note, configurable.final_report_model) for note in notes) <= report_budget:
+        return {}
+
+    compression_model = configurable.compression_model
+    group_budget = get_findings_token_budget(
+        synthesize_notes_prompt, research_brief, compression_model,
+        get_model_token_limit(compression_model) or report_model_limit, configurable.compression_model_max_tokens, len(notes)
+    )
+    if group_budget <= 0:
+        return {}
+    synthesizer_model = configurable_model.with_config({
+        "model": compression_model,
+        "max_tokens": configurable.compression_model_max_tokens,
+        "api_key": get_api_key_for_model(compression_model, config),
+        "tags": ["langsmith:nostream"]
+    })
+    semaphore = asyncio.Semaphore(configurable.synthesis_max_concurrency)
+
+    async def merge(group: list[str]) -> str:
+        findings = "\n".join(group)
+        async with semaphore:
+            try:
+                response = await synthesizer_model.ainvoke([HumanMessage(content=synthesize_notes_prompt.format(
+                    research_brief=research_brief,
+                    findings=findings,
+                    date=get_today_str()
+                ))])
+                return str(response.content)
+            except Exception as e:
+                logging.warning(f"Error merging research notes: {e}")
+                return findings
+
+    for _ in range(configurable.synthesis_max_depth):
+        groups = pack_notes_into_groups(notes, group_budget, compression_model)
+        notes = await asyncio.gather(*[merge(group) for group in groups])
+        if len(notes) == 1 or sum(count_tokens(note, configurable.final_report_model) for note in notes) <= report_budget:
+            break
+    return {"notes": {"type": "override", "value": list(notes)}}
+
+def pack_notes_into_groups(notes: list[str], group_budget: int, model: str) -> list[list[str]]:
+    """Pack consecutive notes into groups that each fit the budget, truncating notes that are larger than a group."""
+    groups, group, group_tokens = [], [], 0
+    for note in notes:
+        note_tokens = count_tokens(note, model)
+        if note_tokens > group_budget:
+            note, note_tokens = truncate_to_tokens(note, group_budget, model), group_budget
+        if group and group_tokens + note_tokens > group_budget:
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(note)
+        group_tokens += note_tokens
+    if group:
+        groups.append(group)
+    return groups
+
+@instrument_node
 async def final_report_generation(state: AgentState, config: RunnableConfig):
     notes = state.get("notes", [])
     cleared_state = {"notes": {"type": "override", "value": []},}
@@ -314,7 +439,11 @@ async def final_report_generation(state: AgentState, config: RunnableConfig):
         "max_tokens": configurable.final_report_model_max_tokens,
         "api_key": get_api_key_for_model(configurable.research_model, config),
     }
-    
+
+    model_token_limit = get_model_token_limit(configurable.final_report_model)
+    if configurable.final_report_streaming and model_token_limit:
+        return await stream_final_report(state, notes, configurable, writer_model_config, model_token_limit, cleared_state)
+
     findings = "\n".join(notes)
     max_retries = 3
     current_retry = 0
@@ -346,6 +475,8 @@ async def final_report_generation(state: AgentState, config: RunnableConfig):
                 print("Reducing the chars to", findings_token_limit)
                 findings = findings[:findings_token_limit]
                 current_retry += 1
+                if current_retry <= max_retries:
+                    record_retry()
             else:
                 # If not a token limit exceeded error, then we just throw an error.
                 return {
@@ -358,13 +489,60 @@ async def final_report_generation(state: AgentState, config: RunnableConfig):
         **cleared_state
     }
 
+def get_findings_token_budget(prompt: str, research_brief: str, model: str, model_token_limit: int, max_output_tokens: int, note_count: int) -> int:
+    """Return how many tokens of findings fit in a prompt that takes the research brief, date and findings."""
+    prompt_tokens = count_tokens(prompt.format(research_brief=research_brief, findings="", date=get_today_str()), model)
+    # One token per note is reserved for the newlines that join them
+    return int(model_token_limit * CONTEXT_WINDOW_SHARE) - max_output_tokens - prompt_tokens - note_count
+
+async def stream_final_report(state: AgentState, notes: list[str], configurable: Configuration, writer_model_config: dict, model_token_limit: int, cleared_state: dict):
+    """Pack the findings into the model's context up front and stream the report as it is written.
+
+    Tokens are sent to the "custom" stream mode as {"final_report_token": ...}; they also reach the "messages" stream mode.
+    """
+    findings_budget = get_findings_token_budget(
+        final_report_generation_prompt, state.get("research_brief", ""), configurable.final_report_model,
+        model_token_limit, configurable.final_report_model_max_tokens, len(notes)
+    )
+    findings = "\n".join(fit_texts_to_budget(notes, findings_budget, configurable.final_report_model))
+    final_report_prompt = final_report_generation_prompt.format(
+        research_brief=state.get("research_brief", ""),
+        findings=findings,
+        date=get_today_str()
+    )
+    writer = get_stream_writer()
+    final_report = None
+    try:
+        async for chunk in configurable_model.with_config(writer_model_config).astream([HumanMessage(content=final_report_prompt)]):
+            final_report = chunk if final_report is None else final_report + chunk
+            if chunk.text():
+                writer({"final_report_token": chunk.text()})
+    except Exception as e:
+        return {
+            "final_report": f"Error generating final report: {e}",
+            **cleared_state
+        }
+    if final_report is None:
+        return {
+            "final_report": "Error generating final report: The model returned no output",
+            **cleared_state
+        }
+    final_report = message_chunk_to_message(final_report)
+    return {
+        "final_report": final_report.content,
+        "messages": [final_report],
+        **cleared_state
+    }
+
 deep_researcher_builder = StateGraph(AgentState, input=AgentInputState, config_schema=Configuration)
 deep_researcher_builder.add_node("clarify_with_user", clarify_with_user)
 deep_researcher_builder.add_node("write_research_brief", write_research_brief)
 deep_researcher_builder.add_node("research_supervisor", supervisor_subgraph)
+deep_researcher_builder.add_node("synthesize_notes", synthesize_notes)
 deep_researcher_builder.add_node("final_report_generation", final_report_generation)
 deep_researcher_builder.add_edge(START, "clarify_with_user")
-deep_researcher_builder.add_edge("research_supervisor", "final_report_generation")
+deep_researcher_builder.add_edge("research_supervisor", "synthesize_notes")
+deep_researcher_builder.add_edge("synthesize_notes", "final_report_generation")
 deep_researcher_builder.add_edge("final_report_generation", END)
 
 deep_researcher = deep_researcher_builder.compile()
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""Per-thread metrics for graph nodes, model calls, tool calls and retries, with log and Prometheus exporters."""
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tracers.context import register_configure_hook
+
+from open_deep_research.configuration import Configuration, InstrumentationExporter
+
+logger = logging.getLogger(__name__)
+
+
+##########################
+# Metrics Registry
+##########################
+class ThreadMetrics:
+    """Counters for one thread: time and calls per node, LLM usage, tool calls, cache lookups and retries."""
+
+    def __init__(self):
+        """Start every counter at zero."""
+        self.node_seconds: dict[str, float] = defaultdict(float)
+        self.node_runs: dict[str, int] = defaultdict(int)
+        self.llm_seconds: dict[str, float] = defaultdict(float)
+        self.llm_calls: dict[str, int] = defaultdict(int)
+        self.prompt_tokens: dict[str, int] = defaultdict(int)
+        self.completion_tokens: dict[str, int] = defaultdict(int)
+        self.tool_calls: dict[str, int] = defaultdict(int)
+        self.retries: dict[str, int] = defaultdict(int)
+        self.summary_cache_hits = 0
+        self.summary_cache_misses = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as plain dicts."""
+        return {
+            "node_seconds": dict(self.node_seconds),
+            "node_runs": dict(self.node_runs),
+            "llm_seconds": dict(self.llm_seconds),
+            "llm_calls": dict(self.llm_calls),
+            "prompt_tokens": dict(self.prompt_tokens),
+            "completion_tokens": dict(self.completion_tokens),
+            "tool_calls": dict(self.tool_calls),
+            "retries": dict(self.retries),
+            "summary_cache_hits": self.summary_cache_hits,
+            "summary_cache_misses": self.summary_cache_misses,
+        }
+
+
+class MetricsRegistry:
+    """Process-wide metrics keyed by thread_id, keeping the most recently used max_threads threads."""
+
+    def __init__(self, max_threads: int = 1000):
+        """Create an empty registry that keeps at most max_threads threads."""
+        self.max_threads = max_threads
+        self._threads: OrderedDict[str, ThreadMetrics] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def thread(self, thread_id: str) -> ThreadMetrics:
+        """Return the metrics for a thread, creating them if needed."""
+        with self._lock:
+            metrics = self._threads.get(thread_id)
+            if metrics is None:
+                metrics = self._threads[thread_id] = ThreadMetrics()
+                while len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            else:
+                self._threads.move_to_end(thread_id)
+            return metrics
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return a copy of the metrics of every thread."""
+        with self._lock:
+            return {thread_id: metrics.as_dict() for thread_id, metrics in self._threads.items()}
+
+    def clear(self):
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._threads.clear()
+
+metrics_registry = MetricsRegistry()
+
+def get_thread_metrics(thread_id: str) -> dict[str, Any]:
+    """Return the metrics recorded for a thread."""
+    return metrics_registry.thread(thread_id).as_dict()
+
+
+##########################
+# Exporters
+##########################
+class NoopExporter:
+    """Exporter that records nothing."""
+
+    enabled = False
+
+    def export_node(self, thread_id: str, node: str, seconds: float, metrics: ThreadMetrics):
+        """Ignore the node."""
+        pass
+
+
+class LogExporter:
+    """Exporter that logs each node's wall time together with the thread's running totals."""
+
+    enabled = True
+
+    def export_node(self, thread_id: str, node: str, seconds: float, metrics: ThreadMetrics):
+        """Log the node's wall time and the thread's totals."""
+        logger.info(
+            f"thread_id={thread_id} node={node} seconds={seconds:.3f} "
+            f"llm_calls={sum(metrics.llm_calls.values())} "
+            f"prompt_tokens={sum(metrics.prompt_tokens.values())} "
+            f"completion_tokens={sum(metrics.completion_tokens.values())} "
+            f"tool_calls={sum(metrics.tool_calls.values())} "
+            f"summary_cache_hits={metrics.summary_cache_hits} "
+            f"retries={sum(metrics.retries.values())}"
+        )
+
+
+class PrometheusExporter:
+    """Exporter that keeps metrics in the registry for render_prometheus_metrics to serve."""
+
+    enabled = True
+
+    def export_node(self, thread_id: str, node: str, seconds: float, metrics: ThreadMetrics):
+        """Leave the metrics in the registry; they are rendered when scraped."""
+        pass
+
+
+EXPORTERS = {
+    InstrumentationExporter.NONE: NoopExporter(),
+    InstrumentationExporter.LOG: LogExporter(),
+    InstrumentationExporter.PROMETHEUS: PrometheusExporter(),
+}
+
+def get_exporter(configurable: Configuration):
+    """Return the exporter selected in the configuration."""
+    return EXPORTERS[InstrumentationExporter(configurable.instrumentation_exporter)]
+
+PROMETHEUS_METRICS = [
+    ("node_seconds", "deep_research_node_seconds_total", "Wall time spent in each graph node", "node"),
+    ("node_runs", "deep_research_node_runs_total", "Number of times each graph node ran", "node"),
+    ("llm_seconds", "deep_research_llm_seconds_total", "Time spent waiting on chat model calls", "node"),
+    ("llm_calls", "deep_research_llm_calls_total", "Number of chat model calls", "node"),
+    ("prompt_tokens", "deep_research_prompt_tokens_total", "Prompt tokens reported by chat models", "node"),
+    ("completion_tokens", "deep_research_completion_tokens_total", "Completion tokens reported by chat models", "node"),
+    ("tool_calls", "deep_research_tool_calls_total", "Number of tool calls", "tool"),
+    ("retries", "deep_research_retries_total", "Number of retried model or tool calls", "node"),
+]
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_prometheus_metrics() -> str:
+    """Render the registry in the Prometheus text exposition format."""
+    snapshot = metrics_registry.snapshot()
+    lines = []
+    for field, name, description, label in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for thread_id, metrics in snapshot.items():
+            for key, value in metrics[field].items():
+                lines.append(f'{name}{{thread_id="{_escape_label(thread_id)}",{label}="{_escape_label(key)}"}} {value}')
+    for field, name, description in [
+        ("summary_cache_hits", "deep_research_summary_cache_hits_total", "Webpage summaries served from the cache"),
+        ("summary_cache_misses", "deep_research_summary_cache_misses_total", "Webpage summaries not found in the cache"),
+    ]:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for thread_id, metrics in snapshot.items():
+            lines.append(f'{name}{{thread_id="{_escape_label(thread_id)}"}} {metrics[field]}')
+    return "\n".join(lines) + "\n"
+
+
+##########################
+# Recording
+##########################
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """Callback handler that records LLM latency and tokens, tool calls and retries for one thread and node.
+
+    It is attached to every run started inside an instrumented node through a configure hook, so model and
+    tool calls are counted without passing callbacks around. The hook is not inheritable, so calls made in a
+    nested subgraph count against the innermost node only.
+    """
+
+    run_inline = True
+
+    def __init__(self, thread_id: str, node: str):
+        """Record against the given thread's metrics under the given node."""
+        self.thread_id = thread_id
+        self.node = node
+        self.metrics = metrics_registry.thread(thread_id)
+        self._llm_started: dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        """Note when a chat model call starts."""
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        """Note when an LLM call starts."""
+        self._llm_started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        """Record the call's latency and token usage."""
+        started = self._llm_started.pop(run_id, None)
+        if started is not None:
+            self.metrics.llm_seconds[self.node] += time.perf_counter() - started
+        self.metrics.llm_calls[self.node] += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.metrics.prompt_tokens[self.node] += usage.get("input_tokens", 0)
+                self.metrics.completion_tokens[self.node] += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        """Forget the start time of a failed call."""
+        self._llm_started.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        """Count a tool call by tool name."""
+        self.metrics.tool_calls[(serialized or {}).get("name") or kwargs.get("name") or "unknown"] += 1
+
+    def on_retry(self, retry_state, *, run_id: UUID, **kwargs):
+        """Count a retry made by a runnable's retry wrapper."""
+        self.metrics.retries[self.node] += 1
+
+_instrumentation_handler: ContextVar[InstrumentationCallbackHandler | None] = ContextVar(
+    "open_deep_research_instrumentation_handler", default=None
+)
+register_configure_hook(_instrumentation_handler, inheritable=False)
+
+def record_summary_cache_lookup(hit: bool):
+    """Count a summary cache lookup against the thread of the node being instrumented, if any."""
+    handler = _instrumentation_handler.get()
+    if handler is None:
+        return
+    if hit:
+        handler.metrics.summary_cache_hits += 1
+    else:
+        handler.metrics.summary_cache_misses += 1
+
+def record_retry():
+    """Count a retry made by a node's own retry loop against the node being instrumented, if any."""
+    handler = _instrumentation_handler.get()
+    if handler is not None:
+        handler.metrics.retries[handler.node] += 1
+
+def instrument_node(func):
+    """Record a graph node's wall time, and the model and tool calls made inside it, under its thread_id."""
+
+    @functools.wraps(func)
+    async def wrapper(state, config: RunnableConfig):
+        configurable = Configuration.from_runnable_config(config)
+        exporter = get_exporter(configurable)
+        if not exporter.enabled:
+            return await func(state, config)
+        thread_id = str((config or {}).get("configurable", {}).get("thread_id") or "unknown")
+        handler = InstrumentationCallbackHandler(thread_id, func.__name__)
+        token = _instrumentation_handler.set(handler)
+        start = time.perf_counter()
+        try:
+            return await func(state, config)
+        finally:
+            seconds = time.perf_counter() - start
+            _instrumentation_handler.reset(token)
+            handler.metrics.node_seconds[func.__name__] += seconds
+            handler.metrics.node_runs[func.__name__] += 1
+            exporter.export_node(thread_id, func.__name__, seconds, handler.metrics)
+
+    return wrapper
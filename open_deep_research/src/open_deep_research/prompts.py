@@ -217,6 +217,31 @@ compress_research_simple_human_message = """All above messages are about researc
 
 DO NOT summarize the information. I want the raw information returned, just in a cleaner format. Make sure all relevant information is preserved - you can rewrite findings verbatim."""
 
+synthesize_notes_prompt = """You are a research assistant merging findings from several research units into a single set of notes. For context, today's date is {date}.
+
+These notes were gathered to answer the following research brief:
+<Research Brief>
+{research_brief}
+</Research Brief>
+
+<Findings>
+{findings}
+</Findings>
+
+<Task>
+Merge the findings above into one set of notes that a later LLM will combine with other merged notes to write the final report.
+Keep every fact, figure and statement that is relevant to the research brief, repeating key information verbatim.
+Only remove information that is irrelevant to the research brief or repeated across the findings. If several findings state the same thing, state it once and cite all of their sources.
+</Task>
+
+<Citation Rules>
+- Keep the inline citations from the findings, renumbering them sequentially without gaps (1,2,3,4...)
+- End with ### Sources that lists each source with corresponding numbers
+- It's really important not to lose any sources
+</Citation Rules>
+"""
+
+
 final_report_generation_prompt = """Based on all the research conducted, create a comprehensive, well-structured answer to the overall research brief:
 <Research Brief>
 {research_brief}
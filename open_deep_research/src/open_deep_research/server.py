@@ -0,0 +1,26 @@
+"""Custom HTTP routes mounted into the LangGraph server through the "http" entry in langgraph.json."""
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from open_deep_research.instrumentation import render_prometheus_metrics
+from open_deep_research.utils import clear_tool_registry, close_http_pool
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Serve the instrumentation metrics in the Prometheus text format."""
+    return PlainTextResponse(render_prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Close pooled HTTP connections and MCP sessions when the server shuts down."""
+    yield
+    await clear_tool_registry()
+    await close_http_pool()
+
+
+app = Starlette(routes=[Route("/metrics", metrics)], lifespan=lifespan)
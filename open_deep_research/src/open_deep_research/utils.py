@@ -1,23 +1,43 @@
 import os
 import aiohttp
 import asyncio
+import functools
+import hashlib
+import heapq
+import httpx
+import importlib.util
+import itertools
 import logging
+import random
+import sqlite3
+import threading
+import time
 import warnings
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Annotated, List, Literal, Dict, Optional, Any
 from langchain_core.tools import BaseTool, StructuredTool, tool, ToolException, InjectedToolArg
-from langchain_core.messages import HumanMessage, AIMessage, MessageLikeRepresentation, filter_messages
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, MessageLikeRepresentation, filter_messages, get_buffer_string
 from langchain_core.runnables import RunnableConfig
 from langchain_core.language_models import BaseChatModel
 from langchain.chat_models import init_chat_model
-from tavily import AsyncTavilyClient
+from tavily.errors import MissingAPIKeyError
 from langgraph.config import get_store
 from mcp import McpError
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools as load_mcp_session_tools
 from open_deep_research.state import Summary, ResearchComplete
 from open_deep_research.configuration import SearchAPI, Configuration
+from open_deep_research.instrumentation import record_summary_cache_lookup
 from open_deep_research.prompts import summarize_webpage_prompt
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 
 ##########################
 # Tavily Search Tool Utils
@@ -68,16 +88,40 @@ async def tavily_search(
         api_key=model_api_key,
         tags=["langsmith:nostream"]
     ).with_structured_output(Summary).with_retry(stop_after_attempt=configurable.max_structured_output_retries)
+    summary_cache = get_summary_cache(configurable)
+    summarization_scheduler = get_summarization_scheduler(configurable)
+    search_broker = get_search_broker(config)
     async def noop():
         return None
+    def summarize(url: str, raw_content: str):
+        def summarize_factory():
+            return summarize_webpage_cached(
+                summarization_model,
+                raw_content[:max_char_to_include],
+                summary_cache,
+                configurable.summarization_model,
+                scheduler=summarization_scheduler,
+                timeout=configurable.summarization_timeout_seconds,
+            )
+        # Within a supervisor run, each URL is summarized once and shared across researchers
+        if search_broker is not None:
+            return search_broker.summarize(url, summarize_factory)
+        return summarize_factory()
     summarization_tasks = [
-        noop() if not result.get("raw_content") else summarize_webpage(
-            summarization_model, 
-            result['raw_content'][:max_char_to_include],
-        )
-        for result in unique_results.values()
+        asyncio.ensure_future(noop() if not result.get("raw_content") else summarize(url, result['raw_content']))
+        for url, result in unique_results.items()
+    ]
+    # Return partial results at the deadline: pages still waiting fall back to the search snippet
+    if summarization_tasks:
+        _, pending = await asyncio.wait(summarization_tasks, timeout=configurable.summarization_deadline_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning(f"Summarization deadline reached, using search snippets for {len(pending)} of {len(summarization_tasks)} pages")
+    summaries = [
+        task.result() if task.done() and not task.cancelled() and task.exception() is None else None
+        for task in summarization_tasks
     ]
-    summaries = await asyncio.gather(*summarization_tasks)
     summarized_results = {
         url: {'title': result['title'], 'content': result['content'] if summary is None else summary}
         for url, result, summary in zip(unique_results.keys(), unique_results.values(), summaries)
@@ -94,31 +138,574 @@ async def tavily_search(
 
 
 async def tavily_search_async(search_queries, max_results: int = 5, topic: Literal["general", "news", "finance"] = "general", include_raw_content: bool = True, config: RunnableConfig = None):
-    tavily_async_client = AsyncTavilyClient(api_key=get_tavily_api_key(config))
+    tavily_async_client = PooledTavilyClient(api_key=get_tavily_api_key(config))
+    search_broker = get_search_broker(config)
     search_tasks = []
     for query in search_queries:
-            search_tasks.append(
-                tavily_async_client.search(
-                    query,
-                    max_results=max_results,
-                    include_raw_content=include_raw_content,
-                    topic=topic
-                )
+        def search_factory(query=query):
+            return tavily_async_client.search(
+                query,
+                max_results=max_results,
+                include_raw_content=include_raw_content,
+                topic=topic
             )
+        if search_broker is not None:
+            search_key = (normalize_search_query(query), max_results, topic, include_raw_content)
+            search_tasks.append(search_broker.search(search_key, search_factory))
+        else:
+            search_tasks.append(search_factory())
     search_docs = await asyncio.gather(*search_tasks)
     return search_docs
 
-async def summarize_webpage(model: BaseChatModel, webpage_content: str) -> str:
+async def summarize_webpage(model: BaseChatModel, webpage_content: str, scheduler: Optional["SummarizationScheduler"] = None, timeout: float = 60.0) -> str:
     try:
-        summary = await asyncio.wait_for(
-            model.ainvoke([HumanMessage(content=summarize_webpage_prompt.format(webpage_content=webpage_content, date=get_today_str()))]),
-            timeout=60.0
-        )
+        messages = [HumanMessage(content=summarize_webpage_prompt.format(webpage_content=webpage_content, date=get_today_str()))]
+        async def invoke():
+            return await asyncio.wait_for(model.ainvoke(messages), timeout=timeout)
+        if scheduler is not None:
+            # Shorter pages are scheduled first so they are not stuck behind long ones
+            summary = await scheduler.run(invoke, tokens=scheduler.estimate_tokens(messages[0].content), priority=len(webpage_content))
+        else:
+            summary = await invoke()
         return f"""<summary>\n{summary.summary}\n</summary>\n\n<key_excerpts>\n{summary.key_excerpts}\n</key_excerpts>"""
     except (asyncio.TimeoutError, Exception) as e:
         print(f"Failed to summarize webpage: {str(e)}")
         return webpage_content
 
+async def summarize_webpage_cached(
+    model: BaseChatModel,
+    webpage_content: str,
+    cache: Optional["SummaryCache"],
+    model_name: str,
+    scheduler: Optional["SummarizationScheduler"] = None,
+    timeout: float = 60.0,
+) -> str:
+    """Summarize a webpage, reusing cached or in-flight summaries of identical content.
+
+    Concurrent callers that miss on the same key await the first caller's summarization
+    instead of issuing their own LLM call.
+    """
+    if cache is None:
+        return await summarize_webpage(model, webpage_content, scheduler=scheduler, timeout=timeout)
+    key = cache.make_key(webpage_content, model_name)
+    task = cache.in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_summarize_webpage_through_cache(model, webpage_content, cache, key, scheduler, timeout))
+        cache.in_flight[key] = task
+        task.add_done_callback(lambda _: cache.in_flight.pop(key, None))
+    else:
+        cache.coalesced += 1
+    # Shield the shared task so a cancelled caller does not cancel it for the others
+    return await asyncio.shield(task)
+
+async def _summarize_webpage_through_cache(
+    model: BaseChatModel,
+    webpage_content: str,
+    cache: "SummaryCache",
+    key: str,
+    scheduler: Optional["SummarizationScheduler"],
+    timeout: float,
+) -> str:
+    cached_summary = await cache.aget(key)
+    record_summary_cache_lookup(hit=cached_summary is not None)
+    if cached_summary is not None:
+        return cached_summary
+    summary = await summarize_webpage(model, webpage_content, scheduler=scheduler, timeout=timeout)
+    # summarize_webpage falls back to the raw content on failure, which should not be cached
+    if summary != webpage_content:
+        await cache.aset(key, summary)
+    return summary
+
+
+##########################
+# HTTP Pool Utils
+##########################
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+# httpx has no per-host limit, so the httpx client caps idle keep-alive connections instead
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+
+# Connections belong to the event loop that opened them, so there is one pool per loop
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_aiohttp_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide httpx client for the running loop, with keep-alive and HTTP/2 when h2 is installed."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            follow_redirects=True,
+        )
+        _http_clients[loop] = client
+    return client
+
+def get_aiohttp_session() -> aiohttp.ClientSession:
+    """Return the process-wide aiohttp session for the running loop, with per-host connection limits."""
+    loop = asyncio.get_running_loop()
+    session = _aiohttp_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            limit=HTTP_MAX_CONNECTIONS,
+            limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        ))
+        _aiohttp_sessions[loop] = session
+    return session
+
+@asynccontextmanager
+async def pooled_http_client():
+    """Drop-in for `async with httpx.AsyncClient() as client` that borrows the shared client instead of closing it."""
+    yield get_http_client()
+
+@asynccontextmanager
+async def pooled_aiohttp_session():
+    """Drop-in for `async with aiohttp.ClientSession() as session` that borrows the shared session instead of closing it."""
+    yield get_aiohttp_session()
+
+async def close_http_pool():
+    """Close the shared HTTP clients of the running loop. Call this on server shutdown."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    session = _aiohttp_sessions.pop(loop, None)
+    if session is not None:
+        await session.close()
+
+class PooledTavilyClient:
+    """Tavily search client that sends requests over the shared HTTP pool.
+
+    AsyncTavilyClient opens and closes a new httpx client for every request, so each search paid for a
+    new TCP and TLS handshake. The SDK builds that client in a private factory and takes no client of its
+    own, so the request is posted here instead, using the search fields AsyncTavilyClient sends. Errors are
+    raised as httpx.HTTPStatusError rather than the SDK's exceptions so rate limits can be detected.
+    """
+
+    base_url = "https://api.tavily.com"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv("TAVILY_API_KEY")
+        if not self.api_key:
+            raise MissingAPIKeyError()
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        include_raw_content: bool = False,
+        topic: Literal["general", "news", "finance"] = "general",
+        timeout: float = 60,
+        **kwargs,
+    ) -> dict:
+        """Run one Tavily search and return the decoded response."""
+        response = await get_http_client().post(
+            f"{self.base_url}/search",
+            json={
+                "query": query,
+                "search_depth": "basic",
+                "topic": topic,
+                "max_results": max_results,
+                "include_raw_content": include_raw_content,
+                **kwargs,
+            },
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=min(timeout, 120),
+        )
+        response.raise_for_status()
+        return response.json()
+
+##########################
+# Summarization Scheduler Utils
+##########################
+class SummarizationScheduler:
+    """Process-wide scheduler for summarization calls to one model.
+
+    Bounds the number of calls in flight, paces calls against a token-per-minute budget,
+    serves waiting calls in priority order (lowest first) and pauses every caller after the
+    provider rate limits us, instead of letting each call retry into the limit on its own.
+    """
+
+    def __init__(self, max_in_flight: int, tokens_per_minute: int = 0, max_output_tokens: int = 0):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.max_output_tokens = max_output_tokens
+        self.rate_limited = 0
+        self._loop = asyncio.get_running_loop()
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future, int]] = []
+        self._counter = itertools.count()
+        self._tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def estimate_tokens(self, prompt: str) -> int:
+        """Estimate the tokens a call counts against the budget: the prompt plus the maximum output."""
+        return len(prompt) // 4 + self.max_output_tokens
+
+    def _refill(self, now: float):
+        if self.tokens_per_minute > 0:
+            elapsed = now - self._last_refill
+            self._tokens = min(float(self.tokens_per_minute), self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._last_refill = now
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = self._loop.call_later(delay, self._dispatch)
+
+    def _dispatch(self):
+        self._wakeup = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters and self._in_flight < self.max_in_flight:
+            _, _, future, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if now < self._paused_until:
+                self._schedule_wakeup(self._paused_until - now)
+                return
+            if self.tokens_per_minute > 0:
+                # A single call larger than the whole budget only waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens < needed:
+                    self._schedule_wakeup((needed - self._tokens) * 60 / self.tokens_per_minute)
+                    return
+                self._tokens -= needed
+            heapq.heappop(self._waiters)
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _back_off(self, exception: Exception):
+        self.rate_limited += 1
+        retry_after = get_retry_after_seconds(exception)
+        self._backoff = min(max(self._backoff * 2, 1.0), 60.0)
+        delay = retry_after if retry_after is not None else self._backoff * (1 + random.random())
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._tokens = 0.0
+
+    async def run(self, coro_factory, tokens: int = 0, priority: int = 0):
+        """Wait for a slot and budget, then await the coroutine built by coro_factory."""
+        future = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been granted right before the caller was cancelled
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        try:
+            result = await coro_factory()
+            self._backoff = 0.0
+            return result
+        except Exception as e:
+            if is_rate_limit_exceeded(e):
+                self._back_off(e)
+            raise
+        finally:
+            self._release()
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of calls in flight, waiting, and rate limited so far."""
+        return {
+            "in_flight": self._in_flight,
+            "waiting": sum(1 for _, _, future, _ in self._waiters if not future.done()),
+            "rate_limited": self.rate_limited,
+        }
+
+_summarization_schedulers: dict[str, SummarizationScheduler] = {}
+
+def get_summarization_scheduler(configurable: Configuration) -> SummarizationScheduler:
+    """Return the process-wide scheduler for the configured summarization model on the running loop."""
+    scheduler = _summarization_schedulers.get(configurable.summarization_model)
+    if scheduler is None or scheduler._loop is not asyncio.get_running_loop():
+        scheduler = SummarizationScheduler(
+            max_in_flight=configurable.summarization_max_in_flight,
+            tokens_per_minute=configurable.summarization_tokens_per_minute,
+            max_output_tokens=configurable.summarization_model_max_tokens,
+        )
+        _summarization_schedulers[configurable.summarization_model] = scheduler
+    else:
+        scheduler.max_in_flight = configurable.summarization_max_in_flight
+        scheduler.tokens_per_minute = configurable.summarization_tokens_per_minute
+        scheduler.max_output_tokens = configurable.summarization_model_max_tokens
+    return scheduler
+
+
+##########################
+# Search Broker Utils
+##########################
+class SearchBroker:
+    """Run-scoped broker shared by all researchers under one supervisor.
+
+    Identical in-flight searches are coalesced into a single request, completed searches are
+    memoized for the rest of the run, and each URL is summarized at most once per run.
+    """
+
+    def __init__(self):
+        self.search_requests = 0
+        self.search_calls = 0
+        self.summary_requests = 0
+        self.summary_calls = 0
+        self._searches: dict[Any, asyncio.Future] = {}
+        self._summaries: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _reusable(task: asyncio.Future) -> bool:
+        # Failed or cancelled work is retried by the next caller instead of being memoized
+        return not task.done() or (not task.cancelled() and task.exception() is None)
+
+    async def search(self, key: Any, search_factory):
+        """Run a search once per key for the run, sharing in-flight and completed results."""
+        self.search_requests += 1
+        task = self._searches.get(key)
+        if task is None or not self._reusable(task):
+            self.search_calls += 1
+            task = asyncio.ensure_future(search_factory())
+            self._searches[key] = task
+        return await asyncio.shield(task)
+
+    async def summarize(self, url: str, summarize_factory) -> str:
+        """Summarize a URL once per run, sharing the summary with every researcher that finds it."""
+        self.summary_requests += 1
+        task = self._summaries.get(url)
+        if task is None or not self._reusable(task):
+            self.summary_calls += 1
+            task = asyncio.ensure_future(summarize_factory())
+            self._summaries[url] = task
+        return await asyncio.shield(task)
+
+    def report(self) -> dict[str, int]:
+        """Return how many search and summarization calls were issued and saved during the run."""
+        return {
+            "search_requests": self.search_requests,
+            "search_calls": self.search_calls,
+            "search_calls_saved": self.search_requests - self.search_calls,
+            "unique_urls": len(self._summaries),
+            "summary_requests": self.summary_requests,
+            "summary_calls": self.summary_calls,
+            "summary_calls_saved": self.summary_requests - self.summary_calls,
+        }
+
+_search_brokers: dict[str, SearchBroker] = {}
+
+def normalize_search_query(query: str) -> str:
+    """Normalize case, whitespace and trailing punctuation so near-identical queries share a key."""
+    return " ".join(query.lower().split()).rstrip("?.!")
+
+def get_search_broker_id(config: RunnableConfig, research_brief: str = "") -> str:
+    """Return the id of the search broker for the current supervisor run."""
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    if thread_id:
+        return str(thread_id)
+    return hashlib.sha256(research_brief.encode("utf-8")).hexdigest()
+
+def open_search_broker(broker_id: str) -> SearchBroker:
+    """Return the broker registered under an id, creating it on first use."""
+    if broker_id not in _search_brokers:
+        _search_brokers[broker_id] = SearchBroker()
+    return _search_brokers[broker_id]
+
+def close_search_broker(broker_id: str) -> Optional[dict[str, int]]:
+    """Drop the broker registered under an id and return its report."""
+    search_broker = _search_brokers.pop(broker_id, None)
+    if search_broker is None:
+        return None
+    return search_broker.report()
+
+def get_search_broker(config: RunnableConfig) -> Optional[SearchBroker]:
+    """Return the broker a researcher was launched with, if any."""
+    broker_id = (config or {}).get("configurable", {}).get("search_broker_id")
+    if not broker_id:
+        return None
+    return _search_brokers.get(broker_id)
+
+
+##########################
+# Summarization Cache Utils
+##########################
+# The prompt hash is part of every cache key, so editing the summarization prompt never serves stale summaries.
+SUMMARIZE_WEBPAGE_PROMPT_VERSION = hashlib.sha256(summarize_webpage_prompt.encode("utf-8")).hexdigest()[:16]
+SUMMARY_CACHE_MEMORY_ENTRIES = 1024
+
+class SummaryCache:
+    """Two-tier (in-process LRU + SQLite) cache of webpage summaries keyed by content hash."""
+
+    def __init__(self, path: Optional[str], ttl_seconds: int, max_entries: int, memory_entries: int = SUMMARY_CACHE_MEMORY_ENTRIES):
+        self.path = path or None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.in_flight: dict[str, asyncio.Future] = {}
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._disk_enabled = bool(self.path)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # Opened lazily from a worker thread so the event loop never blocks on filesystem access
+        if self._connection is None and self._disk_enabled:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                connection = sqlite3.connect(self.path, check_same_thread=False)
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS summaries ("
+                    "key TEXT PRIMARY KEY, summary TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                connection.execute("CREATE INDEX IF NOT EXISTS summaries_accessed_at ON summaries (accessed_at)")
+                connection.commit()
+                self._connection = connection
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"Could not open summarization cache at {self.path}, falling back to memory only: {e}")
+                self._disk_enabled = False
+        return self._connection
+
+    @staticmethod
+    def make_key(webpage_content: str, model_name: str) -> str:
+        """Build the cache key from the page content, summarization model and prompt version."""
+        digest = hashlib.sha256()
+        for part in (model_name, SUMMARIZE_WEBPAGE_PROMPT_VERSION, webpage_content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, summary: str, created_at: float):
+        self._memory[key] = (summary, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple[str, float]]:
+        with self._lock:
+            if self._connect() is None:
+                return None
+            row = self._connection.execute("SELECT summary, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._is_expired(row[1], now):
+                self._connection.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            return row[0], row[1]
+
+    def _disk_set(self, key: str, summary: str, now: float):
+        with self._lock:
+            if self._connect() is None:
+                return
+            self._connection.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, summary, now, now)
+            )
+            if self.ttl_seconds > 0:
+                self.evictions += self._connection.execute(
+                    "DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,)
+                ).rowcount
+            overflow = self._connection.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self.evictions += self._connection.execute(
+                    "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY accessed_at ASC LIMIT ?)", (overflow,)
+                ).rowcount
+            self._connection.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Return the cached summary for a key, checking memory before disk."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and not self._is_expired(entry[1], now):
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.memory_hits += 1
+            return entry[0]
+        self._memory.pop(key, None)
+        if self._disk_enabled:
+            try:
+                entry = await asyncio.to_thread(self._disk_get, key, now)
+            except sqlite3.Error as e:
+                logging.warning(f"Summarization cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                self._remember(key, *entry)
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[0]
+        self.misses += 1
+        return None
+
+    async def aset(self, key: str, summary: str):
+        """Store a summary in memory and, when enabled, on disk."""
+        now = time.time()
+        self._remember(key, summary, now)
+        if self._disk_enabled:
+            try:
+                await asyncio.to_thread(self._disk_set, key, summary, now)
+            except sqlite3.Error as e:
+                logging.warning(f"Summarization cache write failed: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """Return hit, miss, eviction and coalescing counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "memory_entries": len(self._memory),
+        }
+
+_summary_caches: dict[str, SummaryCache] = {}
+
+def get_summary_cache(configurable: Configuration) -> Optional[SummaryCache]:
+    """Return the process-wide summary cache for the configured path, or None if caching is disabled.
+
+    Caches are shared per path so a single SQLite connection and eviction policy owns each file;
+    the most recent TTL and size limits are applied to the shared instance.
+    """
+    if not configurable.summarization_cache_enabled:
+        return None
+    path = configurable.summarization_cache_path or ""
+    cache = _summary_caches.get(path)
+    if cache is None:
+        cache = SummaryCache(
+            path=path,
+            ttl_seconds=configurable.summarization_cache_ttl_seconds,
+            max_entries=configurable.summarization_cache_max_entries,
+        )
+        _summary_caches[path] = cache
+    else:
+        cache.ttl_seconds = configurable.summarization_cache_ttl_seconds
+        cache.max_entries = configurable.summarization_cache_max_entries
+    return cache
+
 
 ##########################
 # MCP Utils
@@ -135,7 +722,7 @@ async def get_mcp_access_token(
             "resource": base_mcp_url.rstrip("/") + "/mcp",
             "subject_token_type": "urn:ietf:params:oauth:token-type:access_token",
         }
-        async with aiohttp.ClientSession() as session:
+        async with pooled_aiohttp_session() as session:
             async with session.post(
                 base_mcp_url.rstrip("/") + "/oauth/token",
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
@@ -152,25 +739,29 @@ async def get_mcp_access_token(
     return None
 
 async def get_tokens(config: RunnableConfig):
+    tokens, _ = await _get_tokens_with_expiration(config)
+    return tokens
+
+async def _get_tokens_with_expiration(config: RunnableConfig) -> tuple[Optional[dict[str, Any]], Optional[datetime]]:
     store = get_store()
     thread_id = config.get("configurable", {}).get("thread_id")
     if not thread_id:
-        return None
+        return None, None
     user_id = config.get("metadata", {}).get("owner")
     if not user_id:
-        return None
+        return None, None
     tokens = await store.aget((user_id, "tokens"), "data")
     if not tokens:
-        return None
+        return None, None
     expires_in = tokens.value.get("expires_in")  # seconds until expiration
     created_at = tokens.created_at  # datetime of token creation
     current_time = datetime.now(timezone.utc)
     expiration_time = created_at + timedelta(seconds=expires_in)
     if current_time > expiration_time:
         await store.adelete((user_id, "tokens"), "data")
-        return None
+        return None, None
 
-    return tokens.value
+    return tokens.value, expiration_time
 
 async def set_tokens(config: RunnableConfig, tokens: dict[str, Any]):
     store = get_store()
@@ -184,19 +775,25 @@ async def set_tokens(config: RunnableConfig, tokens: dict[str, Any]):
     return
 
 async def fetch_tokens(config: RunnableConfig) -> dict[str, Any]:
-    current_tokens = await get_tokens(config)
+    tokens, _ = await _fetch_tokens_with_expiration(config)
+    return tokens
+
+async def _fetch_tokens_with_expiration(config: RunnableConfig) -> tuple[Optional[dict[str, Any]], Optional[datetime]]:
+    current_tokens, expiration_time = await _get_tokens_with_expiration(config)
     if current_tokens:
-        return current_tokens
+        return current_tokens, expiration_time
     supabase_token = config.get("configurable", {}).get("x-supabase-access-token")
     if not supabase_token:
-        return None
+        return None, None
     mcp_config = config.get("configurable", {}).get("mcp_config")
     if not mcp_config or not mcp_config.get("url"):
-        return None
+        return None, None
     mcp_tokens = await get_mcp_access_token(supabase_token, mcp_config.get("url"))
 
     await set_tokens(config, mcp_tokens)
-    return mcp_tokens
+    if mcp_tokens and mcp_tokens.get("expires_in"):
+        return mcp_tokens, datetime.now(timezone.utc) + timedelta(seconds=mcp_tokens["expires_in"])
+    return mcp_tokens, None
 
 def wrap_mcp_authenticate_tool(tool: StructuredTool) -> StructuredTool:
     old_coroutine = tool.coroutine
@@ -235,12 +832,13 @@ def wrap_mcp_authenticate_tool(tool: StructuredTool) -> StructuredTool:
 async def load_mcp_tools(
     config: RunnableConfig,
     existing_tool_names: set[str],
+    mcp_session_key: Optional[tuple] = None,
 ) -> list[BaseTool]:
     configurable = Configuration.from_runnable_config(config)
     if configurable.mcp_config and configurable.mcp_config.auth_required:
-        mcp_tokens = await fetch_tokens(config)
+        mcp_tokens, token_expiration = await _fetch_tokens_with_expiration(config)
     else:
-        mcp_tokens = None
+        mcp_tokens, token_expiration = None, None
     if not (configurable.mcp_config and configurable.mcp_config.url and configurable.mcp_config.tools and (mcp_tokens or not configurable.mcp_config.auth_required)):
         return []
     tools = []
@@ -254,8 +852,11 @@ async def load_mcp_tools(
         }
     }
     try:
-        client = MultiServerMCPClient(mcp_server_config)
-        mcp_tools = await client.get_tools()
+        if mcp_session_key is not None:
+            mcp_tools = await open_mcp_session(mcp_session_key, mcp_server_config["server_1"], token_expiration)
+        else:
+            client = MultiServerMCPClient(mcp_server_config)
+            mcp_tools = await client.get_tools()
     except Exception as e:
         print(f"Error loading MCP tools: {e}")
         return []
@@ -271,6 +872,74 @@ async def load_mcp_tools(
     return tools
 
 
+##########################
+# MCP Session Pool Utils
+##########################
+class PooledMCPSession:
+    """An MCP client session held open by a background task so tool calls reuse one warm connection.
+
+    The session's context is entered and exited by the same task, as the MCP transports require.
+    """
+
+    def __init__(self, connection: dict[str, Any], expires_at: Optional[datetime] = None):
+        self.connection = connection
+        self.expires_at = expires_at
+        self.loop = asyncio.get_running_loop()
+        self._closed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def open(self) -> list[BaseTool]:
+        """Start the session and return the tools bound to it."""
+        ready = self.loop.create_future()
+        self._task = asyncio.create_task(self._hold(ready))
+        return await ready
+
+    async def _hold(self, ready: asyncio.Future):
+        try:
+            client = MultiServerMCPClient({"server_1": self.connection})
+            async with client.session("server_1") as session:
+                ready.set_result(await load_mcp_session_tools(session))
+                await self._closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logging.warning(f"Pooled MCP session closed unexpectedly: {e}")
+
+    @property
+    def alive(self) -> bool:
+        """Whether the session is still open and its access token has not expired."""
+        if self._task is None or self._task.done():
+            return False
+        return self.expires_at is None or datetime.now(timezone.utc) < self.expires_at
+
+    async def aclose(self):
+        """Close the session and wait for its background task to exit."""
+        self._closed.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+_mcp_sessions: dict[tuple, PooledMCPSession] = {}
+
+async def open_mcp_session(key: tuple, connection: dict[str, Any], expires_at: Optional[datetime] = None) -> list[BaseTool]:
+    """Open a pooled MCP session for a key, replacing any previous session, and return its tools."""
+    await close_mcp_session(key)
+    session = PooledMCPSession(connection, expires_at)
+    tools = await session.open()
+    _mcp_sessions[key] = session
+    return tools
+
+async def close_mcp_session(key: tuple):
+    """Close the pooled MCP session for a key, if there is one."""
+    session = _mcp_sessions.pop(key, None)
+    if session is not None and session.loop is asyncio.get_running_loop():
+        await session.aclose()
+
+def get_mcp_session(key: tuple) -> Optional[PooledMCPSession]:
+    """Return the pooled MCP session for a key, if there is one."""
+    return _mcp_sessions.get(key)
+
+
 ##########################
 # Tool Utils
 ##########################
@@ -287,14 +956,72 @@ async def get_search_tool(search_api: SearchAPI):
         return []
     
 async def get_all_tools(config: RunnableConfig):
-    tools = [tool(ResearchComplete)]
     configurable = Configuration.from_runnable_config(config)
+    registry_key = get_tool_registry_key(config)
+    entry = _tool_registry.get(registry_key)
+    if entry is not None and entry.valid:
+        return list(entry.tools)
+    # Researchers starting at the same time share a single tool list build
+    build = _tool_registry_builds.get(registry_key)
+    if build is None or build.get_loop() is not asyncio.get_running_loop():
+        build = asyncio.ensure_future(_build_tool_registry_entry(config, registry_key))
+        _tool_registry_builds[registry_key] = build
+        build.add_done_callback(lambda _: _tool_registry_builds.pop(registry_key, None))
+    entry = await asyncio.shield(build)
+    if configurable.tool_registry_ttl_seconds > 0 and entry.cacheable:
+        _tool_registry[registry_key] = entry
+    return list(entry.tools)
+
+async def _build_tool_registry_entry(config: RunnableConfig, registry_key: tuple) -> "ToolRegistryEntry":
+    configurable = Configuration.from_runnable_config(config)
+    tools = [tool(ResearchComplete)]
     search_api = SearchAPI(get_config_value(configurable.search_api))
     tools.extend(await get_search_tool(search_api))
     existing_tool_names = {tool.name if hasattr(tool, "name") else tool.get("name", "web_search") for tool in tools}
-    mcp_tools = await load_mcp_tools(config, existing_tool_names)
+    pool_sessions = configurable.tool_registry_ttl_seconds > 0
+    mcp_tools = await load_mcp_tools(config, existing_tool_names, mcp_session_key=registry_key if pool_sessions else None)
     tools.extend(mcp_tools)
-    return tools
+    # An MCP server that is configured but yielded no tools most likely failed to load; retry on the next call
+    mcp_configured = bool(configurable.mcp_config and configurable.mcp_config.url and configurable.mcp_config.tools)
+    return ToolRegistryEntry(
+        tools=tools,
+        expires_at=time.monotonic() + configurable.tool_registry_ttl_seconds,
+        mcp_session=get_mcp_session(registry_key) if pool_sessions and mcp_tools else None,
+        cacheable=bool(mcp_tools) or not mcp_configured,
+    )
+
+class ToolRegistryEntry:
+    """Tools built for one (search API, MCP config, user) key, valid until a TTL or token expiry."""
+
+    def __init__(self, tools: list, expires_at: float, mcp_session: Optional[PooledMCPSession] = None, cacheable: bool = True):
+        self.tools = tools
+        self.expires_at = expires_at
+        self.mcp_session = mcp_session
+        self.cacheable = cacheable
+        self.loop = asyncio.get_running_loop()
+
+    @property
+    def valid(self) -> bool:
+        """Whether the entry can be reused on the running loop."""
+        if self.loop is not asyncio.get_running_loop() or time.monotonic() >= self.expires_at:
+            return False
+        return self.mcp_session is None or self.mcp_session.alive
+
+_tool_registry: dict[tuple, ToolRegistryEntry] = {}
+_tool_registry_builds: dict[tuple, asyncio.Future] = {}
+
+def get_tool_registry_key(config: RunnableConfig) -> tuple:
+    """Return the key tools are cached under: the search API, the MCP config and the user."""
+    configurable = Configuration.from_runnable_config(config)
+    mcp_config = configurable.mcp_config.model_dump_json() if configurable.mcp_config else None
+    user_id = (config or {}).get("metadata", {}).get("owner")
+    return (get_config_value(configurable.search_api), mcp_config, user_id)
+
+async def clear_tool_registry():
+    """Drop all cached tool lists and close their pooled MCP sessions."""
+    _tool_registry.clear()
+    for key in list(_mcp_sessions):
+        await close_mcp_session(key)
 
 def get_notes_from_tool_calls(messages: list[MessageLikeRepresentation]):
     return [tool_msg.content for tool_msg in filter_messages(messages, include_types="tool")]
@@ -327,6 +1054,31 @@ def openai_websearch_called(response):
     return False
 
 
+##########################
+# Rate Limit Utils
+##########################
+def is_rate_limit_exceeded(exception: Exception) -> bool:
+    """Return whether an exception is a provider rate limit (HTTP 429) error."""
+    if exception.__class__.__name__ in ("RateLimitError", "TooManyRequests", "ResourceExhausted"):
+        return True
+    status_code = getattr(exception, "status_code", None) or getattr(getattr(exception, "response", None), "status_code", None)
+    if status_code == 429:
+        return True
+    error_str = str(exception).lower()
+    return "rate limit" in error_str or "rate_limit" in error_str or "429" in error_str
+
+def get_retry_after_seconds(exception: Exception) -> Optional[float]:
+    """Return the Retry-After delay sent with a rate limit error, if any."""
+    headers = getattr(getattr(exception, "response", None), "headers", None)
+    if not headers:
+        return None
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(float(retry_after), 0.0) if retry_after is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
 ##########################
 # Token Limit Exceeded Utils
 ##########################
@@ -443,6 +1195,105 @@ def remove_up_to_last_ai_message(messages: list[MessageLikeRepresentation]) -> l
             return messages[:i]  # Return everything up to (but not including) the last AI message
     return messages
 
+##########################
+# Token Counting Utils
+##########################
+@functools.lru_cache(maxsize=None)
+def get_token_encoding(model_string: str = ""):
+    """Return a tiktoken encoding for a model, or None when tiktoken or its encoding files are unavailable.
+
+    Models tiktoken does not know, such as Anthropic or Google models, use o200k_base as an approximation.
+    """
+    if tiktoken is None:
+        return None
+    model_name = model_string.split(":", 1)[-1]
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str, model_string: str = "") -> int:
+    """Count the tokens in a text, falling back to four characters per token without a tokenizer."""
+    encoding = get_token_encoding(model_string)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int, model_string: str = "") -> str:
+    """Cut a text down to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_token_encoding(model_string)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def allocate_token_budget(counts: list[int], token_budget: int) -> list[int]:
+    """Split a token budget across texts of the given sizes, water-filling style.
+
+    The budget is split evenly: texts that fit in their share keep their full size and the unused share
+    goes to the others, so only the largest texts get less than they need, and all get the same cap.
+    """
+    allotments = [0] * len(counts)
+    remaining = max(token_budget, 0)
+    by_size = sorted(range(len(counts)), key=lambda i: counts[i])
+    for position, i in enumerate(by_size):
+        share = remaining // (len(counts) - position)
+        allotments[i] = min(counts[i], share)
+        remaining -= allotments[i]
+    return allotments
+
+def fit_texts_to_budget(texts: list[str], token_budget: int, model_string: str = "") -> list[str]:
+    """Fit texts into a token budget, keeping their order and truncating only the largest ones.
+
+    Texts left with no budget are dropped.
+    """
+    counts = [count_tokens(text, model_string) for text in texts]
+    if sum(counts) <= token_budget:
+        return list(texts)
+    fitted = []
+    for text, count, allotment in zip(texts, counts, allocate_token_budget(counts, token_budget)):
+        if allotment >= count:
+            fitted.append(text)
+        elif allotment > 0:
+            fitted.append(truncate_to_tokens(text, allotment, model_string))
+    return fitted
+
+TRUNCATION_NOTICE = "\n[Truncated to fit the context window]"
+TRUNCATION_NOTICE_TOKENS = 12
+
+def count_message_tokens(messages: list[MessageLikeRepresentation], model_string: str = "") -> int:
+    """Count the tokens in a list of messages, including a small per-message overhead for roles and tool calls."""
+    return sum(count_tokens(get_buffer_string([message]), model_string) + 4 for message in messages)
+
+def trim_tool_messages_to_budget(messages: list[MessageLikeRepresentation], token_budget: int, model_string: str = "") -> list[MessageLikeRepresentation]:
+    """Truncate the largest tool messages until the messages fit in a token budget.
+
+    Other messages are kept as they are. Tool results share what is left of the budget, so small
+    results stay whole and the largest ones are cut to a common cap.
+    """
+    total_tokens = count_message_tokens(messages, model_string)
+    if total_tokens <= token_budget:
+        return messages
+    tool_indices = [i for i, message in enumerate(messages) if isinstance(message, ToolMessage)]
+    counts = [count_tokens(str(messages[i].content), model_string) for i in tool_indices]
+    tool_budget = token_budget - (total_tokens - sum(counts)) - TRUNCATION_NOTICE_TOKENS * len(tool_indices)
+    trimmed = list(messages)
+    for i, count, allotment in zip(tool_indices, counts, allocate_token_budget(counts, tool_budget)):
+        if allotment < count:
+            content = truncate_to_tokens(str(messages[i].content), allotment, model_string)
+            trimmed[i] = messages[i].model_copy(update={"content": content + TRUNCATION_NOTICE})
+    return trimmed
+
 ##########################
 # Misc Utils
 ##########################
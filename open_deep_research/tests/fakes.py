@@ -0,0 +1,146 @@
+"""Deterministic stand-ins for the chat models and Tavily, used to run the deep researcher graph offline."""
+import asyncio
+import hashlib
+import itertools
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from open_deep_research import deep_researcher, utils
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that plays every role in the graph with canned responses.
+
+    The response depends on the tools it is bound to: structured outputs get valid arguments, the
+    supervisor launches research_units_per_round ConductResearch calls for supervisor_rounds rounds, and
+    researchers search searches_per_researcher times before calling ResearchComplete. Calls without
+    tools (compression, final report) return output_tokens words. Every call sleeps for latency seconds.
+    """
+
+    latency: float = 0.0
+    output_tokens: int = 200
+    supervisor_rounds: int = 1
+    research_units_per_round: int = 3
+    searches_per_researcher: int = 2
+    calls: Counter = Field(default_factory=Counter)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-deep-research"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return self._respond(messages, kwargs.get("tools") or [])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools") or [])
+
+    def _respond(self, messages: list[BaseMessage], tools: list[dict]) -> ChatResult:
+        tool_names = {tool["function"]["name"] for tool in tools}
+        if "ClarifyWithUser" in tool_names:
+            message = self._tool_call("clarify", "ClarifyWithUser", {
+                "need_clarification": False, "question": "", "verification": "Starting research now."
+            })
+        elif "ResearchQuestion" in tool_names:
+            message = self._tool_call("brief", "ResearchQuestion", {"research_brief": f"Research brief: {self._last_human(messages)}"})
+        elif "Summary" in tool_names:
+            message = self._tool_call("summary", "Summary", {"summary": self._words("summary"), "key_excerpts": "key excerpt"})
+        elif "ConductResearch" in tool_names:
+            rounds = sum(1 for message in messages if isinstance(message, AIMessage))
+            if rounds < self.supervisor_rounds:
+                message = self._tool_calls("supervisor", [
+                    ("ConductResearch", {"research_topic": f"Topic {rounds}.{unit}"}) for unit in range(self.research_units_per_round)
+                ])
+            else:
+                message = self._tool_call("supervisor", "ResearchComplete", {})
+        elif tool_names:
+            searches = sum(1 for message in messages if isinstance(message, ToolMessage))
+            search_tool = next((name for name in sorted(tool_names) if name != "ResearchComplete"), None)
+            if search_tool and searches < self.searches_per_researcher:
+                topic = self._last_human(messages)
+                message = self._tool_call("researcher", search_tool, {"queries": [f"{topic} query {searches}"]})
+            else:
+                message = self._tool_call("researcher", "ResearchComplete", {})
+        else:
+            self.calls["text"] += 1
+            message = AIMessage(content=self._words("report"))
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": prompt_tokens + self.output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _tool_call(self, role: str, name: str, args: dict[str, Any]) -> AIMessage:
+        return self._tool_calls(role, [(name, args)])
+
+    def _tool_calls(self, role: str, calls: list[tuple[str, dict[str, Any]]]) -> AIMessage:
+        self.calls[role] += 1
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": args, "id": f"call_{next(_call_ids)}"} for name, args in calls
+        ])
+
+    def _words(self, word: str) -> str:
+        return " ".join(f"{word}{i}" for i in range(self.output_tokens))
+
+    @staticmethod
+    def _last_human(messages: list[BaseMessage]) -> str:
+        return next((str(message.content) for message in reversed(messages) if isinstance(message, HumanMessage)), "")
+
+_call_ids = itertools.count()
+
+
+class FakeTavilyClient:
+    """PooledTavilyClient stand-in that serves canned pages after latency seconds."""
+
+    latency: float = 0.0
+    page_words: int = 500
+    calls: int = 0
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        pass
+
+    async def search(self, query, max_results=5, include_raw_content=True, topic="general", **kwargs):
+        FakeTavilyClient.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = []
+        for rank in range(max_results):
+            page_id = hashlib.sha256(f"{query}:{rank}".encode()).hexdigest()[:12]
+            results.append({
+                "url": f"https://example.com/{page_id}",
+                "title": f"Page {page_id}",
+                "content": f"Snippet for {query}",
+                "raw_content": f"Page {page_id}. " + " ".join(f"word{i}" for i in range(self.page_words)) if include_raw_content else None,
+            })
+        return {"query": query, "results": results}
+
+
+@contextmanager
+def offline_providers(chat_model: FakeChatModel, tavily_client: type = FakeTavilyClient):
+    """Route the graph's chat models and Tavily searches to the fakes for the duration of the block."""
+    patched = [
+        (deep_researcher, "configurable_model", chat_model),
+        (utils, "init_chat_model", lambda **kwargs: chat_model),
+        (utils, "PooledTavilyClient", tavily_client),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patched]
+    try:
+        for module, name, value in patched:
+            setattr(module, name, value)
+        yield chat_model
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
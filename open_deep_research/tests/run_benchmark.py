@@ -0,0 +1,157 @@
+"""Offline latency benchmark for the deep researcher graph.
+
+Runs the full graph against the fakes in tests/fakes.py, so no API keys are needed, and reports wall-clock
+time, per-node latency, LLM call counts and peak memory for each point of a settings grid:
+
+    python -m tests.run_benchmark --max-concurrent-research-units 1 5 10 --max-react-tool-calls 2 5 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from open_deep_research.deep_researcher import deep_researcher_builder
+from tests.fakes import FakeChatModel, FakeTavilyClient, offline_providers
+
+
+class NodeTimingHandler(AsyncCallbackHandler):
+    """Callback handler that records wall time per graph node and chat model calls per node."""
+
+    def __init__(self):
+        self.started: dict[UUID, tuple[str, float]] = {}
+        self.node_seconds: dict[str, list[float]] = defaultdict(list)
+        self.llm_calls: dict[str, int] = defaultdict(int)
+
+    async def on_chain_start(self, serialized, inputs, *, run_id: UUID, metadata: Optional[dict[str, Any]] = None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.started[run_id] = (node, time.perf_counter())
+
+    async def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    async def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict[str, Any]] = None, **kwargs):
+        self.llm_calls[(metadata or {}).get("langgraph_node", "other")] += 1
+
+    def _finish(self, run_id: UUID):
+        started = self.started.pop(run_id, None)
+        if started:
+            node, start = started
+            self.node_seconds[node].append(time.perf_counter() - start)
+
+
+async def run_once(
+    max_concurrent_research_units: int,
+    max_react_tool_calls: int,
+    llm_latency: float = 0.0,
+    search_latency: float = 0.0,
+    output_tokens: int = 200,
+    supervisor_rounds: int = 1,
+    extra_configurable: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Run the graph once against the fakes and return its measurements."""
+    model = FakeChatModel(
+        latency=llm_latency,
+        output_tokens=output_tokens,
+        supervisor_rounds=supervisor_rounds,
+        research_units_per_round=max_concurrent_research_units,
+        searches_per_researcher=max_react_tool_calls,
+    )
+    FakeTavilyClient.latency = search_latency
+    FakeTavilyClient.calls = 0
+    handler = NodeTimingHandler()
+    thread_id = str(uuid.uuid4())
+    config = {
+        "configurable": {
+            "thread_id": thread_id,
+            "allow_clarification": False,
+            "search_api": "tavily",
+            "max_concurrent_research_units": max_concurrent_research_units,
+            "max_react_tool_calls": max_react_tool_calls,
+            "max_researcher_iterations": supervisor_rounds + 1,
+            # Summaries would be reused across grid points and hide summarization cost
+            "summarization_cache_enabled": False,
+            **(extra_configurable or {}),
+        },
+        "callbacks": [handler],
+    }
+    graph = deep_researcher_builder.compile()
+    with offline_providers(model):
+        tracemalloc.start()
+        start = time.perf_counter()
+        final_state = await graph.ainvoke({"messages": [{"role": "user", "content": "Benchmark topic"}]}, config)
+        wall_seconds = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "thread_id": thread_id,
+        "max_concurrent_research_units": max_concurrent_research_units,
+        "max_react_tool_calls": max_react_tool_calls,
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_memory_mb": round(peak_bytes / 1_000_000, 2),
+        "llm_calls": sum(model.calls.values()),
+        "llm_calls_by_role": dict(model.calls),
+        "llm_calls_by_node": dict(handler.llm_calls),
+        "search_calls": FakeTavilyClient.calls,
+        "node_seconds": {node: round(sum(times), 3) for node, times in handler.node_seconds.items()},
+        "node_runs": {node: len(times) for node, times in handler.node_seconds.items()},
+        "final_report_chars": len(final_state.get("final_report", "")),
+    }
+
+
+async def run_grid(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for units, react_calls in itertools.product(args.max_concurrent_research_units, args.max_react_tool_calls):
+        for _ in range(args.repeat):
+            results.append(await run_once(
+                units, react_calls,
+                llm_latency=args.llm_latency,
+                search_latency=args.search_latency,
+                output_tokens=args.output_tokens,
+                supervisor_rounds=args.supervisor_rounds,
+            ))
+    return results
+
+
+def print_table(results: list[dict[str, Any]]):
+    columns = ["max_concurrent_research_units", "max_react_tool_calls", "wall_seconds", "llm_calls", "search_calls", "peak_memory_mb"]
+    headers = ["units", "react", "wall_s", "llm_calls", "searches", "peak_mb"]
+    print("  ".join(f"{header:>10}" for header in headers))
+    for result in results:
+        print("  ".join(f"{result[column]:>10}" for column in columns))
+        slowest = sorted(result["node_seconds"].items(), key=lambda item: -item[1])
+        print("    " + ", ".join(f"{node}={seconds}s" for node, seconds in slowest))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-concurrent-research-units", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--max-react-tool-calls", type=int, nargs="+", default=[2, 5])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds each fake chat model call takes")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Seconds each fake Tavily search takes")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Words in each fake text response")
+    parser.add_argument("--supervisor-rounds", type=int, default=1, help="Rounds of ConductResearch calls the fake supervisor makes")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_grid(args))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
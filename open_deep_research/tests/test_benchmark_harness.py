@@ -0,0 +1,16 @@
+import asyncio
+
+from tests.run_benchmark import run_once
+
+
+def test_graph_runs_offline_with_fakes():
+    result = asyncio.run(run_once(max_concurrent_research_units=2, max_react_tool_calls=2))
+
+    assert result["final_report_chars"] > 0
+    assert result["search_calls"] == 2 * 2
+    # Five results per search are summarized, then each researcher compresses and the final report is written
+    assert result["llm_calls_by_role"]["summary"] == 2 * 2 * 5
+    assert result["llm_calls_by_role"]["text"] == 2 + 1
+    assert result["node_runs"]["compress_research"] == 2
+    assert result["node_runs"]["final_report_generation"] == 1
+    assert result["peak_memory_mb"] > 0
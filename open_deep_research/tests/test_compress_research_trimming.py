@@ -0,0 +1,62 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from open_deep_research import deep_researcher, utils
+from open_deep_research.utils import count_message_tokens, trim_tool_messages_to_budget
+
+
+def research_messages():
+    return [
+        SystemMessage(content="system"),
+        HumanMessage(content="research topic"),
+        AIMessage(content="", tool_calls=[{"name": "tavily_search", "args": {"queries": ["q"]}, "id": "call-1"}]),
+        ToolMessage(content="small result", tool_call_id="call-1"),
+        AIMessage(content="", tool_calls=[{"name": "tavily_search", "args": {"queries": ["q2"]}, "id": "call-2"}]),
+        ToolMessage(content="y" * 40_000, tool_call_id="call-2"),
+        ToolMessage(content="z" * 20_000, tool_call_id="call-2"),
+    ]
+
+
+def test_trimming_cuts_only_the_largest_tool_messages(monkeypatch):
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    messages = research_messages()
+    trimmed = trim_tool_messages_to_budget(messages, 5_000)
+
+    assert count_message_tokens(trimmed) <= 5_000
+    assert trimmed[:5] == messages[:5]
+    assert trimmed[5].content.endswith("[Truncated to fit the context window]")
+    assert len(trimmed[5].content) == len(trimmed[6].content)
+    assert trimmed[5].tool_call_id == "call-2"
+    # The original messages are left untouched
+    assert messages[5].content == "y" * 40_000
+
+
+def test_messages_that_fit_are_returned_as_is():
+    messages = research_messages()
+    assert trim_tool_messages_to_budget(messages, 1_000_000) is messages
+
+
+class RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    def with_config(self, config):
+        return self
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        return AIMessage(content="compressed")
+
+
+def test_compress_research_fits_on_the_first_call(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    monkeypatch.setitem(utils.MODEL_TOKEN_LIMITS, "fake:compression-model", 8_000)
+    config = {"configurable": {"compression_model": "fake:compression-model", "compression_model_max_tokens": 1_000}}
+
+    result = asyncio.run(deep_researcher.compress_research({"researcher_messages": research_messages()}, config))
+    assert result["compressed_research"] == "compressed"
+    assert len(model.calls) == 1
+    assert count_message_tokens(model.calls[0]) <= 8_000 * 0.9 - 1_000
@@ -0,0 +1,95 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langgraph.graph import START, END, StateGraph
+
+from open_deep_research import deep_researcher, utils
+from open_deep_research.state import AgentState
+from open_deep_research.utils import count_tokens, fit_texts_to_budget
+
+
+class StreamingReportModel:
+    """Stand-in for the configurable chat model that streams a fixed report and records its prompt."""
+
+    def __init__(self):
+        self.prompts = []
+        self.invoked = False
+
+    def with_config(self, config):
+        return self
+
+    async def astream(self, messages):
+        self.prompts.append(messages[0].content)
+        for piece in ["# Report", "\n\nBody", " text."]:
+            yield AIMessageChunk(content=piece)
+
+    async def ainvoke(self, messages):
+        self.invoked = True
+        return AIMessage(content="legacy report")
+
+
+def build_report_graph():
+    builder = StateGraph(AgentState)
+    builder.add_node("final_report_generation", deep_researcher.final_report_generation)
+    builder.add_edge(START, "final_report_generation")
+    builder.add_edge("final_report_generation", END)
+    return builder.compile()
+
+
+def test_fit_texts_to_budget_truncates_only_the_largest_texts(monkeypatch):
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    texts = ["a" * 40, "b" * 400, "c" * 4000]
+    fitted = fit_texts_to_budget(texts, 300)
+
+    assert fitted[0] == texts[0]
+    assert fitted[1] == texts[1]
+    assert fitted[2] == "c" * (4 * (300 - 10 - 100))
+    assert sum(count_tokens(text) for text in fitted) <= 300
+
+
+def test_fit_texts_to_budget_keeps_texts_that_fit():
+    texts = ["first note", "second note"]
+    assert fit_texts_to_budget(texts, 10_000) == texts
+    assert fit_texts_to_budget(texts, 0) == []
+
+
+def test_streaming_report_packs_findings_and_streams_tokens(monkeypatch):
+    model = StreamingReportModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    monkeypatch.setitem(utils.MODEL_TOKEN_LIMITS, "fake:small-model", 12_000)
+    notes = ["short note", "x" * 200_000]
+    config = {"configurable": {
+        "final_report_streaming": True,
+        "final_report_model": "fake:small-model",
+        "final_report_model_max_tokens": 1_000,
+    }}
+
+    async def run():
+        tokens, final = [], None
+        async for mode, chunk in build_report_graph().astream(
+            {"messages": [], "notes": notes, "research_brief": "brief"}, config, stream_mode=["custom", "values"]
+        ):
+            if mode == "custom":
+                tokens.append(chunk["final_report_token"])
+            else:
+                final = chunk
+        return tokens, final
+
+    tokens, final = asyncio.run(run())
+    assert tokens == ["# Report", "\n\nBody", " text."]
+    assert final["final_report"] == "# Report\n\nBody text."
+    assert len(model.prompts) == 1
+    assert "short note" in model.prompts[0]
+    assert count_tokens(model.prompts[0]) <= 12_000 * 0.9 - 1_000
+    assert not model.invoked
+
+
+def test_unknown_token_limit_keeps_legacy_path(monkeypatch):
+    model = StreamingReportModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    config = {"configurable": {"final_report_streaming": True, "final_report_model": "fake:unlisted-model"}}
+
+    final = asyncio.run(build_report_graph().ainvoke({"messages": [], "notes": ["note"]}, config))
+    assert final["final_report"] == "legacy report"
+    assert model.prompts == []
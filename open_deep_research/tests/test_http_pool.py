@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from tavily.errors import MissingAPIKeyError
+
+from open_deep_research import utils
+from open_deep_research.utils import (
+    PooledTavilyClient,
+    close_http_pool,
+    get_aiohttp_session,
+    get_http_client,
+    is_rate_limit_exceeded,
+    pooled_http_client,
+)
+
+
+def test_clients_are_shared_within_a_loop_and_closed_on_shutdown():
+    async def run():
+        client = get_http_client()
+        async with pooled_http_client() as borrowed:
+            assert borrowed is client
+        assert not client.is_closed
+        session = get_aiohttp_session()
+        assert get_aiohttp_session() is session
+        await close_http_pool()
+        return client, session
+
+    client, session = asyncio.run(run())
+    assert client.is_closed
+    assert session.closed
+
+
+def test_each_loop_gets_its_own_client():
+    async def run():
+        client = get_http_client()
+        await close_http_pool()
+        return client
+
+    assert asyncio.run(run()) is not asyncio.run(run())
+
+
+def mock_tavily(monkeypatch, handler):
+    async def run(coro_factory):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            monkeypatch.setattr(utils, "get_http_client", lambda: client)
+            return await coro_factory()
+    return run
+
+
+def test_tavily_client_posts_over_the_shared_client(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"query": "q", "results": []})
+
+    run = mock_tavily(monkeypatch, handler)
+    client = PooledTavilyClient(api_key="tvly-test")
+    result = asyncio.run(run(lambda: client.search("q", max_results=3, include_raw_content=True, topic="news")))
+
+    assert result == {"query": "q", "results": []}
+    assert requests[0].url == "https://api.tavily.com/search"
+    assert requests[0].headers["authorization"] == "Bearer tvly-test"
+    assert json.loads(requests[0].content) == {
+        "query": "q", "search_depth": "basic", "topic": "news", "max_results": 3, "include_raw_content": True
+    }
+
+
+def test_tavily_rate_limits_are_detectable(monkeypatch):
+    run = mock_tavily(monkeypatch, lambda request: httpx.Response(429, headers={"retry-after": "2"}))
+    client = PooledTavilyClient(api_key="tvly-test")
+
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        asyncio.run(run(lambda: client.search("q")))
+    assert is_rate_limit_exceeded(error.value)
+    assert utils.get_retry_after_seconds(error.value) == 2.0
+
+
+def test_tavily_client_requires_an_api_key(monkeypatch):
+    monkeypatch.delenv("TAVILY_API_KEY", raising=False)
+    with pytest.raises(MissingAPIKeyError):
+        PooledTavilyClient()
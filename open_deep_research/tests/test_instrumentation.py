@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from starlette.testclient import TestClient
+
+from open_deep_research import deep_researcher
+from open_deep_research.instrumentation import (
+    get_thread_metrics,
+    metrics_registry,
+    render_prometheus_metrics,
+)
+from open_deep_research.server import app
+from tests.run_benchmark import run_once
+
+
+def run_instrumented(exporter):
+    return asyncio.run(run_once(
+        max_concurrent_research_units=2,
+        max_react_tool_calls=2,
+        extra_configurable={"instrumentation_exporter": exporter, "summarization_cache_enabled": True},
+    ))
+
+
+def test_prometheus_exporter_records_per_node_metrics():
+    metrics_registry.clear()
+    result = run_instrumented("prometheus")
+    metrics = get_thread_metrics(result["thread_id"])
+
+    assert metrics["node_runs"]["final_report_generation"] == 1
+    assert metrics["node_runs"]["compress_research"] == 2
+    assert metrics["node_seconds"]["researcher_tools"] > 0
+    # Summarization calls are made inside the search tool and count against researcher_tools
+    assert metrics["llm_calls"]["researcher_tools"] == 2 * 2 * 5
+    assert metrics["llm_calls"]["supervisor"] == 2
+    assert metrics["prompt_tokens"]["supervisor"] > 0
+    assert metrics["completion_tokens"]["final_report_generation"] == 200
+    assert metrics["tool_calls"]["tavily_search"] == 2 * 2
+    assert metrics["summary_cache_misses"] == 2 * 2 * 5
+
+    text = render_prometheus_metrics()
+    assert f'deep_research_node_runs_total{{thread_id="{result["thread_id"]}",node="researcher"}} 4' in text
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert "deep_research_llm_calls_total" in response.text
+
+
+def test_log_exporter_logs_each_node(caplog):
+    with caplog.at_level(logging.INFO, logger="open_deep_research.instrumentation"):
+        result = run_instrumented("log")
+    lines = [record.getMessage() for record in caplog.records if result["thread_id"] in record.getMessage()]
+    assert any("node=final_report_generation" in line for line in lines)
+
+
+def test_no_exporter_records_nothing():
+    metrics_registry.clear()
+    run_instrumented("none")
+    assert metrics_registry.snapshot() == {}
+
+
+class FlakyModel:
+    def __init__(self, failures):
+        self.failures = failures
+
+    def with_config(self, config):
+        return self
+
+    async def ainvoke(self, messages):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("temporary failure")
+        return AIMessage(content="compressed")
+
+
+def test_node_retry_loops_are_counted(monkeypatch):
+    metrics_registry.clear()
+    monkeypatch.setattr(deep_researcher, "configurable_model", FlakyModel(failures=2))
+    config = {"configurable": {"thread_id": "retry-thread", "instrumentation_exporter": "prometheus"}}
+    state = {"researcher_messages": [SystemMessage(content="system"), HumanMessage(content="topic")]}
+
+    result = asyncio.run(deep_researcher.compress_research(state, config))
+    assert result["compressed_research"] == "compressed"
+    assert get_thread_metrics("retry-thread")["retries"]["compress_research"] == 2
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from open_deep_research import deep_researcher, utils
+from open_deep_research.utils import (
+    SearchBroker,
+    close_search_broker,
+    get_search_broker,
+    get_search_broker_id,
+    open_search_broker,
+    tavily_search_async,
+)
+
+
+class CountingTavilyClient:
+    """Fake PooledTavilyClient that counts searches per query."""
+
+    calls: list[str] = []
+
+    def __init__(self, api_key=None):
+        pass
+
+    async def search(self, query, max_results=5, include_raw_content=True, topic="general"):
+        CountingTavilyClient.calls.append(query)
+        await asyncio.sleep(0.01)
+        return {"query": query, "results": [{"url": f"https://example.com/{query}", "title": query, "content": query}]}
+
+
+def test_in_flight_searches_are_coalesced_and_memoized():
+    broker = SearchBroker()
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"results": []}
+
+    async def run():
+        await asyncio.gather(*[broker.search("q", search) for _ in range(4)])
+        await broker.search("q", search)
+
+    asyncio.run(run())
+    assert len(calls) == 1
+    report = broker.report()
+    assert report["search_requests"] == 5
+    assert report["search_calls_saved"] == 4
+
+
+def test_failed_searches_are_retried():
+    broker = SearchBroker()
+    attempts = []
+
+    async def flaky_search():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return {"results": []}
+
+    async def run():
+        try:
+            await broker.search("q", flaky_search)
+        except RuntimeError:
+            pass
+        return await broker.search("q", flaky_search)
+
+    assert asyncio.run(run()) == {"results": []}
+    assert len(attempts) == 2
+
+
+def test_urls_are_summarized_once_per_run():
+    broker = SearchBroker()
+    calls = []
+
+    async def summarize():
+        calls.append(1)
+        return "summary"
+
+    async def run():
+        return await asyncio.gather(*[broker.summarize("https://example.com", summarize) for _ in range(3)])
+
+    assert asyncio.run(run()) == ["summary"] * 3
+    assert len(calls) == 1
+    assert broker.report()["summary_calls_saved"] == 2
+
+
+def test_tavily_search_async_shares_queries_across_researchers(monkeypatch):
+    monkeypatch.setattr(utils, "PooledTavilyClient", CountingTavilyClient)
+    CountingTavilyClient.calls = []
+    config = {"configurable": {"thread_id": "thread-1"}}
+    broker_id = get_search_broker_id(config)
+    open_search_broker(broker_id)
+    researcher_config = {"configurable": {**config["configurable"], "search_broker_id": broker_id}}
+    assert get_search_broker(researcher_config) is not None
+
+    async def run():
+        return await asyncio.gather(
+            tavily_search_async(["Solar panels", "wind power"], config=researcher_config),
+            tavily_search_async(["solar  panels?"], config=researcher_config),
+        )
+
+    first, second = asyncio.run(run())
+    assert CountingTavilyClient.calls == ["Solar panels", "wind power"]
+    assert second[0] is first[0]
+
+    report = close_search_broker(broker_id)
+    assert report["search_requests"] == 3
+    assert report["search_calls_saved"] == 1
+    assert get_search_broker(researcher_config) is None
+
+
+def test_broker_id_falls_back_to_research_brief():
+    assert get_search_broker_id({"configurable": {"thread_id": "abc"}}) == "abc"
+    assert get_search_broker_id({}, "brief") == get_search_broker_id(None, "brief")
+    assert get_search_broker_id({}, "brief") != get_search_broker_id({}, "other brief")
+
+
+class CancelledSubgraph:
+    async def ainvoke(self, state, config):
+        raise asyncio.CancelledError()
+
+
+def test_cancelled_supervisor_tools_release_the_broker(monkeypatch):
+    monkeypatch.setattr(deep_researcher, "researcher_subgraph", CancelledSubgraph())
+    config = {"configurable": {"thread_id": "thread-cancelled"}}
+    message = AIMessage(content="", tool_calls=[{"name": "ConductResearch", "args": {"research_topic": "topic"}, "id": "call-1"}])
+    state = {"supervisor_messages": [message], "research_iterations": 1, "research_brief": "brief"}
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(deep_researcher.supervisor_tools(state, config))
+    assert get_search_broker({"configurable": {"search_broker_id": "thread-cancelled"}}) is None
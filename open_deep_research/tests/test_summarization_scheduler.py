@@ -0,0 +1,152 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from open_deep_research import utils
+from open_deep_research.utils import SummarizationScheduler, tavily_search
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after} if retry_after else {})
+
+
+def test_max_in_flight_is_respected():
+    async def run():
+        scheduler = SummarizationScheduler(max_in_flight=2)
+        running = 0
+        peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*[scheduler.run(call) for _ in range(6)])
+        return peak, scheduler.stats()
+
+    peak, stats = asyncio.run(run())
+    assert peak == 2
+    assert stats["in_flight"] == 0
+
+
+def test_shorter_pages_are_served_first():
+    async def run():
+        scheduler = SummarizationScheduler(max_in_flight=1)
+        order = []
+        blocker = asyncio.Event()
+
+        async def call(name):
+            order.append(name)
+            if name == "first":
+                await blocker.wait()
+
+        first = asyncio.ensure_future(scheduler.run(lambda: call("first"), priority=0))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.ensure_future(scheduler.run(lambda name=name: call(name), priority=priority))
+            for name, priority in [("long", 50_000), ("short", 100), ("medium", 5_000)]
+        ]
+        await asyncio.sleep(0)
+        blocker.set()
+        await asyncio.gather(first, *waiting)
+        return order
+
+    assert asyncio.run(run()) == ["first", "short", "medium", "long"]
+
+
+def test_token_budget_paces_calls():
+    async def run():
+        # 6000 tokens per minute refills at 100 tokens per second
+        scheduler = SummarizationScheduler(max_in_flight=10, tokens_per_minute=6000)
+        scheduler._tokens = 0.0
+
+        async def call():
+            return time.monotonic()
+
+        start = time.monotonic()
+        finished = await asyncio.gather(*[scheduler.run(call, tokens=10) for _ in range(3)])
+        return [t - start for t in finished]
+
+    elapsed = asyncio.run(run())
+    assert elapsed[-1] >= 0.25
+
+
+def test_rate_limit_pauses_other_callers_for_retry_after():
+    async def run():
+        scheduler = SummarizationScheduler(max_in_flight=5)
+
+        async def limited():
+            raise RateLimitError(retry_after="0.2")
+
+        async def ok():
+            return time.monotonic()
+
+        try:
+            await scheduler.run(limited)
+        except RateLimitError:
+            pass
+        start = time.monotonic()
+        finished = await scheduler.run(ok)
+        return finished - start, scheduler.stats()
+
+    waited, stats = asyncio.run(run())
+    assert waited >= 0.15
+    assert stats["rate_limited"] == 1
+
+
+def test_cancelled_waiters_release_their_slot():
+    async def run():
+        scheduler = SummarizationScheduler(max_in_flight=1)
+        blocker = asyncio.Event()
+
+        holder = asyncio.ensure_future(scheduler.run(blocker.wait))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(scheduler.run(blocker.wait))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        blocker.set()
+        await holder
+        await asyncio.wait_for(scheduler.run(lambda: asyncio.sleep(0)), timeout=1)
+        return scheduler.stats()
+
+    assert asyncio.run(run()) == {"in_flight": 0, "waiting": 0, "rate_limited": 0}
+
+
+class SlowSummaryModel:
+    def with_structured_output(self, schema):
+        return self
+
+    def with_retry(self, **kwargs):
+        return self
+
+    async def ainvoke(self, messages):
+        content = messages[0].content
+        await asyncio.sleep(5 if "slow page" in content else 0)
+        return SimpleNamespace(summary="summarized", key_excerpts="")
+
+
+class FakeTavilyClient:
+    def __init__(self, api_key=None):
+        pass
+
+    async def search(self, query, **kwargs):
+        return {"query": query, "results": [
+            {"url": "https://fast.example", "title": "Fast", "content": "fast snippet", "raw_content": "fast page"},
+            {"url": "https://slow.example", "title": "Slow", "content": "slow snippet", "raw_content": "slow page"},
+        ]}
+
+
+def test_tavily_search_returns_partial_results_at_deadline(monkeypatch):
+    monkeypatch.setattr(utils, "init_chat_model", lambda **kwargs: SlowSummaryModel())
+    monkeypatch.setattr(utils, "PooledTavilyClient", FakeTavilyClient)
+    config = {"configurable": {"summarization_deadline_seconds": 0.2, "summarization_cache_enabled": False}}
+
+    start = time.monotonic()
+    output = asyncio.run(tavily_search.ainvoke({"queries": ["deadline"]}, config))
+    assert time.monotonic() - start < 2
+    assert "summarized" in output
+    assert "slow snippet" in output
@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+from open_deep_research import utils
+from open_deep_research.configuration import Configuration
+from open_deep_research.utils import SummaryCache, get_summary_cache, summarize_webpage_cached
+
+
+class CountingSummaryModel:
+    """Stand-in for the structured summarization model that counts calls."""
+
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("summarization failed")
+        return SimpleNamespace(summary="short summary", key_excerpts="an excerpt")
+
+
+def test_disk_persistence_across_instances(tmp_path):
+    path = str(tmp_path / "summaries.sqlite3")
+    key = SummaryCache.make_key("page content", "openai:gpt-4.1-nano")
+
+    first = SummaryCache(path=path, ttl_seconds=0, max_entries=10)
+    asyncio.run(first.aset(key, "cached summary"))
+
+    second = SummaryCache(path=path, ttl_seconds=0, max_entries=10)
+    assert asyncio.run(second.aget(key)) == "cached summary"
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    path = str(tmp_path / "summaries.sqlite3")
+    key = SummaryCache.make_key("page content", "openai:gpt-4.1-nano")
+    now = 1_000_000.0
+    monkeypatch.setattr(utils.time, "time", lambda: now)
+
+    cache = SummaryCache(path=path, ttl_seconds=60, max_entries=10)
+    asyncio.run(cache.aset(key, "cached summary"))
+    assert asyncio.run(cache.aget(key)) == "cached summary"
+
+    now += 61
+    assert asyncio.run(cache.aget(key)) is None
+    # The expired row is gone from disk as well, not only from memory
+    fresh = SummaryCache(path=path, ttl_seconds=60, max_entries=10)
+    assert asyncio.run(fresh.aget(key)) is None
+
+
+def test_lru_eviction_past_max_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / "summaries.sqlite3")
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(utils.time, "time", lambda: float(next(clock)))
+    keys = [SummaryCache.make_key(f"page {i}", "model") for i in range(3)]
+
+    cache = SummaryCache(path=path, ttl_seconds=0, max_entries=2)
+    asyncio.run(cache.aset(keys[0], "summary 0"))
+    asyncio.run(cache.aset(keys[1], "summary 1"))
+    # Touch the first entry on disk so the second one becomes least recently used
+    reader = SummaryCache(path=path, ttl_seconds=0, max_entries=2)
+    assert asyncio.run(reader.aget(keys[0])) == "summary 0"
+    asyncio.run(cache.aset(keys[2], "summary 2"))
+
+    fresh = SummaryCache(path=path, ttl_seconds=0, max_entries=2)
+    assert asyncio.run(fresh.aget(keys[0])) == "summary 0"
+    assert asyncio.run(fresh.aget(keys[1])) is None
+    assert asyncio.run(fresh.aget(keys[2])) == "summary 2"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_failed_summaries_are_not_cached():
+    cache = SummaryCache(path=None, ttl_seconds=0, max_entries=10)
+    failing_model = CountingSummaryModel(fail=True)
+
+    result = asyncio.run(summarize_webpage_cached(failing_model, "raw page", cache, "model"))
+    assert result == "raw page"
+    assert asyncio.run(cache.aget(cache.make_key("raw page", "model"))) is None
+
+    working_model = CountingSummaryModel()
+    result = asyncio.run(summarize_webpage_cached(working_model, "raw page", cache, "model"))
+    assert "short summary" in result
+    assert working_model.calls == 1
+
+
+def test_key_depends_on_model_and_prompt(monkeypatch):
+    base = SummaryCache.make_key("page content", "openai:gpt-4.1-nano")
+    assert base != SummaryCache.make_key("page content", "openai:gpt-4.1-mini")
+    assert base != SummaryCache.make_key("other content", "openai:gpt-4.1-nano")
+
+    monkeypatch.setattr(utils, "SUMMARIZE_WEBPAGE_PROMPT_VERSION", "changed-prompt")
+    assert base != SummaryCache.make_key("page content", "openai:gpt-4.1-nano")
+
+
+def test_stats_counters_and_concurrent_misses_coalesce():
+    cache = SummaryCache(path=None, ttl_seconds=0, max_entries=10)
+    model = CountingSummaryModel(delay=0.01)
+
+    async def summarize_concurrently():
+        return await asyncio.gather(*[
+            summarize_webpage_cached(model, "shared page", cache, "model")
+            for _ in range(5)
+        ])
+
+    results = asyncio.run(summarize_concurrently())
+    assert len(set(results)) == 1
+    assert model.calls == 1
+
+    asyncio.run(summarize_webpage_cached(model, "shared page", cache, "model"))
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["coalesced"] == 4
+    assert model.calls == 1
+
+
+def test_get_summary_cache_is_shared_per_path(tmp_path):
+    path = str(tmp_path / "summaries.sqlite3")
+    first = get_summary_cache(Configuration(summarization_cache_path=path, summarization_cache_ttl_seconds=10))
+    second = get_summary_cache(Configuration(summarization_cache_path=path, summarization_cache_max_entries=5, summarization_cache_ttl_seconds=20))
+    assert first is second
+    assert second.ttl_seconds == 20
+    assert second.max_entries == 5
+    assert get_summary_cache(Configuration(summarization_cache_enabled=False)) is None
@@ -0,0 +1,79 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from open_deep_research import deep_researcher, utils
+from open_deep_research.deep_researcher import pack_notes_into_groups, synthesize_notes
+
+
+class MergingModel:
+    """Stand-in for the compression model that merges each group into a short note."""
+
+    def __init__(self):
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+
+    def with_config(self, config):
+        return self
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return AIMessage(content=f"merged {self.calls}")
+
+
+def small_model_config(monkeypatch, report_limit, compression_limit, **configurable):
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    monkeypatch.setitem(utils.MODEL_TOKEN_LIMITS, "fake:report-model", report_limit)
+    monkeypatch.setitem(utils.MODEL_TOKEN_LIMITS, "fake:compression-model", compression_limit)
+    return {"configurable": {
+        "final_report_model": "fake:report-model",
+        "final_report_model_max_tokens": 1_000,
+        "compression_model": "fake:compression-model",
+        "compression_model_max_tokens": 1_000,
+        **configurable,
+    }}
+
+
+def test_notes_that_fit_pass_through(monkeypatch):
+    model = MergingModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    config = small_model_config(monkeypatch, 100_000, 100_000)
+
+    assert asyncio.run(synthesize_notes({"notes": ["a note"], "research_brief": "brief"}, config)) == {}
+    assert model.calls == 0
+
+
+def test_large_note_sets_are_merged_concurrently(monkeypatch):
+    model = MergingModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    config = small_model_config(monkeypatch, 8_000, 8_000, synthesis_max_concurrency=3)
+    notes = [f"note {i} " + "x" * 8_000 for i in range(20)]
+
+    result = asyncio.run(synthesize_notes({"notes": notes, "research_brief": "brief"}, config))
+    merged = result["notes"]["value"]
+    assert result["notes"]["type"] == "override"
+    assert 1 <= len(merged) < len(notes)
+    assert all(note.startswith("merged") for note in merged)
+    assert model.peak == 3
+
+
+def test_depth_limits_the_number_of_rounds(monkeypatch):
+    model = MergingModel()
+    monkeypatch.setattr(deep_researcher, "configurable_model", model)
+    config = small_model_config(monkeypatch, 8_000, 8_000, synthesis_max_depth=1)
+    notes = ["x" * 8_000 for _ in range(20)]
+
+    asyncio.run(synthesize_notes({"notes": notes, "research_brief": "brief"}, config))
+    groups = pack_notes_into_groups(notes, 5_000, "fake:compression-model")
+    assert model.calls <= len(groups)
+
+
+def test_pack_notes_into_groups_truncates_oversized_notes(monkeypatch):
+    monkeypatch.setattr(utils, "get_token_encoding", lambda model_string="": None)
+    groups = pack_notes_into_groups(["a" * 40, "b" * 40, "c" * 400], 25, "fake:model")
+    assert groups == [["a" * 40, "b" * 40], ["c" * 100]]
@@ -0,0 +1,171 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from langchain_core.tools import tool
+
+from open_deep_research import utils
+from open_deep_research.utils import clear_tool_registry, get_all_tools, get_tool_registry_key
+
+
+@tool
+def fetch_page(url: str) -> str:
+    """Fetch a page."""
+    return url
+
+
+@tool
+def delete_page(url: str) -> str:
+    """Delete a page."""
+    return url
+
+
+class FakeMCPClient:
+    """Stand-in for MultiServerMCPClient that counts opened sessions."""
+
+    sessions_opened = 0
+    sessions_closed = 0
+
+    def __init__(self, connections):
+        self.connections = connections
+
+    @asynccontextmanager
+    async def session(self, server_name):
+        FakeMCPClient.sessions_opened += 1
+        try:
+            yield object()
+        finally:
+            FakeMCPClient.sessions_closed += 1
+
+
+async def fake_load_session_tools(session):
+    await asyncio.sleep(0.01)
+    return [fetch_page, delete_page]
+
+
+def mcp_config(**configurable):
+    return {
+        "configurable": {
+            "search_api": "none",
+            "mcp_config": {"url": "https://mcp.example", "tools": ["fetch_page"]},
+            **configurable,
+        },
+        "metadata": {"owner": "user-1"},
+    }
+
+
+def patch_mcp(monkeypatch):
+    FakeMCPClient.sessions_opened = 0
+    FakeMCPClient.sessions_closed = 0
+    monkeypatch.setattr(utils, "MultiServerMCPClient", FakeMCPClient)
+    monkeypatch.setattr(utils, "load_mcp_session_tools", fake_load_session_tools)
+
+
+def tool_names(tools):
+    return [t.name for t in tools]
+
+
+def test_concurrent_researchers_share_one_build_and_session(monkeypatch):
+    patch_mcp(monkeypatch)
+    config = mcp_config()
+
+    async def run():
+        results = await asyncio.gather(*[get_all_tools(config) for _ in range(4)])
+        results.append(await get_all_tools(config))
+        await clear_tool_registry()
+        return results
+
+    results = asyncio.run(run())
+    assert all(tool_names(tools) == ["ResearchComplete", "fetch_page"] for tools in results)
+    assert FakeMCPClient.sessions_opened == 1
+    assert FakeMCPClient.sessions_closed == 1
+
+
+def test_entries_expire_with_ttl(monkeypatch):
+    patch_mcp(monkeypatch)
+    config = mcp_config(tool_registry_ttl_seconds=1)
+
+    async def run():
+        await get_all_tools(config)
+        await get_all_tools(config)
+        opened_before_expiry = FakeMCPClient.sessions_opened
+        await asyncio.sleep(1.05)
+        await get_all_tools(config)
+        await clear_tool_registry()
+        return opened_before_expiry
+
+    assert asyncio.run(run()) == 1
+    assert FakeMCPClient.sessions_opened == 2
+    # The expired session is closed when its replacement opens
+    assert FakeMCPClient.sessions_closed == 2
+
+
+def test_entries_expire_with_mcp_token(monkeypatch):
+    patch_mcp(monkeypatch)
+    config = mcp_config()
+
+    async def run():
+        await get_all_tools(config)
+        session = utils.get_mcp_session(get_tool_registry_key(config))
+        session.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await get_all_tools(config)
+        await clear_tool_registry()
+
+    asyncio.run(run())
+    assert FakeMCPClient.sessions_opened == 2
+
+
+def test_registry_key_separates_users_and_configs():
+    base = get_tool_registry_key(mcp_config())
+    other_user = {**mcp_config(), "metadata": {"owner": "user-2"}}
+    other_tools = mcp_config(mcp_config={"url": "https://mcp.example", "tools": ["delete_page"]})
+    assert base != get_tool_registry_key(other_user)
+    assert base != get_tool_registry_key(other_tools)
+    assert base != get_tool_registry_key(mcp_config(search_api="tavily"))
+
+
+def test_zero_ttl_disables_caching(monkeypatch):
+    patch_mcp(monkeypatch)
+    config = mcp_config(tool_registry_ttl_seconds=0)
+    opened = []
+
+    class CountingClient(FakeMCPClient):
+        async def get_tools(self):
+            opened.append(1)
+            return [fetch_page, delete_page]
+
+    monkeypatch.setattr(utils, "MultiServerMCPClient", CountingClient)
+
+    async def run():
+        await get_all_tools(config)
+        await get_all_tools(config)
+
+    asyncio.run(run())
+    assert len(opened) == 2
+    assert FakeMCPClient.sessions_opened == 0
+
+
+def test_failed_mcp_load_is_not_cached(monkeypatch):
+    patch_mcp(monkeypatch)
+    config = mcp_config()
+    attempts = []
+
+    async def failing_load_session_tools(session):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("MCP server unavailable")
+        return [fetch_page, delete_page]
+
+    monkeypatch.setattr(utils, "load_mcp_session_tools", failing_load_session_tools)
+
+    async def run():
+        first = await get_all_tools(config)
+        second = await get_all_tools(config)
+        third = await get_all_tools(config)
+        await clear_tool_registry()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert tool_names(first) == ["ResearchComplete"]
+    assert tool_names(second) == tool_names(third) == ["ResearchComplete", "fetch_page"]
+    assert len(attempts) == 2